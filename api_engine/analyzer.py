@@ -1,46 +1,91 @@
 import json
-from typing import Dict, List, Tuple
-
-from openai import OpenAI
+import time
+from typing import Dict, List, Optional, Tuple
 
 from api_engine.models import EndpointAnalysisBatch, FilteredEndpoint
+from api_engine.serialization import ArtifactSerializer
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Request bodies are cut to this many characters in the prompt
+MAX_POST_DATA_CHARS = 500
+
+
+def _is_transient(error: Exception) -> bool:
+    """Return whether a failed LLM request is worth retrying.
+
+    Connection failures, timeouts, rate limits and server errors are;
+    invalid requests and unparseable responses would fail again.
+    """
+    # Imported here because openai is slow to import, see EndpointAnalyzer
+    import openai
+
+    # APITimeoutError is an APIConnectionError
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
 
 class EndpointAnalyzer:
     """Analyzes filtered API endpoints using OpenAI's LLM to determine value."""
 
-    def __init__(self, api_key=None, model="gpt-4o-mini", chunk_size=5):
+    def __init__(
+        self,
+        api_key=None,
+        model="gpt-4o-mini",
+        chunk_size=5,
+        max_retries=2,
+        serializer: Optional[ArtifactSerializer] = None,
+        llm_dispatcher=None,
+    ):
         """Initialize the analyzer.
 
         Args:
             api_key: OpenAI API key
             model: OpenAI model to use
             chunk_size: Number of endpoints to analyze in a single API call
+            max_retries: Number of times to retry a failed API call
+            serializer: Serializer for the analysis artifact, compact JSON by default
+            llm_dispatcher: Optional LlmDispatcher whose shared client and
+                concurrency limit are used instead of a client of our own
         """
         self.api_key = api_key
         self.model = model
         self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.serializer = serializer or ArtifactSerializer()
+        self.llm_dispatcher = llm_dispatcher
         self.client = None
 
+        # Retries are handled here rather than inside the client so they can be counted
+        if llm_dispatcher:
+            self.client = llm_dispatcher.client
+            return
+
+        # Imported here because openai is slow to import and unused with a dispatcher
+        from openai import OpenAI
+
         if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = OpenAI(api_key=self.api_key, max_retries=0)
         else:
             logger.warning(
                 "No API key provided. Will attempt to use environment variable."
             )
-            self.client = OpenAI()
+            self.client = OpenAI(max_retries=0)
 
     def analyze(
-        self, filtered_endpoints: List[FilteredEndpoint], output_file: str = None
+        self,
+        filtered_endpoints: List[FilteredEndpoint],
+        output_file: str = None,
+        metrics=None,
     ) -> Tuple[bool, EndpointAnalysisBatch]:
         """Analyze endpoints and optionally save results to output file.
 
         Args:
             filtered_endpoints: List of FilteredEndpoint objects
             output_file: Optional path to save analysis results
+            metrics: Optional StageMetrics to record counters on
 
         Returns:
             tuple: (success, list_of_endpoint_analyses)
@@ -53,20 +98,24 @@ class EndpointAnalyzer:
             # Process data in chunks
             all_results = []
             endpoints_dict = {
-                endpoint.url: endpoint.model_dump() for endpoint in filtered_endpoints
+                endpoint.url: self._prompt_data(endpoint)
+                for endpoint in filtered_endpoints
             }
 
             for chunk in self._chunk_data(endpoints_dict, self.chunk_size):
-                result = self._analyze_endpoints(chunk)
+                result = self._analyze_endpoints(chunk, metrics)
                 if hasattr(result, "endpoints"):
                     all_results.extend(result.endpoints)
 
             combined_results = EndpointAnalysisBatch(endpoints=all_results)
 
+            if metrics is not None:
+                metrics.endpoints_in = len(filtered_endpoints)
+                metrics.endpoints_out = len(all_results)
+
             # Optionally save results
             if output_file:
-                with open(output_file, "w") as outfile:
-                    json.dump(combined_results.model_dump(), outfile, indent=4)
+                self.serializer.dump(combined_results, output_file)
                 logger.info(f"Analysis results saved to {output_file}")
 
             logger.info(
@@ -78,6 +127,29 @@ class EndpointAnalyzer:
             logger.error(f"Error during endpoint analysis: {str(e)}")
             return False, []
 
+    def _prompt_data(self, endpoint: FilteredEndpoint) -> Dict:
+        """Describe an endpoint for the prompt.
+
+        The response is described by its summary rather than a raw body, and
+        empty fields are left out, to keep each endpoint to a few dozen tokens.
+
+        Args:
+            endpoint: The filtered endpoint
+
+        Returns:
+            Dict: The endpoint's fields for the prompt
+        """
+        data = endpoint.model_dump(exclude_none=True, exclude_defaults=True)
+        # A breakdown only adds something when several methods were seen
+        breakdown = data.pop("method_breakdown", {})
+        if len(breakdown) > 1:
+            data["method_breakdown"] = breakdown
+        for sample in [data] + list(breakdown.values()):
+            post_data = sample.get("sample_post_data")
+            if post_data and len(post_data) > MAX_POST_DATA_CHARS:
+                sample["sample_post_data"] = post_data[:MAX_POST_DATA_CHARS] + "..."
+        return data
+
     def _chunk_data(self, data: Dict, chunk_size: int = 5):
         """Split data into smaller chunks for processing.
 
@@ -93,18 +165,27 @@ class EndpointAnalyzer:
         for i in range(0, len(items), chunk_size):
             yield dict(items[i : i + chunk_size])
 
-    def _analyze_endpoints(self, preprocessed_data: Dict) -> EndpointAnalysisBatch:
+    def _complete(self, **kwargs):
+        """Send a structured-output request through the dispatcher, if any."""
+        if self.llm_dispatcher:
+            return self.llm_dispatcher.parse(**kwargs)
+        return self.client.beta.chat.completions.parse(**kwargs)
+
+    def _analyze_endpoints(
+        self, preprocessed_data: Dict, metrics=None
+    ) -> EndpointAnalysisBatch:
         """Process endpoints with the LLM.
 
         Args:
             preprocessed_data: Dictionary mapping URLs to request data
+            metrics: Optional StageMetrics to record counters on
 
         Returns:
             List[EndpointAnalysis]: List of analyzed endpoints
         """
         try:
             formatted_endpoints_json = json.dumps(
-                {"endpoints": preprocessed_data}, indent=2
+                {"endpoints": preprocessed_data}, separators=(",", ":")
             )
 
             # Create messages for LLM
@@ -118,6 +199,10 @@ class EndpointAnalyzer:
                         "- Analytics and tracking\n"
                         "- Search and recommendation results\n"
                         "- Logs, system events, or behavioral data\n\n"
+                        "Each endpoint comes with its request parameters, a method_breakdown with the request count, parameters and "
+                        "sample body of each method when it was called with several, and a response_summary giving the response's status, "
+                        "content type, size in bytes, top-level JSON fields with their types (arrays as array[length]) and a "
+                        "truncated sample. Judge value mainly from what the response contains.\n\n"
                         "Please analyze the provided endpoints and determine which ones are likely to contain valuable data. "
                         "For each endpoint you identify:\n"
                         "1. Provide a clear explanation of why it's valuable\n"
@@ -138,16 +223,28 @@ class EndpointAnalyzer:
                 },
             ]
 
-            logger.info(f"Making API request with model {self.model}...")
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=messages,
-                max_tokens=1500,
-                temperature=0.1,
-                response_format=EndpointAnalysisBatch,
-            )
+            for attempt in range(self.max_retries + 1):
+                try:
+                    logger.info(f"Making API request with model {self.model}...")
+                    response = self._complete(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=1500,
+                        temperature=0.1,
+                        response_format=EndpointAnalysisBatch,
+                    )
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or not _is_transient(e):
+                        raise
+                    logger.warning(f"API request failed, retrying: {str(e)}")
+                    if metrics is not None:
+                        metrics.llm_retries += 1
+                    time.sleep(2**attempt)
 
             logger.info("API request successful.")
+            if metrics is not None:
+                metrics.record_llm_call(getattr(response, "usage", None))
 
             return response.choices[0].message.parsed
 
@@ -0,0 +1,216 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterator, List, Optional
+
+from api_engine.filter import ALL_METHODS, normalize_methods
+from api_engine.models import MethodScanResult, ScanTarget, TargetScanResult
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BulkScanner:
+    """Scans batches of URLs on a long-lived pool of worker threads.
+
+    Each worker builds its pipeline once and reuses it for every target it
+    takes, so browsers, the LLM client and probe limits come from the
+    pipelines' shared ScanResources instead of being set up per URL. A
+    worker keeps its pooled browser across batches and releases it after
+    idle_timeout seconds without work. A target is captured and analyzed
+    once for all of its methods, and the results are split by method.
+    """
+
+    def __init__(
+        self,
+        pipeline_factory: Callable,
+        workers: int = 4,
+        idle_timeout: Optional[float] = 300.0,
+    ):
+        """Initialize the scanner.
+
+        Args:
+            pipeline_factory: Callable returning an ApiDetectionPipeline,
+                normally built with shared ScanResources
+            workers: Number of targets scanned at once. With a browser pool,
+                keep this at or below the pool size.
+            idle_timeout: Seconds without work after which a worker releases
+                its browser, None to keep it
+        """
+        self.pipeline_factory = pipeline_factory
+        self.workers = workers
+        self.idle_timeout = idle_timeout
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the worker threads if they are not running yet."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"bulk-scan-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = None) -> None:
+        """Ask the workers to exit once their current target is done."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._tasks.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def warm_up(self, timeout: float = 60.0) -> bool:
+        """Start the workers and have each build its pipeline and browser.
+
+        Args:
+            timeout: Seconds to wait for every worker to finish warming up
+
+        Returns:
+            bool: Whether all workers warmed up in time
+        """
+        self.start()
+        barrier = threading.Barrier(self.workers + 1)
+        for _ in range(self.workers):
+            self._tasks.put(barrier)
+        try:
+            barrier.wait(timeout)
+            return True
+        except threading.BrokenBarrierError:
+            logger.warning("Bulk scan workers did not finish warming up in time")
+            return False
+
+    def scan(self, targets: List[ScanTarget]) -> Iterator[TargetScanResult]:
+        """Scan the targets and yield each result as soon as it is finished.
+
+        Results arrive in completion order; use their index to match them to
+        the targets. Closing the iterator early makes the workers skip the
+        targets they have not started yet.
+
+        Args:
+            targets: URLs to scan with the methods to scan each for
+
+        Yields:
+            TargetScanResult: The outcome of one target
+        """
+        self.start()
+        results = queue.Queue()
+        cancelled = threading.Event()
+        for index, target in enumerate(targets):
+            self._tasks.put((results, cancelled, index, target))
+
+        try:
+            for _ in range(len(targets)):
+                yield results.get()
+        finally:
+            cancelled.set()
+
+    def _work(self) -> None:
+        pipeline = None
+        try:
+            while True:
+                try:
+                    task = self._tasks.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    self._release_browser(pipeline)
+                    continue
+
+                if task is None:
+                    return
+
+                if isinstance(task, threading.Barrier):
+                    pipeline = self._warm_up_worker(pipeline)
+                    try:
+                        # Wait for the other workers so each takes one warm-up task
+                        task.wait()
+                    except threading.BrokenBarrierError:
+                        pass
+                    continue
+
+                results, cancelled, index, target = task
+                if cancelled.is_set():
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    if pipeline is None:
+                        pipeline = self.pipeline_factory()
+                    result = self._scan_target(pipeline, index, target)
+                except Exception as e:
+                    logger.exception(f"Bulk scan of {target.url} failed: {str(e)}")
+                    result = TargetScanResult(
+                        index=index,
+                        url=target.url,
+                        success=False,
+                        elapsed=0.0,
+                        error=str(e),
+                    )
+                result.elapsed = time.perf_counter() - started
+                results.put(result)
+        finally:
+            self._release_browser(pipeline)
+
+    def _warm_up_worker(self, pipeline):
+        try:
+            if pipeline is None:
+                pipeline = self.pipeline_factory()
+            browser_pool = pipeline.resources.browser_pool
+            if browser_pool:
+                with browser_pool.browser():
+                    pass
+        except Exception as e:
+            logger.error(f"Failed to warm up bulk scan worker: {str(e)}")
+        return pipeline
+
+    def _release_browser(self, pipeline) -> None:
+        # Pooled browsers belong to the thread that started them
+        browser_pool = pipeline.resources.browser_pool if pipeline else None
+        if browser_pool:
+            browser_pool.release()
+
+    def _scan_target(
+        self, pipeline, index: int, target: ScanTarget
+    ) -> TargetScanResult:
+        logger.info(f"Bulk scanning {target.url} for {', '.join(target.methods)}")
+        result = TargetScanResult(
+            index=index, url=target.url, success=False, elapsed=0.0
+        )
+
+        success, api_results, intermediate_data = pipeline.run(
+            target.url, normalize_methods(target.methods)
+        )
+        if not success and any(
+            stage.name == "capture" and not stage.success
+            for stage in intermediate_data["metrics"].stages
+        ):
+            result.error = "HAR capture failed"
+            return result
+
+        endpoints = api_results.endpoints if api_results else []
+
+        methods = list(dict.fromkeys(m.strip().upper() for m in target.methods))
+        if ALL_METHODS in methods:
+            # Report each method that was found, or ALL if none was
+            methods = list(dict.fromkeys(doc.method for doc in endpoints)) or [
+                ALL_METHODS
+            ]
+        for method in methods:
+            result.methods.append(
+                MethodScanResult(
+                    method=method,
+                    success=success,
+                    run_id=intermediate_data["metrics"].run_id,
+                    error=None if success else "Pipeline execution failed",
+                    endpoints=[
+                        doc for doc in endpoints if method in (doc.method, ALL_METHODS)
+                    ],
+                )
+            )
+
+        result.success = all(m.success for m in result.methods)
+        return result
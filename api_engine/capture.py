@@ -1,6 +1,6 @@
 import json
-
-from playwright.sync_api import sync_playwright
+import os
+import tempfile
 
 from utils.logger import get_logger
 
@@ -10,13 +10,16 @@ logger = get_logger(__name__)
 class HarCapture:
     """Captures network traffic in HAR format using Playwright."""
 
-    def __init__(self, timeout=5000):
+    def __init__(self, timeout=5000, browser_pool=None):
         """Initialize the HAR capture with configurable timeout.
 
         Args:
             timeout: Time to wait after page load in milliseconds
+            browser_pool: Optional BrowserPool to reuse browsers from instead
+                of launching one per capture
         """
         self.timeout = timeout
+        self.browser_pool = browser_pool
 
     def capture(self, url, output_file=None):
         """Capture HAR data from the given URL.
@@ -28,41 +31,66 @@ class HarCapture:
         Returns:
             tuple: (success, har_data_dict)
         """
+        # Record next to the output file, or in the system temp directory, under
+        # a unique name so concurrent captures never share a file
+        temp_dir = os.path.dirname(output_file) if output_file else None
+        fd, temp_har_path = tempfile.mkstemp(
+            dir=temp_dir or None, prefix=".capture-", suffix=".har"
+        )
+        os.close(fd)
+
         try:
             # Add protocol if missing
             if not url.startswith("http://") and not url.startswith("https://"):
                 url = "https://" + url
 
             logger.info(f"Capturing HAR data for {url}")
-            temp_har_path = "temp_capture.har"
-
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(record_har_path=temp_har_path)
-                page = context.new_page()
-
-                logger.info(f"Navigating to {url}...")
-                page.goto(url)
-                page.wait_for_timeout(self.timeout)
-
-                logger.info("Closing browser and collecting HAR data...")
-                context.close()
-                browser.close()
-
-                # Load the HAR data from the temporary file
-                with open(temp_har_path, "r") as f:
-                    har_data = json.load(f)
-
-                # Optionally save to the specified output file
-                if output_file:
-                    with open(output_file, "w") as f:
-                        json.dump(har_data, f)
-                    logger.info(f"HAR file saved to {output_file}")
-
-                logger.info("HAR capture completed successfully")
 
+            if self.browser_pool:
+                with self.browser_pool.browser() as browser:
+                    self._record(browser, url, temp_har_path)
+            else:
+                # Imported here to keep Playwright out of startup until needed
+                from playwright.sync_api import sync_playwright
+
+                with sync_playwright() as p:
+                    browser = p.chromium.launch(headless=True)
+                    try:
+                        self._record(browser, url, temp_har_path)
+                    finally:
+                        browser.close()
+
+            # Load the HAR data from the temporary file
+            with open(temp_har_path, "r") as f:
+                har_data = json.load(f)
+
+            # Optionally save to the specified output file, moving the
+            # recorded HAR into place instead of re-encoding it
+            if output_file:
+                os.replace(temp_har_path, output_file)
+                logger.info(f"HAR file saved to {output_file}")
+
+            logger.info("HAR capture completed successfully")
             return True, har_data
 
         except Exception as e:
             logger.error(f"Failed to capture HAR: {str(e)}")
             return False, None
+
+        finally:
+            if os.path.exists(temp_har_path):
+                os.unlink(temp_har_path)
+
+    def _record(self, browser, url: str, har_path: str) -> None:
+        """Load the page in a fresh browser context that records to har_path."""
+        context = browser.new_context(record_har_path=har_path)
+        try:
+            page = context.new_page()
+
+            logger.info(f"Navigating to {url}...")
+            page.goto(url)
+            page.wait_for_timeout(self.timeout)
+        finally:
+            # Closing the context writes the HAR file
+            logger.info("Closing browser context and collecting HAR data...")
+            context.close()
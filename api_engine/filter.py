@@ -1,47 +1,205 @@
+import base64
+import binascii
 import json
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
 
-from api_engine.models import ApiRequest, FilteredEndpoint
+from api_engine.models import FilteredEndpoint, MethodSummary, ResponseSummary
+from api_engine.records import RequestRecord
+from api_engine.serialization import ArtifactSerializer
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Method selection that keeps requests of every method
+ALL_METHODS = "ALL"
+
+# Request headers kept as samples for the analyzer
+_SAMPLE_HEADERS = frozenset(("authorization", "content-type"))
+
+# Bounds on a response summary, so that it costs the analyzer a few dozen
+# tokens however large the body is
+MAX_SUMMARY_FIELDS = 25
+MAX_SAMPLE_CHARS = 200
+# Larger bodies are sampled as text without being parsed
+MAX_PARSED_BODY = 2 * 1024 * 1024
+
+
+def normalize_methods(request_type: Union[str, Iterable[str]]) -> str:
+    """Return the canonical form of a method selection.
+
+    Args:
+        request_type: A method such as "GET", several as a comma-separated
+            string or an iterable, or "ALL"
+
+    Returns:
+        str: "ALL", or the upper-cased methods sorted and joined by commas, so
+            that equal selections compare and hash equal
+
+    Raises:
+        ValueError: If no method is given
+    """
+    if isinstance(request_type, str):
+        request_type = request_type.split(",")
+    methods = {m.strip().upper() for m in request_type if m and m.strip()}
+    if not methods:
+        raise ValueError("At least one HTTP method is required")
+    if ALL_METHODS in methods:
+        return ALL_METHODS
+    return ",".join(sorted(methods))
+
+
+def method_set(request_type: Union[str, Iterable[str]]) -> Optional[FrozenSet[str]]:
+    """Return the methods a selection keeps, or None if it keeps all."""
+    request_type = normalize_methods(request_type)
+    if request_type == ALL_METHODS:
+        return None
+    return frozenset(request_type.split(","))
+
+
+def _json_type(value: Any) -> str:
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return f"array[{len(value)}]"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "null"
+
+
+def _prune(value: Any, depth: int = 0) -> Any:
+    """Shrink a JSON value to a few items and short strings, for a sample."""
+    if isinstance(value, dict):
+        if depth >= 3:
+            return {}
+        return {
+            k: _prune(v, depth + 1) for k, v in list(value.items())[:MAX_SUMMARY_FIELDS]
+        }
+    if isinstance(value, list):
+        return [_prune(v, depth + 1) for v in value[:2]]
+    if isinstance(value, str) and len(value) > 40:
+        return value[:40] + "..."
+    return value
+
+
+def summarize_response(response: Dict) -> ResponseSummary:
+    """Summarize the shape of a HAR response for the analyzer.
+
+    Args:
+        response: The response object of a HAR entry
+
+    Returns:
+        ResponseSummary: Status, content type, size and, for a JSON body, its
+            top-level fields and a pruned sample
+    """
+    content = response.get("content") or {}
+    text = content.get("text")
+    if text and content.get("encoding") == "base64":
+        try:
+            text = base64.b64decode(text).decode("utf-8")
+        except (binascii.Error, ValueError):
+            text = None
+
+    size = content.get("size")
+    if not isinstance(size, int) or size < 0:
+        size = len(text) if text else 0
+    content_type = content.get("mimeType") or None
+
+    summary = ResponseSummary(
+        status=response.get("status"), content_type=content_type, size=size
+    )
+    if not text:
+        return summary
+
+    body = None
+    if len(text) <= MAX_PARSED_BODY and (
+        "json" in (content_type or "") or text.lstrip()[:1] in ("{", "[")
+    ):
+        try:
+            body = json.loads(text)
+        except ValueError:
+            pass
+
+    if body is None:
+        summary.sample = text[:MAX_SAMPLE_CHARS]
+        return summary
+
+    summary.json_type = _json_type(body).split("[")[0]
+    fields = body
+    if isinstance(body, list):
+        summary.length = len(body)
+        fields = body[0] if body else None
+    if isinstance(fields, dict):
+        summary.fields = {
+            k: _json_type(v) for k, v in list(fields.items())[:MAX_SUMMARY_FIELDS]
+        }
+    summary.sample = json.dumps(_prune(body), separators=(",", ":"))[:MAX_SAMPLE_CHARS]
+    return summary
+
 
 class HarFilter:
     """Filters and processes HAR files to extract API requests."""
 
+    def __init__(self, serializer: Optional[ArtifactSerializer] = None, parallel=None):
+        """Initialize the filter.
+
+        Args:
+            serializer: Serializer for the filtered endpoints artifact, compact JSON by default
+            parallel: Optional ParallelHarProcessor that filters HARs large
+                enough to split on a pool of processes
+        """
+        self.serializer = serializer or ArtifactSerializer()
+        self.parallel = parallel
+
     def filter(
-        self, har_data, request_type: str, output_path: str = None
+        self,
+        har_data,
+        request_type: Union[str, Iterable[str]],
+        output_path: str = None,
+        metrics=None,
     ) -> Tuple[bool, List[FilteredEndpoint]]:
         """
         Filter HAR data for specific request types and preprocess the data.
 
+        All selected methods are filtered in a single pass, with each
+        endpoint's requests broken down by method.
+
         Args:
             har_data: HAR data as a dictionary
-            request_type: HTTP method to filter (GET, POST, etc.)
+            request_type: HTTP method to filter (GET, POST, etc.), several
+                methods as a comma-separated string or an iterable, or ALL
             output_path: Optional output file path for filtered requests
+            metrics: Optional StageMetrics to record counters on
 
         Returns:
             tuple: (success, filtered_endpoints)
         """
         try:
+            request_type = normalize_methods(request_type)
             logger.info(f"Filtering HAR data for {request_type} requests")
 
-            # Process the HAR data
-            grouped_requests = self._process_har_data(har_data, request_type)
+            if self.parallel and self.parallel.should_split(har_data):
+                filtered_endpoints = self.parallel.filter_har(har_data, request_type)
+            else:
+                # Process the HAR data
+                grouped_requests = self._process_har_data(har_data, request_type)
 
-            # Convert to filtered endpoints for LLM analysis
-            filtered_endpoints = self._convert_to_filtered_endpoints(grouped_requests)
+                # Convert to filtered endpoints for LLM analysis
+                filtered_endpoints = self._convert_to_filtered_endpoints(
+                    grouped_requests
+                )
+
+            if metrics is not None:
+                metrics.record_har(har_data)
+                metrics.endpoints_out = len(filtered_endpoints)
 
             # Optionally save to output file
             if output_path:
-                with open(output_path, "w") as outfile:
-                    json.dump(
-                        [endpoint.model_dump() for endpoint in filtered_endpoints],
-                        outfile,
-                        indent=4,
-                    )
+                self.serializer.dump(filtered_endpoints, output_path)
                 logger.info(
                     f"Saved {len(filtered_endpoints)} filtered endpoints to {output_path}"
                 )
@@ -54,23 +212,31 @@ class HarFilter:
 
     def _process_har_data(
         self, har_data, request_type: str
-    ) -> Dict[str, List[ApiRequest]]:
+    ) -> Dict[str, List[RequestRecord]]:
         """
         Process HAR data to extract and group API requests.
 
+        Requests are kept as RequestRecord tuples rather than validated
+        models, since this loop runs once per HAR entry. Responses are
+        summarized in the same pass, but only until an endpoint has a
+        response with a body, so most entries are never parsed.
+
         Args:
             har_data: HAR data as a dictionary
-            request_type: HTTP method to filter
+            request_type: Method selection to filter, see normalize_methods
 
         Returns:
-            Dict mapping endpoints to lists of ApiRequest objects
+            Dict mapping endpoints to lists of RequestRecord tuples
         """
         entries = har_data["log"]["entries"]
+        methods = method_set(request_type)
         grouped_requests = defaultdict(list)
+        # Endpoints with a summarized response body
+        summarized = set()
 
         for entry in entries:
             request = entry["request"]
-            if request["method"] == request_type:
+            if methods is None or request["method"] in methods:
                 endpoint = request["url"].split("?")[0]
 
                 # Extract query parameters
@@ -78,38 +244,39 @@ class HarFilter:
                 for param in request.get("queryString", []):
                     query_params[param["name"]] = param["value"]
 
-                # Extract headers
-                headers = {}
+                # Extract the important headers
+                filtered_headers = {}
                 for header in request.get("headers", []):
-                    headers[header["name"]] = header["value"]
+                    if header["name"].lower() in _SAMPLE_HEADERS:
+                        filtered_headers[header["name"]] = header["value"]
 
-                # Filter important headers
-                filtered_headers = {}
-                for k in headers:
-                    if k.lower() in ["authorization", "content-type"]:
-                        filtered_headers[k] = headers[k]
-
-                # Create API request model
-                api_request = ApiRequest(
-                    url=endpoint,
-                    method=request["method"],
-                    query_params=query_params,
-                    headers=filtered_headers,
-                    post_data=request.get("postData", {}).get("text", None),
-                )
+                response_summary = None
+                if endpoint not in summarized:
+                    response_summary = summarize_response(entry.get("response", {}))
+                    if response_summary.size:
+                        summarized.add(endpoint)
 
-                grouped_requests[endpoint].append(api_request)
+                grouped_requests[endpoint].append(
+                    RequestRecord(
+                        endpoint,
+                        request["method"],
+                        query_params,
+                        filtered_headers,
+                        request.get("postData", {}).get("text", None),
+                        response_summary,
+                    )
+                )
 
         return grouped_requests
 
     def _convert_to_filtered_endpoints(
-        self, grouped_requests: Dict[str, List[ApiRequest]]
+        self, grouped_requests: Dict[str, List[RequestRecord]]
     ) -> List[FilteredEndpoint]:
         """
         Convert grouped API requests to FilteredEndpoint models.
 
         Args:
-            grouped_requests: Dict mapping endpoints to lists of ApiRequest objects
+            grouped_requests: Dict mapping endpoints to lists of RequestRecord tuples
 
         Returns:
             List of FilteredEndpoint objects
@@ -117,25 +284,46 @@ class HarFilter:
         filtered_endpoints = []
 
         for endpoint, requests in grouped_requests.items():
-            # Identify unique methods
-            methods = list(set(req.method for req in requests))
-
-            # Consolidate query parameters from all requests
+            # Consolidate query parameters from all requests, and break the
+            # requests down by method, in first-seen order
             all_params = {}
+            counts, params, post_data = {}, {}, {}
             for req in requests:
                 all_params.update(req.query_params)
+                if req.method not in counts:
+                    counts[req.method] = 0
+                    params[req.method] = {}
+                    post_data[req.method] = req.post_data
+                counts[req.method] += 1
+                params[req.method].update(dict.fromkeys(req.query_params))
+            breakdown = {
+                method: MethodSummary(
+                    count=count,
+                    params=list(params[method]),
+                    sample_post_data=post_data[method],
+                )
+                for method, count in counts.items()
+            }
 
             # Use the first request's headers and post data as samples
             sample_headers = requests[0].headers if requests else {}
             sample_post_data = requests[0].post_data if requests else None
 
+            # The first response with a body describes the endpoint best
+            summaries = [r.response_summary for r in requests if r.response_summary]
+            response_summary = next(
+                (s for s in summaries if s.size), summaries[0] if summaries else None
+            )
+
             # Create a FilteredEndpoint for this group
             filtered_endpoint = FilteredEndpoint(
                 url=endpoint,
-                methods=methods,
+                methods=list(breakdown),
                 params=all_params,
                 sample_headers=sample_headers,
                 sample_post_data=sample_post_data,
+                response_summary=response_summary,
+                method_breakdown=breakdown,
             )
 
             filtered_endpoints.append(filtered_endpoint)
@@ -0,0 +1,116 @@
+import gzip
+import json
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_gzip_file(path: str) -> bool:
+    """Return whether the file at path is gzip-compressed, by its magic bytes."""
+    with open(path, "rb") as f:
+        return f.read(2) == _GZIP_MAGIC
+
+
+@contextmanager
+def open_har(source: Union[str, BinaryIO]):
+    """Open a .har or .har.gz file for reading, decompressing it on the fly.
+
+    Compression is detected from the content rather than the file name.
+
+    Args:
+        source: Path of the file, or a readable binary file object
+
+    Yields:
+        A binary file object positioned at the start of the HAR JSON
+    """
+    if isinstance(source, str):
+        raw = open(source, "rb")
+    else:
+        raw = source
+
+    try:
+        stream = raw
+        if hasattr(raw, "peek"):
+            compressed = raw.peek(2)[:2] == _GZIP_MAGIC
+        else:
+            start = raw.tell()
+            compressed = raw.read(2) == _GZIP_MAGIC
+            raw.seek(start)
+        if compressed:
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        yield stream
+    finally:
+        if raw is not source:
+            raw.close()
+
+
+def load_har(source: Union[str, BinaryIO]) -> Dict:
+    """Load a HAR file exported by a browser or proxy.
+
+    With ijson, which requirements.txt installs, entries are parsed one at a
+    time from the decompressing stream, so neither the compressed nor the
+    decoded text of a large archive is held in memory. The parsed entries
+    are still all collected into a list, since the filter and match stages
+    each pass over them. Without ijson, nothing is streamed: the whole
+    decompressed JSON is read into memory and parsed in one go, with orjson
+    when installed.
+
+    Args:
+        source: Path of a .har or .har.gz file, or a readable binary file object
+
+    Returns:
+        Dict: HAR data with at least log.entries
+
+    Raises:
+        ValueError: If the file is not a HAR, or a file object given as
+            source is not seekable and the HAR has no entries
+    """
+    if ijson is not None:
+        start = None
+        if not isinstance(source, str):
+            try:
+                start = source.tell()
+            except (OSError, ValueError):
+                pass
+        try:
+            with open_har(source) as stream:
+                entries = list(ijson.items(stream, "log.entries.item", use_float=True))
+            # Any other JSON also yields no entries, so check that an empty
+            # result comes from an empty log.entries array
+            if not entries:
+                if not isinstance(source, str):
+                    if start is None:
+                        raise ValueError(
+                            "Not a HAR file, or a HAR without entries read from"
+                            " an unseekable stream"
+                        )
+                    source.seek(start)
+                with open_har(source) as stream:
+                    if not any(
+                        prefix == "log.entries" and event == "start_array"
+                        for prefix, event, _ in ijson.parse(stream)
+                    ):
+                        raise ValueError("Not a HAR file: log.entries is missing")
+        except ijson.JSONError as e:
+            raise ValueError(f"Not a HAR file: {str(e)}") from e
+        return {"log": {"entries": entries}}
+
+    with open_har(source) as stream:
+        data = stream.read()
+        har_data = orjson.loads(data) if orjson is not None else json.loads(data)
+
+    log = har_data.get("log") if isinstance(har_data, dict) else None
+    if not isinstance(log, dict) or not isinstance(log.get("entries"), list):
+        raise ValueError("Not a HAR file: log.entries is missing")
+    return har_data
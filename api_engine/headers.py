@@ -1,39 +1,78 @@
 import base64
 import json
+import logging
 import time
-from typing import Dict, List, Tuple
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
 from urllib.parse import parse_qs, urlparse
 
-from playwright.sync_api import sync_playwright
-
 from api_engine.models import (
     ApiDetectionResults,
     EndpointAnalysisBatch,
     EndpointDocumentation,
     HeadersRequest,
-    MatchedRequest,
 )
+from api_engine.records import MatchedRecord
+from api_engine.serialization import ArtifactSerializer
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
+# Messages logged for every probe request, rate-limited so they cannot flood
+# the log; not a child of this module's logger, which would log them twice
+probe_logger = get_logger("api_engine.probes", rate_limited=True)
 
 
 class HeaderOptimizer:
     """Finds minimal necessary headers for API endpoints."""
 
+    def __init__(
+        self,
+        serializer: Optional[ArtifactSerializer] = None,
+        probe_delay=0.1,
+        browser_pool=None,
+        probe_scheduler=None,
+    ):
+        """Initialize the optimizer.
+
+        Args:
+            serializer: Serializer for results and checkpoints, compact JSON by default
+            probe_delay: Seconds to wait between header probes of an endpoint,
+                unused when a probe scheduler paces the probes
+            browser_pool: Optional BrowserPool providing request contexts
+                instead of launching a browser per endpoint
+            probe_scheduler: Optional ProbeScheduler limiting probes globally
+                and per host
+        """
+        self.serializer = serializer or ArtifactSerializer()
+        self.probe_delay = probe_delay
+        self.browser_pool = browser_pool
+        self.probe_scheduler = probe_scheduler
+
     def optimize(
         self,
-        matched_requests: List[MatchedRequest],
+        matched_requests: List[MatchedRecord],
         analyzed_endpoints: EndpointAnalysisBatch,
         output_file: str = None,
+        metrics=None,
+        on_endpoint: Optional[Callable[[EndpointDocumentation], None]] = None,
+        known_headers: Optional[Dict[Tuple[str, str], Dict[str, str]]] = None,
     ) -> Tuple[bool, ApiDetectionResults]:
         """
         Find the minimal set of headers required to make successful API requests.
 
         Args:
-            matched_requests: List of matched requests objects
+            matched_requests: Matched requests, as MatchedRecord tuples or
+                MatchedRequest models
             analyzed_endpoints: List of endpoint analysis objects
             output_file: Optional path to save output results
+            metrics: Optional StageMetrics to record counters on
+            on_endpoint: Optional callable invoked with each endpoint's
+                documentation as soon as its headers have been probed. Its
+                notes only reflect the endpoints found so far.
+            known_headers: Optional minimal headers found by an earlier run,
+                keyed by (URL without query, method). Such an endpoint is
+                revalidated with a single request and only probed header by
+                header if that request no longer succeeds.
 
         Returns:
             tuple: (success, api_detection_results)
@@ -50,8 +89,20 @@ class HeaderOptimizer:
                 for endpoint in analyzed_endpoints.endpoints
             }
 
+            on_request = None
+            if on_endpoint is not None:
+
+                def on_request(request, found):
+                    on_endpoint(
+                        self._format_endpoint_data(
+                            request, endpoint_descriptions, found
+                        )
+                    )
+
             logger.info(f"Finding minimal headers for {len(matched_requests)} requests")
-            minimal_headers_data = self._find_minimal_headers(matched_requests)
+            minimal_headers_data = self._find_minimal_headers(
+                matched_requests, metrics, on_request, known_headers
+            )
 
             logger.info("Formatting output data")
             output_data = self._create_output_data(
@@ -63,6 +114,10 @@ class HeaderOptimizer:
                 logger.info(f"Saving results to {output_file}")
                 self._save_output_data(output_data, output_file)
 
+            if metrics is not None:
+                metrics.endpoints_in = len(matched_requests)
+                metrics.endpoints_out = len(output_data.endpoints)
+
             logger.info("Header optimization completed")
             return True, output_data
 
@@ -71,29 +126,55 @@ class HeaderOptimizer:
             return False, None
 
     def _load_matched_requests(self, file_path: str) -> List[Dict]:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return self.serializer.load(file_path)
 
     def _load_endpoint_descriptions(self, file_path: str) -> Dict[str, Dict]:
         endpoint_data = {}
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            endpoints_data = json.load(f)
-            for endpoint in endpoints_data:
-                endpoint_data[endpoint["url"]] = {
-                    "explanation": endpoint["explanation"],
-                    "usefulness_score": endpoint["usefulness_score"],
-                }
+        endpoints_data = self.serializer.load(file_path)
+        if isinstance(endpoints_data, dict):
+            endpoints_data = endpoints_data.get("endpoints", [])
+        for endpoint in endpoints_data:
+            endpoint_data[endpoint["url"]] = {
+                "explanation": endpoint["explanation"],
+                "usefulness_score": endpoint["usefulness_score"],
+            }
 
         return endpoint_data
 
-    def _test_api_with_headers(
-        self, api_endpoint: str, method: str, headers: Dict[str, str]
-    ) -> Dict[str, str]:
+    @contextmanager
+    def _request_context(self):
+        """Open a request context for probing endpoints.
+
+        Yields:
+            An object with a Playwright APIRequestContext-style fetch method
+        """
+        if self.browser_pool:
+            with self.browser_pool.request_context() as request_context:
+                yield request_context
+            return
+
+        # Imported here to keep Playwright out of startup until needed
+        from playwright.sync_api import sync_playwright
+
         with sync_playwright() as p:
             browser = p.chromium.launch()
             context = browser.new_context()
+            try:
+                yield context.request
+            finally:
+                browser.close()
+
+    def _probe_slot(self, url: str):
+        """Return a context manager holding a probe slot for url, if scheduled."""
+        if self.probe_scheduler is None:
+            return nullcontext()
+        return self.probe_scheduler.slot(url)
 
+    def _test_api_with_headers(
+        self, api_endpoint: str, method: str, headers: Dict[str, str], metrics=None
+    ) -> Dict[str, str]:
+        with self._request_context() as request_context:
             required_headers = {
                 "accept": headers.get("accept", "*/*"),
                 "user-agent": headers.get("user-agent", "Mozilla/5.0"),
@@ -102,47 +183,62 @@ class HeaderOptimizer:
             valid_headers = {k: v for k, v in headers.items() if not k.startswith(":")}
             necessary_headers = valid_headers.copy()
 
-            logger.info(f"Testing headers for {api_endpoint}")
-            logger.info(f"Starting with {len(valid_headers)} headers")
-            logger.info(f"Method: {method}")
+            # Per-probe messages use deferred %-formatting so that they cost
+            # nothing when filtered out and share a template for rate limiting
+            logger.info(
+                "Testing %d headers for %s %s", len(valid_headers), method, api_endpoint
+            )
 
             try:
-                response = context.request.fetch(
-                    api_endpoint,
-                    method=method,
-                    headers=valid_headers,
-                    data="{}" if method.upper() in ["POST", "PUT", "PATCH"] else None,
-                )
+                with self._probe_slot(api_endpoint):
+                    response = request_context.fetch(
+                        api_endpoint,
+                        method=method,
+                        headers=valid_headers,
+                        data=(
+                            "{}" if method.upper() in ["POST", "PUT", "PATCH"] else None
+                        ),
+                    )
                 initial_status = response.status
+                if metrics is not None:
+                    metrics.record_probe(api_endpoint, initial_status)
                 try:
                     initial_body = response.text()
                 except Exception:
                     initial_body = None
-                logger.info(
-                    f"Initial response - Status: {initial_status}, Body length: {len(initial_body) if initial_body else 0}"
+                probe_logger.info(
+                    "Initial response - Status: %s, Body length: %d",
+                    initial_status,
+                    len(initial_body) if initial_body else 0,
                 )
             except Exception as e:
-                logger.error(f"Initial request failed: {e}")
+                logger.error("Initial request failed: %s", e)
+                if metrics is not None:
+                    metrics.record_probe(api_endpoint, None)
                 return valid_headers
 
             for header in list(necessary_headers.keys()):
                 if header in required_headers:
-                    logger.debug(f"Skipping required header: {header}")
+                    probe_logger.debug("Skipping required header: %s", header)
                     continue
 
                 try:
-                    logger.debug(f"Testing without header: {header}")
+                    probe_logger.debug("Testing without header: %s", header)
                     test_headers = necessary_headers.copy()
                     test_headers.pop(header)
 
-                    response = context.request.fetch(
-                        api_endpoint,
-                        method=method,
-                        headers=test_headers,
-                        data="{}"
-                        if method.upper() in ["POST", "PUT", "PATCH"]
-                        else None,
-                    )
+                    with self._probe_slot(api_endpoint):
+                        response = request_context.fetch(
+                            api_endpoint,
+                            method=method,
+                            headers=test_headers,
+                            data="{}"
+                            if method.upper() in ["POST", "PUT", "PATCH"]
+                            else None,
+                        )
+
+                    if metrics is not None:
+                        metrics.record_probe(api_endpoint, response.status)
 
                     try:
                         current_body = response.text()
@@ -153,28 +249,82 @@ class HeaderOptimizer:
                         response.status == initial_status
                         and current_body == initial_body
                     ):
-                        logger.debug(f"Request succeeded without {header}, removing it")
+                        probe_logger.debug(
+                            "Request succeeded without %s, removing it", header
+                        )
                         necessary_headers.pop(header)
-                    else:
-                        logger.debug(
-                            f"Request changed without {header} (status: {response.status}, body changed: {current_body != initial_body}), keeping it"
+                    elif probe_logger.isEnabledFor(logging.DEBUG):
+                        probe_logger.debug(
+                            "Request changed without %s (status: %s, body changed: %s), keeping it",
+                            header,
+                            response.status,
+                            current_body != initial_body,
                         )
 
-                    time.sleep(0.1)
+                    if self.probe_scheduler is None:
+                        time.sleep(self.probe_delay)
 
                 except Exception as e:
-                    logger.error(f"Error testing without {header}: {e}")
+                    logger.error("Error testing without %s: %s", header, e)
+                    if metrics is not None:
+                        metrics.record_probe(api_endpoint, None)
                     continue
 
-            browser.close()
             necessary_headers.update(required_headers)
-            logger.info(f"Finished with {len(necessary_headers)} necessary headers")
+            logger.info("Finished with %d necessary headers", len(necessary_headers))
             return necessary_headers
 
+    def _revalidate(
+        self,
+        api_endpoint: str,
+        method: str,
+        headers: Dict[str, str],
+        expected_status: int,
+        metrics=None,
+    ) -> bool:
+        """Check with one request that known minimal headers still work.
+
+        Args:
+            api_endpoint: URL to request
+            method: HTTP method
+            headers: Minimal headers found by an earlier run
+            expected_status: Status of the captured request
+            metrics: Optional StageMetrics to record the probe on
+
+        Returns:
+            bool: Whether the request returned the captured status
+        """
+        with self._request_context() as request_context:
+            try:
+                with self._probe_slot(api_endpoint):
+                    response = request_context.fetch(
+                        api_endpoint,
+                        method=method,
+                        headers=headers,
+                        data=(
+                            "{}" if method.upper() in ["POST", "PUT", "PATCH"] else None
+                        ),
+                    )
+                status = response.status
+            except Exception as e:
+                logger.warning("Revalidation of %s failed: %s", api_endpoint, e)
+                status = None
+
+        if metrics is not None:
+            metrics.record_probe(api_endpoint, status)
+        return status == expected_status
+
     def _find_minimal_headers(
-        self, matched_requests: List[MatchedRequest]
+        self,
+        matched_requests: List[MatchedRecord],
+        metrics=None,
+        on_request=None,
+        known_headers=None,
     ) -> List[HeadersRequest]:
         necessary_headers = []
+        # (URL without query, method) of the endpoints documented so far; only
+        # the first successful request of each is kept
+        documented = set()
 
         for request in matched_requests:
             base_url = request.url
@@ -195,29 +345,41 @@ class HeaderOptimizer:
             }
             status_code = request.status_code
 
-            logger.info(f"Processing API: {url}")
-            logger.debug(f"Method: {method}, Original Status: {status_code}")
+            logger.info("Processing API: %s", url)
+            logger.debug("Method: %s, Original Status: %s", method, status_code)
 
             if status_code in (200, 204):
-                minimal_headers = self._test_api_with_headers(url, method, headers)
-
-                if not any(
-                    urlparse(entry.api_endpoint).scheme
-                    + "://"
-                    + urlparse(entry.api_endpoint).netloc
-                    + urlparse(entry.api_endpoint).path
-                    == base_url
-                    and entry.method == method
-                    for entry in necessary_headers
+                known = known_headers.get((base_url, method)) if known_headers else None
+                if known is not None and self._revalidate(
+                    url, method, known, status_code, metrics
                 ):
-                    necessary_headers.append(
-                        HeadersRequest(
-                            api_endpoint=url,
-                            method=method,
-                            necessary_headers=minimal_headers,
-                        )
+                    logger.info("Reusing known headers for %s", url)
+                    minimal_headers = dict(known)
+                    if metrics is not None:
+                        metrics.endpoints_reused += 1
+                else:
+                    minimal_headers = self._test_api_with_headers(
+                        url, method, headers, metrics
                     )
 
+                if (base_url, method) in documented:
+                    continue
+                parsed = urlparse(url)
+                documented.add(
+                    (f"{parsed.scheme}://{parsed.netloc}{parsed.path}", method)
+                )
+                headers_request = HeadersRequest(
+                    api_endpoint=url,
+                    method=method,
+                    necessary_headers=minimal_headers,
+                )
+                necessary_headers.append(headers_request)
+                if on_request is not None:
+                    try:
+                        on_request(headers_request, necessary_headers)
+                    except Exception as e:
+                        logger.error(f"Endpoint callback failed for {url}: {e}")
+
         return necessary_headers
 
     def _format_endpoint_data(
@@ -267,18 +429,17 @@ class HeaderOptimizer:
     def _create_output_data(
         self, minimal_headers_data: List[HeadersRequest], endpoint_descriptions: Dict
     ) -> ApiDetectionResults:
-        output_data = {"endpoints": []}
-
-        for request in minimal_headers_data:
-            endpoint_data = self._format_endpoint_data(
+        endpoints = [
+            self._format_endpoint_data(
                 request, endpoint_descriptions, minimal_headers_data
             )
-            output_data["endpoints"].append(endpoint_data.dict())
+            for request in minimal_headers_data
+        ]
 
-        return ApiDetectionResults(**output_data)
+        # Model instances are accepted as-is, without a dump/validate round trip
+        return ApiDetectionResults(endpoints=endpoints)
 
     def _save_output_data(
         self, output_data: ApiDetectionResults, output_file: str
     ) -> None:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(output_data.dict(), f, indent=4)
+        self.serializer.dump(output_data, output_file)
@@ -0,0 +1,560 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from api_engine.workspace import atomic_write
+from utils.logger import get_logger
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = get_logger(__name__)
+
+
+class Lease(NamedTuple):
+    """A job handed to one worker until it is acked or its lease expires."""
+
+    job_id: str
+    worker: str
+    token: str
+    # Deliveries of the job so far, this one included
+    attempts: int
+
+
+class JobQueue(ABC):
+    """Hands queued job IDs to scan workers, one worker at a time.
+
+    A worker leases a job, extends the lease with heartbeats while it runs
+    it and acks it when done. If the worker crashes or hangs, its lease
+    expires and reap() puts the job back for another worker, until it has
+    been delivered max_attempts times. A job is queued at most once.
+
+    Subclasses implement the storage; the job itself, its status and its
+    results stay in the JobStore.
+    """
+
+    def __init__(self, max_attempts: int = 3):
+        """Initialize the queue.
+
+        Args:
+            max_attempts: Deliveries after which a job whose lease expires is
+                abandoned instead of retried
+        """
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def put(self, job_id: str) -> None:
+        """Queue a job, unless it is already queued or leased."""
+
+    @abstractmethod
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Lease]:
+        """Take the oldest queued job.
+
+        Args:
+            worker: Identifier of the leasing worker
+            lease_seconds: Seconds until the lease expires without a heartbeat
+
+        Returns:
+            Lease: The leased job, or None if the queue is empty
+        """
+
+    @abstractmethod
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        """Extend a lease, returning False if it has already been lost."""
+
+    @abstractmethod
+    def ack(self, lease: Lease) -> None:
+        """Remove a finished job from the queue."""
+
+    @abstractmethod
+    def reap(self) -> Tuple[List[Lease], List[Lease]]:
+        """Put back the jobs whose lease has expired.
+
+        Returns:
+            tuple: (requeued, abandoned) expired leases; abandoned jobs had
+            reached max_attempts and are no longer queued
+        """
+
+    @abstractmethod
+    def depth(self) -> Dict[str, int]:
+        """Return the number of queued and leased jobs."""
+
+
+class SqliteJobQueue(JobQueue):
+    """Job queue in a SQLite table, for workers sharing a host or a disk.
+
+    By default it lives in the job store's own database.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        """Initialize the queue and create its table if needed.
+
+        Args:
+            db_path: Path of the SQLite database file
+            max_attempts: See JobQueue
+        """
+        super().__init__(max_attempts)
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS job_queue (
+                    job_id TEXT PRIMARY KEY,
+                    enqueued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    token TEXT,
+                    lease_expires REAL
+                );
+                CREATE INDEX IF NOT EXISTS job_queue_lease
+                    ON job_queue (lease_expires, enqueued_at);
+                """)
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived autocommit connection."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def put(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO job_queue (job_id, enqueued_at) VALUES (?, ?)",
+                (job_id, time.time()),
+            )
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Lease]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT job_id, attempts FROM job_queue"
+                    " WHERE lease_expires IS NULL ORDER BY enqueued_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE job_queue SET attempts = attempts + 1, worker = ?,"
+                    " token = ?, lease_expires = ? WHERE job_id = ?",
+                    (worker, token, time.time() + lease_seconds, row["job_id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return Lease(row["job_id"], worker, token, row["attempts"] + 1)
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE job_queue SET lease_expires = ? WHERE job_id = ? AND token = ?",
+                (time.time() + lease_seconds, lease.job_id, lease.token),
+            )
+        return cursor.rowcount == 1
+
+    def ack(self, lease: Lease) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM job_queue WHERE job_id = ? AND token = ?",
+                (lease.job_id, lease.token),
+            )
+
+    def reap(self) -> Tuple[List[Lease], List[Lease]]:
+        requeued, abandoned = [], []
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT * FROM job_queue WHERE lease_expires < ?", (time.time(),)
+                ).fetchall()
+                for row in rows:
+                    lease = Lease(
+                        row["job_id"], row["worker"], row["token"], row["attempts"]
+                    )
+                    if row["attempts"] >= self.max_attempts:
+                        conn.execute(
+                            "DELETE FROM job_queue WHERE job_id = ?", (lease.job_id,)
+                        )
+                        abandoned.append(lease)
+                    else:
+                        # Retried jobs keep their place at the front of the queue
+                        conn.execute(
+                            "UPDATE job_queue SET worker = NULL, token = NULL,"
+                            " lease_expires = NULL WHERE job_id = ?",
+                            (lease.job_id,),
+                        )
+                        requeued.append(lease)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return requeued, abandoned
+
+    def depth(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT SUM(lease_expires IS NULL) AS queued,"
+                " SUM(lease_expires IS NOT NULL) AS leased FROM job_queue"
+            ).fetchone()
+        return {"queued": row["queued"] or 0, "leased": row["leased"] or 0}
+
+
+class FileJobQueue(JobQueue):
+    """Job queue of small files in a directory, e.g. on a shared volume.
+
+    A job is a file in queued/ and is leased by renaming it into leased/,
+    which succeeds for exactly one worker. The lease expiry is kept as the
+    leased file's modification time, so heartbeats only touch the file; it
+    is set before the rename, so a leased file is never seen expired early.
+    A marker in members/, created exclusively by put, keeps a job queued at
+    most once while it is queued or leased. Hosts sharing the directory
+    need synchronized clocks. Abandoned jobs are moved to dead/ for
+    inspection.
+    """
+
+    # Age after which a marker whose job is neither queued nor leased, left
+    # by a process that stopped mid-put or mid-ack, is queued again
+    ORPHAN_SECONDS = 60.0
+
+    def __init__(self, directory: str, max_attempts: int = 3):
+        """Initialize the queue and create its directories if needed.
+
+        Args:
+            directory: Directory holding the queue, shared by all workers
+            max_attempts: See JobQueue
+        """
+        super().__init__(max_attempts)
+        self.directory = directory
+        for name in ("queued", "leased", "dead", "members"):
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    def _path(self, state: str, name: str) -> str:
+        return os.path.join(self.directory, state, name)
+
+    def _leased_path(self, lease: Lease) -> str:
+        return self._path("leased", f"{lease.job_id}.{lease.token}.json")
+
+    def put(self, job_id: str) -> None:
+        try:
+            # Only one put of a job creates its marker
+            fd = os.open(
+                self._path("members", job_id), os.O_WRONLY | os.O_CREAT | os.O_EXCL
+            )
+        except FileExistsError:
+            return
+        os.close(fd)
+        self._enqueue(job_id)
+
+    def _enqueue(self, job_id: str) -> None:
+        record = {"job_id": job_id, "attempts": 0, "enqueued_at": time.time()}
+        atomic_write(
+            self._path("queued", f"{job_id}.json"), json.dumps(record).encode("utf-8")
+        )
+
+    def _forget(self, job_id: str) -> None:
+        try:
+            os.remove(self._path("members", job_id))
+        except FileNotFoundError:
+            pass
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Lease]:
+        queued = []
+        for entry in os.scandir(os.path.join(self.directory, "queued")):
+            # Skip the temporary files of puts in progress
+            if entry.name.endswith(".json"):
+                try:
+                    queued.append((entry.stat().st_mtime, entry.name))
+                except FileNotFoundError:
+                    continue
+
+        for _, name in sorted(queued):
+            job_id = name[: -len(".json")]
+            lease = Lease(job_id, worker, uuid.uuid4().hex, 0)
+            path = self._leased_path(lease)
+            expires = time.time() + lease_seconds
+            try:
+                # The file enters leased/ already carrying its expiry
+                os.utime(self._path("queued", name), (expires, expires))
+                os.rename(self._path("queued", name), path)
+            except FileNotFoundError:
+                # Another worker took it first
+                continue
+
+            with open(path, "rb") as f:
+                record = json.loads(f.read())
+            record["attempts"] += 1
+            record["worker"] = worker
+            atomic_write(path, json.dumps(record).encode("utf-8"), mtime=expires)
+            return lease._replace(attempts=record["attempts"])
+        return None
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        expires = time.time() + lease_seconds
+        try:
+            os.utime(self._leased_path(lease), (expires, expires))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def ack(self, lease: Lease) -> None:
+        try:
+            os.remove(self._leased_path(lease))
+        except FileNotFoundError:
+            return
+        self._forget(lease.job_id)
+
+    def reap(self) -> Tuple[List[Lease], List[Lease]]:
+        requeued, abandoned = [], []
+        now = time.time()
+        for entry in os.scandir(os.path.join(self.directory, "leased")):
+            try:
+                if not entry.name.endswith(".json") or entry.stat().st_mtime >= now:
+                    continue
+                with open(entry.path, "rb") as f:
+                    record = json.loads(f.read())
+            except (FileNotFoundError, ValueError):
+                continue
+
+            job_id = record["job_id"]
+            token = entry.name[len(job_id) + 1 : -len(".json")]
+            lease = Lease(job_id, record.get("worker", ""), token, record["attempts"])
+            give_up = record["attempts"] >= self.max_attempts
+            target = self._path("dead" if give_up else "queued", f"{job_id}.json")
+            try:
+                # Only one reaper wins the rename
+                os.rename(entry.path, target)
+            except FileNotFoundError:
+                continue
+            if give_up:
+                self._forget(job_id)
+            (abandoned if give_up else requeued).append(lease)
+
+        self._restore_orphans(now)
+        return requeued, abandoned
+
+    def _restore_orphans(self, now: float) -> None:
+        """Queue again the jobs whose marker outlived their queue file."""
+        orphans = set()
+        for entry in os.scandir(os.path.join(self.directory, "members")):
+            try:
+                if entry.stat().st_mtime < now - self.ORPHAN_SECONDS:
+                    orphans.add(entry.name)
+            except FileNotFoundError:
+                continue
+        if not orphans:
+            return
+
+        # Leases move files from queued/ to leased/, so list them in that order
+        for state in ("queued", "leased"):
+            for name in os.listdir(os.path.join(self.directory, state)):
+                orphans.discard(name.split(".", 1)[0])
+        for job_id in orphans:
+            if os.path.exists(self._path("queued", f"{job_id}.json")):
+                continue
+            # A job that has already finished is acked when next leased
+            logger.warning(f"Queueing job {job_id} again after an interrupted put")
+            self._enqueue(job_id)
+
+    def depth(self) -> Dict[str, int]:
+        return {
+            state: sum(
+                1
+                for name in os.listdir(os.path.join(self.directory, state))
+                if name.endswith(".json")
+            )
+            for state in ("queued", "leased")
+        }
+
+
+def _text(value) -> Optional[str]:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class RedisJobQueue(JobQueue):
+    """Job queue on a Redis server, for workers spread over many hosts.
+
+    Leases are members of a sorted set scored by their expiry time. Each
+    put, lease, heartbeat, ack and requeue reads the keys it depends on
+    under WATCH and applies all its writes in one MULTI/EXEC transaction,
+    retried if a watched key changed. A worker that dies mid-operation thus
+    leaves the job either still queued or fully leased, never lost.
+    Only plain list, set, hash and sorted set commands are used, so any
+    Redis-compatible server, or an in-process stand-in with the same
+    methods and transaction(), can back it.
+    """
+
+    def __init__(self, client, name: str = "api_engine:jobs", max_attempts: int = 3):
+        """Initialize the queue.
+
+        Args:
+            client: redis.Redis client or a compatible object
+            name: Prefix of the queue's keys
+            max_attempts: See JobQueue
+        """
+        super().__init__(max_attempts)
+        self.client = client
+        self.queued_key = f"{name}:queued"
+        self.members_key = f"{name}:members"
+        self.leased_key = f"{name}:leased"
+        self.leases_key = f"{name}:leases"
+        self.attempts_key = f"{name}:attempts"
+
+    def _transaction(self, function, *keys):
+        """Run function(pipe) under WATCH of keys, returning its value.
+
+        The function reads through the pipeline, calls pipe.multi() and
+        queues its writes, which are executed atomically. It is run again
+        if another client changed a watched key in the meantime.
+        """
+        return self.client.transaction(function, *keys, value_from_callable=True)
+
+    def put(self, job_id: str) -> None:
+        def put(pipe):
+            if pipe.sismember(self.members_key, job_id):
+                return
+            pipe.multi()
+            pipe.sadd(self.members_key, job_id)
+            pipe.lpush(self.queued_key, job_id)
+
+        self._transaction(put, self.members_key)
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Lease]:
+        token = uuid.uuid4().hex
+
+        def lease(pipe):
+            job_id = _text(pipe.lindex(self.queued_key, -1))
+            if job_id is None:
+                return None
+            attempts = int(pipe.hget(self.attempts_key, job_id) or 0) + 1
+            pipe.multi()
+            pipe.rpop(self.queued_key)
+            pipe.hset(
+                self.leases_key,
+                job_id,
+                json.dumps({"worker": worker, "token": token}),
+            )
+            pipe.zadd(self.leased_key, {job_id: time.time() + lease_seconds})
+            pipe.hset(self.attempts_key, job_id, attempts)
+            return Lease(job_id, worker, token, attempts)
+
+        return self._transaction(lease, self.queued_key, self.attempts_key)
+
+    def _holds(self, pipe, lease: Lease) -> bool:
+        current = _text(pipe.hget(self.leases_key, lease.job_id))
+        return current is not None and json.loads(current)["token"] == lease.token
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        def heartbeat(pipe):
+            if not self._holds(pipe, lease):
+                return False
+            pipe.multi()
+            pipe.zadd(
+                self.leased_key, {lease.job_id: time.time() + lease_seconds}, xx=True
+            )
+            return True
+
+        return self._transaction(heartbeat, self.leases_key)
+
+    def ack(self, lease: Lease) -> None:
+        def ack(pipe):
+            if self._holds(pipe, lease):
+                pipe.multi()
+                self._forget(pipe, lease.job_id)
+
+        self._transaction(ack, self.leases_key)
+
+    def _forget(self, pipe, job_id: str) -> None:
+        pipe.zrem(self.leased_key, job_id)
+        pipe.hdel(self.leases_key, job_id)
+        pipe.hdel(self.attempts_key, job_id)
+        pipe.srem(self.members_key, job_id)
+
+    def reap(self) -> Tuple[List[Lease], List[Lease]]:
+        requeued, abandoned = [], []
+        now = time.time()
+
+        def expire(pipe, job_id):
+            # Another reaper or a heartbeat may have got there first
+            expires = pipe.zscore(self.leased_key, job_id)
+            if expires is None or float(expires) > now:
+                return None
+            current = json.loads(_text(pipe.hget(self.leases_key, job_id)) or "{}")
+            attempts = int(pipe.hget(self.attempts_key, job_id) or 0)
+            lease = Lease(
+                job_id, current.get("worker", ""), current.get("token", ""), attempts
+            )
+            give_up = attempts >= self.max_attempts
+            pipe.multi()
+            if give_up:
+                self._forget(pipe, job_id)
+            else:
+                pipe.zrem(self.leased_key, job_id)
+                pipe.hdel(self.leases_key, job_id)
+                # Retried jobs go to the front of the queue
+                pipe.rpush(self.queued_key, job_id)
+            return lease, give_up
+
+        for job_id in self.client.zrangebyscore(self.leased_key, 0, now):
+            job_id = _text(job_id)
+            expired = self._transaction(
+                lambda pipe: expire(pipe, job_id), self.leased_key, self.leases_key
+            )
+            if expired is not None:
+                lease, give_up = expired
+                (abandoned if give_up else requeued).append(lease)
+        return requeued, abandoned
+
+    def depth(self) -> Dict[str, int]:
+        return {
+            "queued": int(self.client.llen(self.queued_key)),
+            "leased": int(self.client.zcard(self.leased_key)),
+        }
+
+
+def open_queue(
+    url: Optional[str], default_db_path: str, max_attempts: int = 3
+) -> JobQueue:
+    """Open the job queue backend named by a URL.
+
+    Args:
+        url: One of sqlite:///<path> (sqlite:////<absolute path>),
+            file://<directory> or redis://<host>:<port>/<db>. Empty for a
+            SQLite queue in default_db_path.
+        default_db_path: Database of the job store
+        max_attempts: See JobQueue
+
+    Returns:
+        JobQueue: The queue
+
+    Raises:
+        ValueError: If the URL is not supported
+    """
+    if not url:
+        return SqliteJobQueue(default_db_path, max_attempts)
+    if url.startswith("sqlite:///"):
+        return SqliteJobQueue(url[len("sqlite:///") :], max_attempts)
+    if url.startswith("file://"):
+        return FileJobQueue(url[len("file://") :], max_attempts)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if redis is None:
+            raise ValueError("The redis job queue requires the redis package")
+        return RedisJobQueue(redis.Redis.from_url(url), max_attempts=max_attempts)
+    raise ValueError(f"Unsupported job queue URL: {url}")
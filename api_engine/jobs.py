@@ -0,0 +1,741 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from api_engine.job_queue import JobQueue, Lease, SqliteJobQueue
+from api_engine.models import Job, JobEvent, WorkerStats
+from api_engine.workspace import new_run_id
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    request_type TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    error TEXT,
+    result TEXT,
+    cache_key TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_ids TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    stats TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first schema version, applied to existing databases
+_MIGRATIONS = {
+    "cache_key": "ALTER TABLE jobs ADD COLUMN cache_key TEXT",
+    "attempts": "ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+    "run_ids": "ALTER TABLE jobs ADD COLUMN run_ids TEXT",
+}
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_cache_key ON jobs (cache_key, status, finished_at);
+"""
+
+
+class JobStore:
+    """SQLite-backed store of pipeline jobs shared by every process on a host.
+
+    Queued jobs are handed to workers through a JobQueue, by default a
+    SQLite queue in the same database.
+    """
+
+    def __init__(self, db_path: str, queue: Optional[JobQueue] = None):
+        """Initialize the store and create its schema if needed.
+
+        Args:
+            db_path: Path of the SQLite database file
+            queue: Queue delivering the jobs to workers
+        """
+        self.db_path = db_path
+        self.queue = queue or SqliteJobQueue(db_path)
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in _MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+            conn.executescript(_INDEXES)
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived autocommit connection."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def create(
+        self,
+        url: str,
+        request_type: str,
+        options: Dict = None,
+        cache_key: Optional[str] = None,
+    ) -> Job:
+        """Queue a new job.
+
+        Args:
+            url: The URL to analyze
+            request_type: HTTP method to filter
+            options: Extra pipeline run options, e.g. {"profile": True}
+            cache_key: Optional key identifying equivalent scans
+
+        Returns:
+            Job: The queued job
+        """
+        job = self._new_job(url, request_type, options)
+        with self._connect() as conn:
+            self._insert(conn, job, cache_key)
+        self.queue.put(job.id)
+        return job
+
+    def find_or_create(
+        self, url: str, request_type: str, options: Dict, cache_key: str
+    ) -> Tuple[Job, bool]:
+        """Attach to an unfinished job with the same cache key, or queue one.
+
+        The lookup and insert happen in one transaction, so concurrent
+        submissions from any process end up sharing a single job.
+
+        Args:
+            url: The URL to analyze
+            request_type: HTTP method to filter
+            options: Extra pipeline run options
+            cache_key: Key identifying equivalent scans
+
+        Returns:
+            tuple: (job, created) where created is False for an existing job
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE cache_key = ?"
+                    " AND status IN ('queued', 'running')"
+                    " ORDER BY created_at LIMIT 1",
+                    (cache_key,),
+                ).fetchone()
+                if row is None:
+                    job = self._new_job(url, request_type, options)
+                    self._insert(conn, job, cache_key)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if row is not None:
+            return self._to_job(row), False
+        self.queue.put(job.id)
+        return job, True
+
+    def latest_succeeded(self, cache_key: str) -> Optional[Job]:
+        """Return the most recently finished successful job for a cache key."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE cache_key = ? AND status = 'succeeded'"
+                " ORDER BY finished_at DESC LIMIT 1",
+                (cache_key,),
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def _new_job(self, url: str, request_type: str, options: Dict = None) -> Job:
+        return Job(
+            id=uuid.uuid4().hex,
+            url=url,
+            request_type=request_type,
+            status="queued",
+            options=options or {},
+            created_at=time.time(),
+        )
+
+    def _insert(self, conn: sqlite3.Connection, job: Job, cache_key=None) -> None:
+        conn.execute(
+            "INSERT INTO jobs"
+            " (id, url, request_type, options, status, created_at, cache_key)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                job.id,
+                job.url,
+                job.request_type,
+                json.dumps(job.options),
+                job.status,
+                job.created_at,
+                cache_key,
+            ),
+        )
+
+    def start(
+        self, job_id: str, worker: str, run_id: str, attempts: int
+    ) -> Optional[Job]:
+        """Mark a leased job running, unless it has already finished.
+
+        A job is still running when its earlier worker lost the lease, e.g.
+        by crashing, and the queue delivered it again.
+
+        Args:
+            job_id: ID of the leased job
+            worker: Identifier of the worker running it
+            run_id: Run ID of this attempt, added to the job's run_ids
+            attempts: Deliveries of the job so far, from the lease
+
+        Returns:
+            Job: The running job, or None if it finished or does not exist
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE id = ? AND status IN ('queued', 'running')",
+                    (job_id,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                job = self._to_job(row)
+                job.status = "running"
+                job.started_at = time.time()
+                job.worker = worker
+                job.attempts = attempts
+                job.run_ids.append(run_id)
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, worker = ?,"
+                    " attempts = ?, run_ids = ? WHERE id = ?",
+                    (
+                        job.started_at,
+                        worker,
+                        attempts,
+                        json.dumps(job.run_ids),
+                        job_id,
+                    ),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def requeue(self, lease: Lease) -> None:
+        """Mark a job whose worker lost its lease queued again."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL"
+                " WHERE id = ? AND status = 'running'",
+                (lease.job_id,),
+            )
+        if cursor.rowcount:
+            self.add_event(
+                lease.job_id,
+                "retry",
+                {"attempts": lease.attempts, "worker": lease.worker},
+            )
+
+    def abandon(self, lease: Lease) -> bool:
+        """Fail a job whose worker lost the lease of its last allowed attempt.
+
+        Returns:
+            bool: True if the job was failed, False if it had already finished
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ?"
+                " WHERE id = ? AND status IN ('queued', 'running')",
+                (
+                    time.time(),
+                    f"Worker {lease.worker} stopped responding "
+                    f"(attempt {lease.attempts} of {self.queue.max_attempts})",
+                    lease.job_id,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def enqueue_pending(self) -> int:
+        """Put queued jobs missing from the queue back into it.
+
+        Covers jobs created before the queue existed and jobs whose process
+        stopped between creating and queueing them.
+
+        Returns:
+            int: Number of queued jobs
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+        for row in rows:
+            self.queue.put(row["id"])
+        return len(rows)
+
+    def complete(self, job: Job, result_json: str) -> bool:
+        """Mark a job succeeded and store its serialized ApiDetectionResults.
+
+        Args:
+            job: The job as returned by start()
+            result_json: Serialized results of the run
+
+        Returns:
+            bool: False if the job no longer runs under this attempt, e.g.
+            its lease expired and it was requeued, and nothing was stored
+        """
+        return self._finish(job, "succeeded", "result", result_json)
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Mark a job failed with an error message.
+
+        Args:
+            job: The job as returned by start()
+            error: Error message
+
+        Returns:
+            bool: False if the job no longer runs under this attempt
+        """
+        return self._finish(job, "failed", "error", error)
+
+    def _finish(self, job: Job, status: str, column: str, value: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = ?, finished_at = ?, {column} = ?"
+                " WHERE id = ? AND status = 'running' AND worker = ? AND attempts = ?",
+                (status, time.time(), value, job.id, job.worker, job.attempts),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job with its results, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def status(self, job_id: str) -> Optional[str]:
+        """Return a job's status without loading its results."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row["status"] if row else None
+
+    def add_event(self, job_id: str, event_type: str, data: Dict) -> None:
+        """Append a progress event to a job's event log.
+
+        Args:
+            job_id: ID of the job the event belongs to
+            event_type: Event name, e.g. "stage_finished" or "endpoint"
+            data: JSON-serializable event payload
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO job_events (job_id, type, data, created_at)"
+                " VALUES (?, ?, ?, ?)",
+                (job_id, event_type, json.dumps(data), time.time()),
+            )
+
+    def events(self, job_id: str, after_id: int = 0) -> List[JobEvent]:
+        """Return a job's progress events newer than after_id, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM job_events WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, after_id),
+            ).fetchall()
+        return [
+            JobEvent(
+                id=row["id"],
+                job_id=row["job_id"],
+                type=row["type"],
+                data=json.loads(row["data"]),
+                created_at=row["created_at"],
+            )
+            for row in rows
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs in each status."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def record_worker(self, stats: WorkerStats) -> None:
+        """Publish a job runner's throughput for the workers overview."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (worker, stats, updated_at)"
+                " VALUES (?, ?, ?)",
+                (stats.worker, stats.model_dump_json(), stats.updated_at),
+            )
+
+    def workers(self, max_age: float = 300.0) -> List[WorkerStats]:
+        """Return the stats of the job runners that reported recently.
+
+        Args:
+            max_age: Seconds after which a silent runner is left out
+
+        Returns:
+            List[WorkerStats]: One entry per runner, by worker identifier
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT stats FROM workers WHERE updated_at >= ? ORDER BY worker",
+                (time.time() - max_age,),
+            ).fetchall()
+        return [WorkerStats.model_validate_json(row["stats"]) for row in rows]
+
+    def _to_job(self, row: sqlite3.Row) -> Job:
+        return Job(
+            id=row["id"],
+            url=row["url"],
+            request_type=row["request_type"],
+            status=row["status"],
+            options=json.loads(row["options"] or "{}"),
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            worker=row["worker"],
+            error=row["error"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            attempts=row["attempts"],
+            run_ids=json.loads(row["run_ids"] or "[]"),
+        )
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class JobRunner:
+    """Runs queued jobs on a bounded pool of background worker threads.
+
+    Workers lease jobs from the store's queue, so any number of processes,
+    on one host or many, can each run a pool against the same queue. A
+    maintenance thread heartbeats the leases of running jobs, requeues the
+    jobs of workers that stopped responding and publishes this runner's
+    throughput. A retried job resumes from the stage artifacts its earlier
+    attempt left in the shared output directory.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        pipeline_factory: Callable,
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0,
+    ):
+        """Initialize the runner.
+
+        Args:
+            store: Job store to take jobs from
+            pipeline_factory: Callable returning a new ApiDetectionPipeline
+            workers: Number of worker threads
+            poll_interval: Seconds an idle worker waits before polling again
+            lease_seconds: Seconds a job stays leased to a worker without a
+                heartbeat; heartbeats are sent every third of it
+        """
+        self.store = store
+        self.queue = store.queue
+        self.pipeline_factory = pipeline_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._leases = {}
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started_at = None
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        self._lost_leases = 0
+
+    def start(self) -> None:
+        """Start the worker threads if they are not running yet."""
+        if self._threads:
+            return
+        self._stop.clear()
+        self._started_at = time.time()
+        try:
+            self.store.enqueue_pending()
+        except Exception as e:
+            logger.error(f"Failed to queue pending jobs: {str(e)}")
+
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work,
+                args=(f"{self.worker_prefix}:{i}",),
+                name=f"job-worker-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(
+            target=self._maintain, name="job-maintenance", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Started {self.workers} job workers")
+
+    def stop(self, timeout: float = None) -> None:
+        """Ask the workers to exit once their current job finishes.
+
+        Jobs still running when the timeout expires keep their lease until
+        it runs out, and are then retried by another worker.
+        """
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, url: str, request_type: str, options: Dict = None) -> Job:
+        """Queue a job and wake an idle worker.
+
+        Args:
+            url: The URL to analyze
+            request_type: HTTP method to filter
+            options: Extra pipeline run options
+
+        Returns:
+            Job: The queued job
+        """
+        job = self.store.create(url, request_type, options)
+        self.wake()
+        return job
+
+    def wake(self) -> None:
+        """Wake an idle worker to lease a newly queued job."""
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def stats(self) -> Dict:
+        """Return queue depth, utilization and throughput of this runner."""
+        counts = self.store.counts()
+        worker = self.worker_stats()
+        capacity = (worker.updated_at - worker.started_at) * self.workers
+        return {
+            "queue_depth": counts["queued"],
+            "jobs": counts,
+            "workers": self.workers,
+            "busy_workers": worker.busy,
+            "utilization": worker.busy / self.workers if self.workers else 0.0,
+            "average_utilization": (
+                worker.busy_seconds / capacity if capacity else 0.0
+            ),
+            "completed": worker.completed,
+            "failed": worker.failed,
+            "retried": worker.retried,
+            "lost_leases": worker.lost_leases,
+            "jobs_per_minute": worker.jobs_per_minute,
+            "average_job_seconds": worker.average_job_seconds,
+        }
+
+    def worker_stats(self) -> WorkerStats:
+        """Return this runner's throughput since it started."""
+        now = time.time()
+        started_at = self._started_at or now
+        with self._lock:
+            finished = self._completed + self._failed
+            uptime = now - started_at
+            return WorkerStats(
+                worker=self.worker_prefix,
+                threads=self.workers,
+                busy=self._busy,
+                started_at=started_at,
+                updated_at=now,
+                completed=self._completed,
+                failed=self._failed,
+                retried=self._retried,
+                lost_leases=self._lost_leases,
+                busy_seconds=self._busy_seconds,
+                jobs_per_minute=finished * 60 / uptime if uptime else 0.0,
+                average_job_seconds=(
+                    self._busy_seconds / finished if finished else 0.0
+                ),
+            )
+
+    def _work(self, worker: str) -> None:
+        while not self._stop.is_set():
+            try:
+                lease = self.queue.lease(worker, self.lease_seconds)
+                job = None
+                if lease is not None:
+                    job = self.store.start(
+                        lease.job_id, worker, new_run_id(), lease.attempts
+                    )
+                    if job is None:
+                        # Finished before its last worker could ack it
+                        self.queue.ack(lease)
+                        continue
+            except Exception as e:
+                # The lease, if any, expires and the job is retried
+                logger.error(f"Failed to lease job: {str(e)}")
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            with self._lock:
+                self._busy += 1
+                self._leases[worker] = lease
+            started = time.perf_counter()
+            try:
+                self._run_job(job)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._busy_seconds += time.perf_counter() - started
+                    self._leases.pop(worker, None)
+                try:
+                    self.queue.ack(lease)
+                except Exception as e:
+                    logger.error(f"Failed to ack job {job.id}: {str(e)}")
+
+    def _maintain(self) -> None:
+        """Heartbeat running jobs, retry lost ones and publish throughput."""
+        interval = self.lease_seconds / 3
+        while True:
+            with self._lock:
+                leases = list(self._leases.items())
+            for worker, lease in leases:
+                try:
+                    if not self.queue.heartbeat(lease, self.lease_seconds):
+                        # The job may already be running elsewhere, so the
+                        # result of this attempt is discarded when it finishes
+                        logger.warning(
+                            f"Worker {worker} lost the lease of job {lease.job_id}"
+                        )
+                        with self._lock:
+                            self._lost_leases += 1
+                            if self._leases.get(worker) == lease:
+                                del self._leases[worker]
+                except Exception as e:
+                    logger.error(f"Failed to heartbeat job {lease.job_id}: {str(e)}")
+
+            try:
+                self._reap()
+                # A web process with no worker threads only reaps
+                if self.workers:
+                    self.store.record_worker(self.worker_stats())
+            except Exception as e:
+                logger.error(f"Job queue maintenance failed: {str(e)}")
+
+            if self._stop.wait(interval):
+                return
+
+    def _reap(self) -> None:
+        """Requeue or abandon the jobs whose lease expired."""
+        requeued, abandoned = self.queue.reap()
+        for lease in requeued:
+            logger.warning(
+                f"Retrying job {lease.job_id} after worker {lease.worker} "
+                f"stopped responding (attempt {lease.attempts})"
+            )
+            self.store.requeue(lease)
+            with self._lock:
+                self._retried += 1
+        for lease in abandoned:
+            logger.error(
+                f"Giving up on job {lease.job_id} after {lease.attempts} attempts"
+            )
+            if self.store.abandon(lease):
+                job = self.store.get(lease.job_id)
+                _remove_files(job.options.get("owned_files", []))
+        if requeued:
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    def _run_job(self, job: Job) -> None:
+        logger.info(f"Running job {job.id} for {job.url} (attempt {job.attempts})")
+        options = dict(job.options)
+        # Files handed over to the job, e.g. an uploaded HAR, go once it has
+        # finished; a retry still needs them
+        owned_files = options.pop("owned_files", [])
+        pipeline = None
+        try:
+            pipeline = self.pipeline_factory()
+            success, api_results, _ = pipeline.run(
+                job.url,
+                job.request_type,
+                progress=lambda event, data: self.store.add_event(job.id, event, data),
+                run_id=job.run_ids[-1],
+                # Pick up where an interrupted earlier attempt stopped
+                resume=job.run_ids[-2] if len(job.run_ids) > 1 else None,
+                **options,
+            )
+            succeeded = bool(success and api_results)
+            if succeeded:
+                stored = self.store.complete(job, api_results.model_dump_json())
+            else:
+                stored = self.store.fail(job, "Pipeline execution failed")
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed: {str(e)}")
+            succeeded = False
+            stored = self.store.fail(job, str(e))
+        finally:
+            # A pooled browser belongs to this thread and would otherwise keep
+            # its pool slot while the worker waits for its next job
+            browser_pool = pipeline.resources.browser_pool if pipeline else None
+            if browser_pool:
+                browser_pool.release()
+
+        if not stored:
+            logger.warning(
+                f"Discarding the result of job {job.id} attempt {job.attempts}: "
+                "the job was requeued or finished by another worker"
+            )
+            return
+        with self._lock:
+            if succeeded:
+                self._completed += 1
+            else:
+                self._failed += 1
+        _remove_files(owned_files)
@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from api_engine.filter import method_set
+from api_engine.models import (
+    ApiDetectionResults,
+    EndpointAnalysisBatch,
+    FilteredEndpoint,
+    KnownEndpoint,
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS endpoints (
+    site TEXT NOT NULL,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    explanation TEXT,
+    usefulness_score INTEGER,
+    necessary_headers TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_changed REAL NOT NULL,
+    last_validated REAL,
+    run_id TEXT,
+    PRIMARY KEY (site, method, url)
+);
+CREATE INDEX IF NOT EXISTS endpoints_site_seen ON endpoints (site, last_seen);
+CREATE INDEX IF NOT EXISTS endpoints_url ON endpoints (url);
+"""
+
+
+def site_key(url: str) -> str:
+    """Return the site a scanned URL belongs to, its lower-cased host and port."""
+    return urlparse(url).netloc.lower()
+
+
+def har_site(har_data: Dict) -> str:
+    """Return the site of a HAR's first request, normally the page itself."""
+    entries = har_data["log"]["entries"]
+    return site_key(entries[0]["request"]["url"]) if entries else ""
+
+
+def endpoint_fingerprint(endpoint: FilteredEndpoint) -> str:
+    """Fingerprint the shape of an endpoint's requests.
+
+    Covers the URL, methods, query parameter names, sample header names and
+    the top-level keys of a JSON body. Values are left out, since tokens,
+    timestamps and cache busters change on every capture.
+
+    Args:
+        endpoint: The filtered endpoint
+
+    Returns:
+        str: Hex digest identifying the endpoint's shape
+    """
+    body_shape = None
+    if endpoint.sample_post_data:
+        try:
+            body = json.loads(endpoint.sample_post_data)
+            body_shape = sorted(body) if isinstance(body, dict) else type(body).__name__
+        except ValueError:
+            body_shape = "text"
+
+    shape = {
+        "url": endpoint.url,
+        "methods": sorted(endpoint.methods),
+        "params": sorted(endpoint.params),
+        "headers": sorted(name.lower() for name in endpoint.sample_headers),
+        "body": body_shape,
+    }
+    return hashlib.sha256(json.dumps(shape, sort_keys=True).encode()).hexdigest()
+
+
+class EndpointKnowledgeStore:
+    """SQLite-backed store of the endpoints discovered on each site across runs.
+
+    Holds each endpoint's fingerprint, LLM analysis and minimal headers, so a
+    re-scan only analyzes and probes endpoints that are new or have changed
+    shape. An endpoint the analyzer did not find valuable is kept without an
+    analysis, so it is not sent to the LLM again while it is unchanged.
+    """
+
+    def __init__(self, db_path: str):
+        """Initialize the store and create its schema if needed.
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived autocommit connection."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def unchanged(
+        self, site: str, method: str, fingerprints: Dict[str, str]
+    ) -> Dict[str, KnownEndpoint]:
+        """Return the stored endpoints whose fingerprint matches a new capture.
+
+        Args:
+            site: Site the capture was taken from
+            method: Method selection the capture was filtered for
+            fingerprints: URL to fingerprint of each endpoint in the capture
+
+        Returns:
+            Dict: URL to KnownEndpoint for each unchanged endpoint
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM endpoints WHERE site = ? AND method = ?",
+                (site, method),
+            ).fetchall()
+
+        known = {}
+        for row in rows:
+            if fingerprints.get(row["url"]) == row["fingerprint"]:
+                known[row["url"]] = self._to_endpoint(row)
+        return known
+
+    def record(
+        self,
+        site: str,
+        method: str,
+        run_id: str,
+        fingerprints: Dict[str, str],
+        analyses: EndpointAnalysisBatch,
+        results: ApiDetectionResults,
+    ) -> None:
+        """Save what a successful run learned about a site's endpoints.
+
+        Unchanged endpoints keep their minimal headers when the run did not
+        produce new ones; an endpoint whose fingerprint changed takes this
+        run's analysis and headers, or none. With several methods, an
+        endpoint keeps the headers of the first method documented for it.
+
+        Args:
+            site: Site the run scanned
+            method: Method selection the run filtered for, as normalized by
+                normalize_methods
+            run_id: ID of the run
+            fingerprints: URL to fingerprint of each endpoint in the capture
+            analyses: Analyses of the valuable endpoints, reused ones included
+            results: The run's documented endpoints
+        """
+        analysis_by_url = {a.url: a for a in analyses.endpoints}
+        methods = method_set(method)
+        headers_by_url = {}
+        for doc in results.endpoints:
+            if methods is None or doc.method in methods:
+                headers_by_url.setdefault(doc.url, doc.required_headers)
+
+        now = time.time()
+        rows = []
+        for url, fingerprint in fingerprints.items():
+            analysis = analysis_by_url.get(url)
+            headers = headers_by_url.get(url)
+            rows.append(
+                (
+                    site,
+                    method,
+                    url,
+                    fingerprint,
+                    analysis.explanation if analysis else None,
+                    analysis.usefulness_score if analysis else None,
+                    json.dumps(headers) if headers is not None else None,
+                    now,
+                    now,
+                    now,
+                    now if headers is not None else None,
+                    run_id,
+                )
+            )
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO endpoints"
+                    " (site, method, url, fingerprint, explanation, usefulness_score,"
+                    " necessary_headers, first_seen, last_seen, last_changed,"
+                    " last_validated, run_id)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (site, method, url) DO UPDATE SET"
+                    " necessary_headers = CASE"
+                    "  WHEN fingerprint = excluded.fingerprint"
+                    "  THEN COALESCE(excluded.necessary_headers, necessary_headers)"
+                    "  ELSE excluded.necessary_headers END,"
+                    " last_validated = CASE"
+                    "  WHEN fingerprint = excluded.fingerprint"
+                    "  THEN COALESCE(excluded.last_validated, last_validated)"
+                    "  ELSE excluded.last_validated END,"
+                    " last_changed = CASE"
+                    "  WHEN fingerprint = excluded.fingerprint THEN last_changed"
+                    "  ELSE excluded.last_changed END,"
+                    " fingerprint = excluded.fingerprint,"
+                    " explanation = excluded.explanation,"
+                    " usefulness_score = excluded.usefulness_score,"
+                    " last_seen = excluded.last_seen,"
+                    " run_id = excluded.run_id",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Recorded {len(rows)} endpoints of {site} in the knowledge store")
+
+    def query(
+        self,
+        site: Optional[str] = None,
+        method: Optional[str] = None,
+        min_score: Optional[int] = None,
+        seen_since: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[KnownEndpoint]:
+        """Return stored endpoints, most useful first.
+
+        Args:
+            site: Only endpoints of this site
+            method: Only endpoints scanned for this method selection, such as
+                GET or GET,POST
+            min_score: Only endpoints with at least this usefulness score;
+                endpoints without an analysis are then left out
+            seen_since: Only endpoints seen in a capture at or after this time
+            limit: Maximum number of endpoints to return
+
+        Returns:
+            List[KnownEndpoint]: The matching endpoints
+        """
+        clauses, params = [], []
+        for clause, value in (
+            ("site = ?", site),
+            ("method = ?", method),
+            ("usefulness_score >= ?", min_score),
+            ("last_seen >= ?", seen_since),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+
+        sql = "SELECT * FROM endpoints"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY usefulness_score IS NULL, usefulness_score DESC, url LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._to_endpoint(row) for row in rows]
+
+    def sites(self) -> List[Dict]:
+        """Return each site with its endpoint count and last capture time."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT site, COUNT(*) AS endpoints,"
+                " SUM(usefulness_score IS NOT NULL) AS valuable,"
+                " MAX(last_seen) AS last_seen"
+                " FROM endpoints GROUP BY site ORDER BY last_seen DESC"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _to_endpoint(self, row: sqlite3.Row) -> KnownEndpoint:
+        return KnownEndpoint(
+            site=row["site"],
+            url=row["url"],
+            method=row["method"],
+            fingerprint=row["fingerprint"],
+            explanation=row["explanation"],
+            usefulness_score=row["usefulness_score"],
+            necessary_headers=(
+                json.loads(row["necessary_headers"])
+                if row["necessary_headers"]
+                else None
+            ),
+            first_seen=row["first_seen"],
+            last_seen=row["last_seen"],
+            last_changed=row["last_changed"],
+            last_validated=row["last_validated"],
+            run_id=row["run_id"],
+        )
@@ -1,7 +1,8 @@
-import json
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from api_engine.models import EndpointAnalysis, EndpointAnalysisBatch, MatchedRequest
+from api_engine.models import EndpointAnalysis, EndpointAnalysisBatch
+from api_engine.records import MatchedRecord
+from api_engine.serialization import ArtifactSerializer
 from utils.logger import get_logger
 
 # Set up logger
@@ -11,45 +12,65 @@ logger = get_logger(__name__)
 class HarMatcher:
     """Matches HAR file requests with valuable endpoints identified by analysis."""
 
+    def __init__(self, serializer: Optional[ArtifactSerializer] = None, parallel=None):
+        """Initialize the matcher.
+
+        Args:
+            serializer: Serializer for the matched requests artifact, compact JSON by default
+            parallel: Optional ParallelHarProcessor that matches HARs large
+                enough to split on a pool of processes
+        """
+        self.serializer = serializer or ArtifactSerializer()
+        self.parallel = parallel
+
     def match(
         self,
         har_data: Dict,
         analyzed_endpoints: EndpointAnalysisBatch,
         output_file: str = None,
-    ) -> Tuple[bool, List[MatchedRequest]]:
+        metrics=None,
+    ) -> Tuple[bool, List[MatchedRecord]]:
         """Match HAR requests with valuable endpoints.
 
         Args:
             har_data: HAR data as dictionary
             analyzed_endpoints: List of analyzed endpoints
             output_file: Optional output path for matched requests
+            metrics: Optional StageMetrics to record counters on
 
         Returns:
-            tuple: (success, matched_requests)
+            tuple: (success, matched_requests), as MatchedRecord tuples
         """
         try:
-            # Load HAR requests
-            har_requests = self._extract_har_requests(har_data)
-            logger.info(f"Extracted {len(har_requests)} requests from HAR data")
-
             # Extract valuable endpoints
             valuable_endpoints = [
                 endpoint.url for endpoint in analyzed_endpoints.endpoints
             ]
             logger.info(f"Found {len(valuable_endpoints)} valuable endpoints to match")
 
-            # Match endpoints with HAR requests
-            matched_requests = self._match_endpoints(har_requests, valuable_endpoints)
+            if self.parallel and self.parallel.should_split(har_data):
+                matched_requests = self.parallel.match_har(har_data, valuable_endpoints)
+            else:
+                # Load HAR requests
+                har_requests = self._extract_har_requests(har_data)
+                logger.info(f"Extracted {len(har_requests)} requests from HAR data")
+
+                # Match endpoints with HAR requests
+                matched_requests = self._match_endpoints(
+                    har_requests, valuable_endpoints
+                )
             logger.info(f"Found {len(matched_requests)} matched requests")
 
+            if metrics is not None:
+                metrics.record_har(har_data)
+                metrics.endpoints_in = len(valuable_endpoints)
+                metrics.endpoints_out = len(matched_requests)
+
             # Optionally save matched requests
             if output_file:
-                with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(
-                        [request.model_dump() for request in matched_requests],
-                        f,
-                        indent=4,
-                    )
+                self.serializer.dump(
+                    [request._asdict() for request in matched_requests], output_file
+                )
                 logger.info(f"Matched requests saved to {output_file}")
 
             return True, matched_requests
@@ -57,28 +78,28 @@ class HarMatcher:
             logger.error(f"Error matching HAR requests: {str(e)}")
             return False, []
 
-    def _extract_har_requests(self, har_data: Dict) -> List[dict]:
+    def _extract_har_requests(self, har_data: Dict) -> List[MatchedRecord]:
         """Extract requests from HAR data."""
         requests = []
         for entry in har_data["log"]["entries"]:
             request = entry["request"]
-            response = entry["response"]
 
             requests.append(
-                {
-                    "url": request["url"].split("?")[0],
-                    "method": request["method"],
-                    "headers": {h["name"]: h["value"] for h in request["headers"]},
-                    "status_code": response["status"],
-                }
+                MatchedRecord(
+                    request["url"].split("?")[0],
+                    request["method"],
+                    {h["name"]: h["value"] for h in request["headers"]},
+                    entry["response"]["status"],
+                )
             )
 
         return requests
 
     def _extract_valuable_endpoints(self, file_path: str) -> List[str]:
         """Extract valuable endpoints from analysis results."""
-        with open(file_path, "r", encoding="utf-8") as f:
-            endpoints_data = json.load(f)
+        endpoints_data = self.serializer.load(file_path)
+        if isinstance(endpoints_data, dict):
+            endpoints_data = endpoints_data.get("endpoints", [])
 
         # Convert to EndpointAnalysis objects if needed for validation
         endpoints = [EndpointAnalysis(**endpoint) for endpoint in endpoints_data]
@@ -86,22 +107,12 @@ class HarMatcher:
         return valuable_endpoints
 
     def _match_endpoints(
-        self, har_requests: List[dict], valuable_endpoints: List[str]
-    ) -> List[MatchedRequest]:
+        self, har_requests: List[MatchedRecord], valuable_endpoints: List[str]
+    ) -> List[MatchedRecord]:
         """Match HAR requests with valuable endpoints."""
-        matched_requests = []
-
-        for request in har_requests:
-            for endpoint in valuable_endpoints:
-                if request["url"].startswith(endpoint):
-                    # Create a MatchedRequest object using the model
-                    matched_request = MatchedRequest(
-                        url=request["url"],
-                        method=request["method"],
-                        headers=request["headers"],
-                        status_code=request["status_code"],
-                    )
-                    matched_requests.append(matched_request)
-                    break
-
-        return matched_requests
+        if not valuable_endpoints:
+            return []
+
+        # str.startswith tries each prefix in C
+        prefixes = tuple(valuable_endpoints)
+        return [request for request in har_requests if request.url.startswith(prefixes)]
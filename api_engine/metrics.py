@@ -0,0 +1,460 @@
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Name of the thread that samples RSS while a run is measured
+RSS_SAMPLER_THREAD = "rss-sampler"
+
+
+class StageMetrics(BaseModel):
+    """Model representing the instrumentation collected for one pipeline stage."""
+
+    name: str
+    start_time: float = 0.0
+    end_time: float = 0.0
+    wall_time: float = 0.0
+    # CPU seconds of the whole process while the stage ran, so work on
+    # browser, executor and worker threads counts, as do concurrent runs
+    cpu_time: float = 0.0
+    success: bool = True
+    rss_peak_bytes: int = 0
+    har_entries: int = 0
+    har_bytes: int = 0
+    endpoints_in: int = 0
+    endpoints_out: int = 0
+    endpoints_reused: int = 0
+    # Whether the stage's result was taken from an interrupted earlier run
+    resumed: bool = False
+    llm_requests: int = 0
+    llm_prompt_tokens: int = 0
+    llm_completion_tokens: int = 0
+    llm_retries: int = 0
+    header_probes: Dict[str, int] = Field(default_factory=dict)
+    http_status_counts: Dict[str, int] = Field(default_factory=dict)
+
+    def record_har(self, har_data: Dict) -> None:
+        """Record the number of HAR entries and bytes handled by this stage."""
+        entries, size = har_stats(har_data)
+        self.har_entries += entries
+        self.har_bytes += size
+
+    def record_llm_call(self, usage=None) -> None:
+        """Record a completed LLM request and its token usage, if reported."""
+        self.llm_requests += 1
+        if usage is not None:
+            self.llm_prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.llm_completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def record_probe(self, endpoint: str, status: Optional[int]) -> None:
+        """Record one header probe against an endpoint and its HTTP status."""
+        self.header_probes[endpoint] = self.header_probes.get(endpoint, 0) + 1
+        key = str(status) if status is not None else "error"
+        self.http_status_counts[key] = self.http_status_counts.get(key, 0) + 1
+
+
+class PipelineMetrics(BaseModel):
+    """Model representing the instrumentation collected for one pipeline run."""
+
+    run_id: str
+    url: str
+    request_type: str
+    start_time: float = 0.0
+    end_time: float = 0.0
+    wall_time: float = 0.0
+    # CPU seconds of the whole process during the run, see StageMetrics
+    cpu_time: float = 0.0
+    success: bool = False
+    rss_start_bytes: int = 0
+    rss_peak_bytes: int = 0
+    rss_end_bytes: int = 0
+    stages: List[StageMetrics] = Field(default_factory=list)
+
+
+def har_stats(har_data: Optional[Dict]) -> tuple:
+    """Count the entries and payload bytes in HAR data.
+
+    Bytes are the sum of request body sizes and response content sizes as
+    reported by the HAR itself, ignoring the -1 "unknown" markers.
+
+    Args:
+        har_data: HAR data as a dictionary
+
+    Returns:
+        tuple: (entry_count, byte_count)
+    """
+    if not har_data:
+        return 0, 0
+
+    entries = har_data.get("log", {}).get("entries", [])
+    size = 0
+    for entry in entries:
+        request_size = entry.get("request", {}).get("bodySize", 0) or 0
+        response_size = entry.get("response", {}).get("content", {}).get("size", 0) or 0
+        size += max(request_size, 0) + max(response_size, 0)
+
+    return len(entries), size
+
+
+def current_rss() -> int:
+    """Return the resident set size of this process in bytes.
+
+    Reads /proc where available and falls back to the lifetime peak reported
+    by getrusage elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Samples process RSS on a background thread to track peak memory.
+
+    RSS is process-wide, so concurrent runs in one process share the figure.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        """Initialize the sampler.
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> int:
+        """Start sampling and return the current RSS."""
+        rss = current_rss()
+        self.peak = rss
+        self._thread = threading.Thread(
+            target=self._sample, name=RSS_SAMPLER_THREAD, daemon=True
+        )
+        self._thread.start()
+        return rss
+
+    def reset_peak(self) -> int:
+        """Return the peak since the last reset and restart tracking from now."""
+        rss = current_rss()
+        peak = max(self.peak, rss)
+        self.peak = rss
+        return peak
+
+    def stop(self) -> int:
+        """Stop sampling and return the current RSS."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        rss = current_rss()
+        self.peak = max(self.peak, rss)
+        return rss
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+
+class MetricsRecorder:
+    """Collects per-stage metrics for a single pipeline run."""
+
+    def __init__(
+        self,
+        url: str,
+        request_type: str,
+        run_id: Optional[str] = None,
+        listener: Optional[Callable[[str, StageMetrics], None]] = None,
+    ):
+        """Initialize the recorder and start the run clock.
+
+        Args:
+            url: The URL being analyzed
+            request_type: HTTP method being filtered
+            run_id: Optional identifier for the run, generated if omitted
+            listener: Optional callable invoked with ("stage_started", stage)
+                and ("stage_finished", stage) as stages begin and end
+        """
+        self.listener = listener
+        self.metrics = PipelineMetrics(
+            run_id=run_id or uuid.uuid4().hex,
+            url=url,
+            request_type=request_type,
+            start_time=time.time(),
+        )
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        self._rss = RssSampler()
+        self.metrics.rss_start_bytes = self._rss.start()
+        self._run_peak = self.metrics.rss_start_bytes
+
+    def elapsed(self) -> float:
+        """Return the wall time in seconds since the run started."""
+        return time.perf_counter() - self._wall_start
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage and yield its StageMetrics for counters.
+
+        Args:
+            name: Stage name, e.g. "capture" or "filter"
+
+        Yields:
+            StageMetrics: The metrics object for the running stage
+        """
+        stage_metrics = StageMetrics(name=name, start_time=time.time())
+        self.metrics.stages.append(stage_metrics)
+        self._notify("stage_started", stage_metrics)
+        self._run_peak = max(self._run_peak, self._rss.reset_peak())
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield stage_metrics
+        except Exception:
+            stage_metrics.success = False
+            raise
+        finally:
+            stage_metrics.wall_time = time.perf_counter() - wall_start
+            stage_metrics.cpu_time = time.process_time() - cpu_start
+            stage_metrics.end_time = time.time()
+            stage_metrics.rss_peak_bytes = self._rss.reset_peak()
+            self._run_peak = max(self._run_peak, stage_metrics.rss_peak_bytes)
+            self._notify("stage_finished", stage_metrics)
+
+    def _notify(self, event: str, stage_metrics: StageMetrics) -> None:
+        """Pass a stage event to the listener without letting it break the run."""
+        if self.listener is None:
+            return
+        try:
+            self.listener(event, stage_metrics)
+        except Exception as e:
+            logger.error(f"Stage listener failed on {event}: {str(e)}")
+
+    def finish(self, success: bool) -> PipelineMetrics:
+        """Stop the run clock and record the metrics in the process registry.
+
+        Args:
+            success: Whether the pipeline completed successfully
+
+        Returns:
+            PipelineMetrics: The completed run metrics
+        """
+        self.metrics.success = success
+        self.metrics.end_time = time.time()
+        self.metrics.wall_time = time.perf_counter() - self._wall_start
+        self.metrics.cpu_time = time.process_time() - self._cpu_start
+        self.metrics.rss_end_bytes = self._rss.stop()
+        self.metrics.rss_peak_bytes = max(self._run_peak, self._rss.peak)
+        registry.record(self.metrics)
+        return self.metrics
+
+
+def to_spans(metrics: PipelineMetrics) -> Dict:
+    """Convert run metrics into a span-style trace document.
+
+    The run is the root span and each stage is a child span carrying its
+    counters as attributes.
+
+    Args:
+        metrics: Completed run metrics
+
+    Returns:
+        Dict: Trace document with a flat list of spans
+    """
+    root_id = uuid.uuid4().hex[:16]
+    spans = [
+        {
+            "trace_id": metrics.run_id,
+            "span_id": root_id,
+            "parent_id": None,
+            "name": "pipeline.run",
+            "start_time": metrics.start_time,
+            "end_time": metrics.end_time,
+            "duration": metrics.wall_time,
+            "attributes": {
+                "url": metrics.url,
+                "request_type": metrics.request_type,
+                "success": metrics.success,
+                "cpu_time": metrics.cpu_time,
+                "rss_start_bytes": metrics.rss_start_bytes,
+                "rss_peak_bytes": metrics.rss_peak_bytes,
+                "rss_end_bytes": metrics.rss_end_bytes,
+            },
+        }
+    ]
+
+    for stage in metrics.stages:
+        attributes = stage.model_dump(
+            exclude={"name", "start_time", "end_time", "wall_time"}
+        )
+        spans.append(
+            {
+                "trace_id": metrics.run_id,
+                "span_id": uuid.uuid4().hex[:16],
+                "parent_id": root_id,
+                "name": f"pipeline.{stage.name}",
+                "start_time": stage.start_time,
+                "end_time": stage.end_time,
+                "duration": stage.wall_time,
+                "attributes": attributes,
+            }
+        )
+
+    return {"trace_id": metrics.run_id, "spans": spans}
+
+
+class MetricsRegistry:
+    """Process-wide aggregation of pipeline metrics for export.
+
+    Counters are per process; under gunicorn each worker exposes its own.
+    """
+
+    _STAGE_COUNTERS = (
+        "har_entries",
+        "har_bytes",
+        "endpoints_in",
+        "endpoints_out",
+        "endpoints_reused",
+        "llm_requests",
+        "llm_prompt_tokens",
+        "llm_completion_tokens",
+        "llm_retries",
+    )
+
+    def __init__(self, max_traces: int = 50):
+        """Initialize an empty registry.
+
+        Args:
+            max_traces: Number of recent run traces to keep
+        """
+        self._lock = threading.Lock()
+        self._runs = defaultdict(int)
+        self._stage_seconds = defaultdict(float)
+        self._stage_cpu_seconds = defaultdict(float)
+        self._stage_count = defaultdict(int)
+        self._stage_counters = defaultdict(int)
+        self._header_probes = 0
+        self._http_status = defaultdict(int)
+        self._last_peak_rss = 0
+        self._max_peak_rss = 0
+        self._traces = deque(maxlen=max_traces)
+
+    def record(self, metrics: PipelineMetrics) -> None:
+        """Fold a completed run into the registry."""
+        with self._lock:
+            self._runs["success" if metrics.success else "failure"] += 1
+            self._last_peak_rss = metrics.rss_peak_bytes
+            self._max_peak_rss = max(self._max_peak_rss, metrics.rss_peak_bytes)
+            for stage in metrics.stages:
+                self._stage_seconds[stage.name] += stage.wall_time
+                self._stage_cpu_seconds[stage.name] += stage.cpu_time
+                self._stage_count[stage.name] += 1
+                for counter in self._STAGE_COUNTERS:
+                    self._stage_counters[(counter, stage.name)] += getattr(
+                        stage, counter
+                    )
+                self._header_probes += sum(stage.header_probes.values())
+                for status, count in stage.http_status_counts.items():
+                    self._http_status[status] += count
+            self._traces.append(to_spans(metrics))
+
+    def traces(self) -> List[Dict]:
+        """Return the most recent run traces, oldest first."""
+        with self._lock:
+            return list(self._traces)
+
+    def to_prometheus(self) -> str:
+        """Render the registry in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("api_pipeline_runs_total", "counter", "Pipeline runs by outcome.")
+            for status, count in sorted(self._runs.items()):
+                lines.append(f'api_pipeline_runs_total{{status="{status}"}} {count}')
+
+            family(
+                "api_pipeline_stage_seconds",
+                "summary",
+                "Wall time spent in each pipeline stage.",
+            )
+            for stage in sorted(self._stage_count):
+                lines.append(
+                    f'api_pipeline_stage_seconds_sum{{stage="{stage}"}} '
+                    f"{self._stage_seconds[stage]:.6f}"
+                )
+                lines.append(
+                    f'api_pipeline_stage_seconds_count{{stage="{stage}"}} '
+                    f"{self._stage_count[stage]}"
+                )
+
+            family(
+                "api_pipeline_stage_cpu_seconds_total",
+                "counter",
+                "CPU time spent in each pipeline stage.",
+            )
+            for stage in sorted(self._stage_count):
+                lines.append(
+                    f'api_pipeline_stage_cpu_seconds_total{{stage="{stage}"}} '
+                    f"{self._stage_cpu_seconds[stage]:.6f}"
+                )
+
+            for counter in self._STAGE_COUNTERS:
+                name = f"api_pipeline_{counter}_total"
+                family(name, "counter", f"Stage {counter.replace('_', ' ')}.")
+                for (key, stage), value in sorted(self._stage_counters.items()):
+                    if key == counter and value:
+                        lines.append(f'{name}{{stage="{stage}"}} {value}')
+
+            family(
+                "api_pipeline_header_probes_total",
+                "counter",
+                "Header probe requests issued.",
+            )
+            lines.append(f"api_pipeline_header_probes_total {self._header_probes}")
+
+            family(
+                "api_pipeline_probe_responses_total",
+                "counter",
+                "Header probe responses by HTTP status.",
+            )
+            for status, count in sorted(self._http_status.items()):
+                lines.append(
+                    f'api_pipeline_probe_responses_total{{status="{status}"}} {count}'
+                )
+
+            family(
+                "api_pipeline_last_run_peak_rss_bytes",
+                "gauge",
+                "Peak process RSS during the most recent run.",
+            )
+            lines.append(f"api_pipeline_last_run_peak_rss_bytes {self._last_peak_rss}")
+            family(
+                "api_pipeline_max_run_peak_rss_bytes",
+                "gauge",
+                "Highest peak process RSS seen during any run.",
+            )
+            lines.append(f"api_pipeline_max_run_peak_rss_bytes {self._max_peak_rss}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the pipeline and the web app
+registry = MetricsRegistry()
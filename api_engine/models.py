@@ -13,6 +13,29 @@ class ApiRequest(BaseModel):
     post_data: Optional[str] = None
 
 
+class ResponseSummary(BaseModel):
+    """Model representing the shape of an endpoint's sample response."""
+
+    status: Optional[int] = None
+    content_type: Optional[str] = None
+    size: int = 0
+    # JSON type of the body: object, array, string, number, boolean or null
+    json_type: Optional[str] = None
+    # Top-level keys of an object body, or of the first item of an array
+    # body, to their JSON type; arrays are given as array[length]
+    fields: Dict[str, str] = Field(default_factory=dict)
+    length: Optional[int] = None
+    sample: Optional[str] = None
+
+
+class MethodSummary(BaseModel):
+    """Model representing the requests of one method to a filtered endpoint."""
+
+    count: int
+    params: List[str] = Field(default_factory=list)
+    sample_post_data: Optional[str] = None
+
+
 class FilteredEndpoint(BaseModel):
     """Model representing a filtered endpoint for LLM analysis."""
 
@@ -21,6 +44,8 @@ class FilteredEndpoint(BaseModel):
     params: Dict[str, Any] = Field(default_factory=dict)
     sample_headers: Dict[str, str] = Field(default_factory=dict)
     sample_post_data: Optional[str] = None
+    response_summary: Optional[ResponseSummary] = None
+    method_breakdown: Dict[str, MethodSummary] = Field(default_factory=dict)
 
 
 class EndpointAnalysis(BaseModel):
@@ -77,3 +102,100 @@ class ApiDetectionResults(BaseModel):
     """Model representing the complete results of the API detection process."""
 
     endpoints: List[EndpointDocumentation]
+
+
+class KnownEndpoint(BaseModel):
+    """Model representing what earlier scans learned about an endpoint of a site."""
+
+    site: str
+    url: str
+    method: str
+    fingerprint: str
+    explanation: Optional[str] = None
+    usefulness_score: Optional[int] = None
+    necessary_headers: Optional[Dict[str, str]] = None
+    first_seen: float
+    last_seen: float
+    last_changed: float
+    last_validated: Optional[float] = None
+    run_id: Optional[str] = None
+
+
+class Job(BaseModel):
+    """Model representing a queued pipeline run and its outcome."""
+
+    id: str
+    url: str
+    request_type: str
+    status: str
+    options: Dict[str, Any] = Field(default_factory=dict)
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    worker: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[ApiDetectionResults] = None
+    # Deliveries to a worker so far, and the run ID of each attempt
+    attempts: int = 0
+    run_ids: List[str] = Field(default_factory=list)
+
+
+class WorkerStats(BaseModel):
+    """Model representing the throughput of one job runner process."""
+
+    worker: str
+    threads: int
+    busy: int = 0
+    started_at: float
+    updated_at: float
+    completed: int = 0
+    failed: int = 0
+    retried: int = 0
+    lost_leases: int = 0
+    busy_seconds: float = 0.0
+    jobs_per_minute: float = 0.0
+    average_job_seconds: float = 0.0
+
+
+class JobEvent(BaseModel):
+    """Model representing a progress event emitted while a job runs."""
+
+    id: int
+    job_id: str
+    type: str
+    data: Dict[str, Any] = Field(default_factory=dict)
+    created_at: float
+
+
+class ScanTarget(BaseModel):
+    """Model representing one URL of a bulk scan and the methods to scan."""
+
+    url: str
+    methods: List[str] = Field(default_factory=lambda: ["GET"], min_length=1)
+
+
+class BulkScanRequest(BaseModel):
+    """Model representing a bulk scan submission."""
+
+    targets: List[ScanTarget] = Field(min_length=1)
+
+
+class MethodScanResult(BaseModel):
+    """Model representing the outcome of scanning one URL for one method."""
+
+    method: str
+    success: bool
+    run_id: Optional[str] = None
+    error: Optional[str] = None
+    endpoints: List[EndpointDocumentation] = Field(default_factory=list)
+
+
+class TargetScanResult(BaseModel):
+    """Model representing the outcome of scanning one bulk scan target."""
+
+    index: int
+    url: str
+    success: bool
+    elapsed: float
+    error: Optional[str] = None
+    methods: List[MethodScanResult] = Field(default_factory=list)
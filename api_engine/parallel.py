@@ -0,0 +1,385 @@
+import gc
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from api_engine.filter import HarFilter
+from api_engine.har_import import load_har
+from api_engine.matcher import HarMatcher
+from api_engine.metrics import RSS_SAMPLER_THREAD
+from api_engine.models import FilteredEndpoint
+from api_engine.records import MatchedRecord
+from utils.logger import LOG_WRITER_THREAD, get_logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+logger = get_logger(__name__)
+
+# Helper threads a forked child can do without: the log writer is restarted
+# in the child, and the RSS sampler holds no lock outside its own object
+_FORK_SAFE_THREADS = frozenset({LOG_WRITER_THREAD, RSS_SAMPLER_THREAD})
+
+# Entries a forked worker inherits from the calling process
+_worker_entries: List[Dict] = []
+
+
+def _can_fork() -> bool:
+    """Return whether the calling thread can fork workers safely.
+
+    Every other live thread must be one of the daemon helper threads in
+    _FORK_SAFE_THREADS; any other thread might hold a lock the child needs.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return False
+    current = threading.current_thread()
+    return all(
+        thread is current or (thread.daemon and thread.name in _FORK_SAFE_THREADS)
+        for thread in threading.enumerate()
+    )
+
+
+def _init_worker(entries: List[Dict]) -> None:
+    global _worker_entries
+    _worker_entries = entries
+    # Keep the collector from writing to every inherited object, which
+    # would copy the parent's pages into the worker
+    gc.freeze()
+
+
+def _run_range(function, start: int, end: int, argument):
+    """Run function on a range of the inherited entries."""
+    return function(_worker_entries[start:end], argument)
+
+
+def _encode(entries: List[Dict]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(entries)
+    return json.dumps(entries, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(data: memoryview) -> List[Dict]:
+    return orjson.loads(data) if orjson is not None else json.loads(bytes(data))
+
+
+def _filter_entries(entries: List[Dict], request_type: str) -> List[Dict]:
+    """Group one shard's requests into compact per-endpoint aggregates."""
+    har_filter = HarFilter()
+    grouped = har_filter._process_har_data({"log": {"entries": entries}}, request_type)
+    return [
+        endpoint.model_dump()
+        for endpoint in har_filter._convert_to_filtered_endpoints(grouped)
+    ]
+
+
+def _match_entries(
+    entries: List[Dict], valuable_endpoints: List[str]
+) -> List[MatchedRecord]:
+    """Match one shard's requests against the valuable endpoints."""
+    matcher = HarMatcher()
+    requests = matcher._extract_har_requests({"log": {"entries": entries}})
+    return matcher._match_endpoints(requests, valuable_endpoints)
+
+
+def _run_shared(function, name: str, size: int, argument):
+    """Run function on the shard of entries in a shared memory block."""
+    block = shared_memory.SharedMemory(name=name)
+    view = block.buf[:size]
+    try:
+        entries = _decode(view)
+    finally:
+        view.release()
+        block.close()
+    return function(entries, argument)
+
+
+def _filter_file(path: str, request_type: str) -> List[Dict]:
+    # One unreadable archive should not fail a whole corpus
+    try:
+        return _filter_entries(load_har(path)["log"]["entries"], request_type)
+    except Exception as e:
+        logger.error(f"Failed to filter HAR file {path}: {str(e)}")
+        return []
+
+
+def _match_file(path: str, valuable_endpoints: List[str]) -> List[MatchedRecord]:
+    try:
+        return _match_entries(load_har(path)["log"]["entries"], valuable_endpoints)
+    except Exception as e:
+        logger.error(f"Failed to match HAR file {path}: {str(e)}")
+        return []
+
+
+def merge_filtered(parts: Iterable[List[Dict]]) -> List[FilteredEndpoint]:
+    """Merge per-shard endpoint aggregates into global grouped endpoints.
+
+    Parts must come in shard order. The result is then the same as filtering
+    all entries at once: methods and their breakdowns are combined, later
+    query parameter values win, samples come from the first request of each
+    endpoint and the response summary from its first response with a body.
+
+    Args:
+        parts: Each shard's endpoint aggregates as dicts
+
+    Returns:
+        List[FilteredEndpoint]: One endpoint per URL, in first-seen order
+    """
+    merged = {}
+    for part in parts:
+        for endpoint in part:
+            current = merged.get(endpoint["url"])
+            if current is None:
+                merged[endpoint["url"]] = endpoint
+                continue
+            for method in endpoint["methods"]:
+                if method not in current["methods"]:
+                    current["methods"].append(method)
+            current["params"].update(endpoint["params"])
+            for method, summary in endpoint["method_breakdown"].items():
+                known = current["method_breakdown"].get(method)
+                if known is None:
+                    current["method_breakdown"][method] = summary
+                    continue
+                known["count"] += summary["count"]
+                known["params"].extend(
+                    name for name in summary["params"] if name not in known["params"]
+                )
+            # Keep the first summary with a body, as a single pass would
+            summary = current["response_summary"]
+            if (summary is None or not summary["size"]) and (
+                endpoint["response_summary"] and endpoint["response_summary"]["size"]
+            ):
+                current["response_summary"] = endpoint["response_summary"]
+
+    return [FilteredEndpoint(**endpoint) for endpoint in merged.values()]
+
+
+def merge_matched(parts: Iterable[List[MatchedRecord]]) -> List[MatchedRecord]:
+    """Concatenate per-shard matched requests, in shard order."""
+    return [request for part in parts for request in part]
+
+
+class ParallelHarProcessor:
+    """Runs the CPU-bound filter and match loops on a pool of processes.
+
+    A large HAR is split into entry ranges, and a corpus of HAR files is split
+    by file, with each worker loading and parsing its own files. Workers send
+    back compact per-endpoint aggregates instead of per-entry records, which
+    are merged in shard order so results match a single-process run.
+
+    When the calling thread is alone but for the log writer and the RSS
+    sampler, as in the CLI, a large HAR's workers are forked for the call and
+    inherit its entries without copying them. A pool that outlives the call
+    could not see the next HAR, so this pool is not kept.
+
+    Otherwise (job and bulk worker threads, which a forked child could find
+    holding a lock, or a corpus of files) work goes to a pool started with
+    forkserver, or spawn where that is missing. It is started on first use
+    and kept for the processor's lifetime; close() stops it. Each shard of a
+    large HAR is then encoded as JSON, with orjson when installed, into its
+    own shared memory block for the worker to decode. Encoding costs the
+    calling process a fraction of a pickle, and decoding, the expensive
+    half, runs in parallel in the workers.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        min_entries: int = 20000,
+        shards_per_worker: int = 4,
+        start_method: Optional[str] = None,
+    ):
+        """Initialize the processor.
+
+        Args:
+            workers: Number of worker processes, the CPU count by default
+            min_entries: Smallest HAR worth splitting; smaller ones are
+                processed in the calling process
+            shards_per_worker: Entry ranges per worker, so that uneven ranges
+                balance out
+            start_method: multiprocessing start method. By default large
+                HARs fork their workers when that is safe and everything else
+                uses a forkserver (or spawn) pool. "fork" always forks, leaving
+                thread safety to the caller; other methods never inherit
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.min_entries = min_entries
+        self.shards_per_worker = shards_per_worker
+        self.start_method = start_method
+        methods = multiprocessing.get_all_start_methods()
+        self._pool_method = start_method or (
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Return the worker pool, starting it on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self._pool_method),
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a pool whose worker died, so that the next call starts anew."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def close(self) -> None:
+        """Stop the worker processes; the next call starts a new pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def should_split(self, har_data: Dict) -> bool:
+        """Return whether a HAR is large enough to process in parallel."""
+        return self.workers > 1 and len(har_data["log"]["entries"]) >= self.min_entries
+
+    def filter_har(self, har_data: Dict, request_type: str) -> List[FilteredEndpoint]:
+        """Filter and group one HAR's requests across the workers.
+
+        Args:
+            har_data: HAR data as a dictionary
+            request_type: Method selection to filter, see normalize_methods
+
+        Returns:
+            List[FilteredEndpoint]: Grouped endpoints, as HarFilter.filter
+        """
+        entries = har_data["log"]["entries"]
+        return merge_filtered(self._map_ranges(entries, _filter_entries, request_type))
+
+    def match_har(
+        self, har_data: Dict, valuable_endpoints: List[str]
+    ) -> List[MatchedRecord]:
+        """Match one HAR's requests against the valuable endpoints across the workers.
+
+        Args:
+            har_data: HAR data as a dictionary
+            valuable_endpoints: URLs of the endpoints to match
+
+        Returns:
+            List[MatchedRecord]: Matched requests in HAR order, as HarMatcher.match
+        """
+        entries = har_data["log"]["entries"]
+        return merge_matched(
+            self._map_ranges(entries, _match_entries, list(valuable_endpoints))
+        )
+
+    def filter_files(
+        self, har_files: Sequence[str], request_type: str
+    ) -> List[FilteredEndpoint]:
+        """Filter a corpus of HAR files into one set of grouped endpoints.
+
+        Args:
+            har_files: Paths of .har or .har.gz files
+            request_type: Method selection to filter, see normalize_methods
+
+        Returns:
+            List[FilteredEndpoint]: Endpoints grouped across all files
+        """
+        return merge_filtered(self._map_files(har_files, _filter_file, request_type))
+
+    def match_files(
+        self, har_files: Sequence[str], valuable_endpoints: List[str]
+    ) -> List[MatchedRecord]:
+        """Match the requests of a corpus of HAR files against the valuable endpoints.
+
+        Args:
+            har_files: Paths of .har or .har.gz files
+            valuable_endpoints: URLs of the endpoints to match
+
+        Returns:
+            List[MatchedRecord]: Matched requests in file and entry order
+        """
+        return merge_matched(
+            self._map_files(har_files, _match_file, list(valuable_endpoints))
+        )
+
+    def _map_ranges(self, entries: List[Dict], function, argument) -> List:
+        """Run function(entries, argument) over entry ranges, in range order."""
+        shards = max(1, min(len(entries), self.workers * self.shards_per_worker))
+        bounds = [len(entries) * i // shards for i in range(shards + 1)]
+        inherit = (
+            self.start_method == "fork"
+            if self.start_method is not None
+            else _can_fork()
+        )
+        if inherit:
+            return self._map_inherited(entries, bounds, function, argument)
+        return self._map_shared(entries, bounds, function, argument)
+
+    def _map_inherited(
+        self, entries: List[Dict], bounds: List[int], function, argument
+    ) -> List:
+        """Run function over entry ranges in workers forked for this call."""
+        shards = len(bounds) - 1
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, shards),
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(entries,),
+        ) as executor:
+            return list(
+                executor.map(
+                    _run_range,
+                    [function] * shards,
+                    bounds[:-1],
+                    bounds[1:],
+                    [argument] * shards,
+                )
+            )
+
+    def _map_shared(
+        self, entries: List[Dict], bounds: List[int], function, argument
+    ) -> List:
+        """Run function over entry ranges on the pool, via shared memory."""
+        executor = self._pool()
+        blocks, futures = [], []
+        try:
+            # Workers start on the first shards while later ones are encoded
+            for start, end in zip(bounds, bounds[1:]):
+                data = _encode(entries[start:end])
+                block = shared_memory.SharedMemory(create=True, size=len(data))
+                blocks.append(block)
+                block.buf[: len(data)] = data
+                futures.append(
+                    executor.submit(
+                        _run_shared, function, block.name, len(data), argument
+                    )
+                )
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+            # No worker may still be reading a block when it is removed
+            wait(futures)
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def _map_files(self, har_files: Sequence[str], function, argument) -> List:
+        """Run function(path, argument) over the files, in file order."""
+        if not har_files:
+            return []
+        executor = self._pool()
+        try:
+            return list(executor.map(function, har_files, [argument] * len(har_files)))
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
@@ -1,24 +1,82 @@
+import json
 import os
-import time
-from typing import Dict, Optional, Tuple
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, List, Mapping, Optional, Tuple
 
 from api_engine.analyzer import EndpointAnalyzer
 from api_engine.capture import HarCapture
-from api_engine.filter import HarFilter
+from api_engine.filter import HarFilter, normalize_methods
 from api_engine.headers import HeaderOptimizer
+from api_engine.har_import import is_gzip_file, load_har
+from api_engine.knowledge import endpoint_fingerprint, har_site, site_key
 from api_engine.matcher import HarMatcher
-from api_engine.models import ApiDetectionResults
-from utils.logger import get_logger
+from api_engine.metrics import MetricsRecorder, to_spans
+from api_engine.models import (
+    ApiDetectionResults,
+    EndpointAnalysis,
+    EndpointAnalysisBatch,
+    FilteredEndpoint,
+    KnownEndpoint,
+)
+from api_engine.parallel import ParallelHarProcessor
+from api_engine.profiling import NullProfiler, StageProfiler, profiling_requested
+from api_engine.records import MatchedRecord
+from api_engine.resources import ScanResources
+from api_engine.retention import RETENTION_POLICIES, IntermediateStore
+from api_engine.serialization import ArtifactSerializer
+from api_engine.workspace import (
+    Workspace,
+    WorkspaceManager,
+    atomic_copy,
+    atomic_write,
+)
+from utils.logger import get_logger, log_context
 
 # Set up logger
 logger = get_logger(__name__)
 
+# StageMetrics fields included in "stage_finished" progress events
+STAGE_PROGRESS_FIELDS = {
+    "name",
+    "success",
+    "wall_time",
+    "har_entries",
+    "endpoints_in",
+    "endpoints_out",
+    "endpoints_reused",
+    "llm_requests",
+    "resumed",
+}
+
+# Stages whose artifact a retried run can pick up, in stage order, with the
+# stem and possible extensions of the artifact's file name
+_ARTIFACT_EXTENSIONS = (".json", ".json.gz", ".msgpack", ".msgpack.gz")
+RESUMABLE_STAGES = (
+    ("har", "network_traffic", (".har", ".har.gz")),
+    ("filtered", "filtered_requests", _ARTIFACT_EXTENSIONS),
+    ("analyzed", "analyzed_endpoints", _ARTIFACT_EXTENSIONS),
+    ("matched", "matched_requests", _ARTIFACT_EXTENSIONS),
+)
+
 
 class ApiDetectionPipeline:
     """Orchestrates the entire API detection pipeline."""
 
     def __init__(
-        self, output_dir=None, openai_api_key=None, openai_model="gpt-4o-mini"
+        self,
+        output_dir=None,
+        openai_api_key=None,
+        openai_model="gpt-4o-mini",
+        retention="full",
+        spill_dir=None,
+        artifact_format="json",
+        compress_artifacts=False,
+        workspace_retention=None,
+        workspace_quota=None,
+        resources=None,
+        knowledge_store=None,
+        har_workers=None,
     ):
         """Initialize the pipeline.
 
@@ -26,114 +84,594 @@ class ApiDetectionPipeline:
             output_dir: Optional directory to store output files
             openai_api_key: OpenAI API key for endpoint analysis
             openai_model: OpenAI model to use for analysis
+            retention: How intermediate results are kept, one of
+                "full", "summary", "spill" or "none"
+            spill_dir: Directory for spilled intermediate results, defaults to
+                an "intermediate" folder in output_dir or a temporary directory
+            artifact_format: Stage artifact format, one of "json",
+                "json-pretty" or "msgpack"
+            compress_artifacts: Whether to gzip stage artifacts
+            workspace_retention: Seconds to keep finished run workspaces,
+                None to keep them forever
+            workspace_quota: Maximum total bytes of run workspaces, None for
+                no limit
+            resources: Optional ScanResources whose browser pool, LLM
+                dispatcher and probe scheduler are shared with other pipelines
+            knowledge_store: Optional EndpointKnowledgeStore. Endpoints
+                unchanged since an earlier run on the same site then reuse
+                its analysis and have their known headers revalidated with
+                one request instead of being analyzed and probed again.
+            har_workers: Number of processes the filter and match stages
+                split large HARs across, None or 1 to stay in this process
         """
+        if retention not in RETENTION_POLICIES:
+            raise ValueError(f"Unknown retention policy: {retention}")
+
         self.output_dir = output_dir
         self.openai_api_key = openai_api_key
         self.openai_model = openai_model
+        self.retention = retention
+        self.spill_dir = spill_dir
+        self.knowledge_store = knowledge_store
 
-        # Create output directory if specified
+        # Each run writes to its own workspace under <output_dir>/runs so that
+        # concurrent runs never share files
+        self.workspaces = None
         if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
+            self.workspaces = WorkspaceManager(
+                os.path.join(output_dir, "runs"),
+                retention_seconds=workspace_retention,
+                max_bytes=workspace_quota,
+            )
+
+        # All stages write their artifacts through the same serializer
+        self.serializer = ArtifactSerializer(artifact_format, compress_artifacts)
 
         # Initialize component instances
-        self.har_capture = HarCapture()
-        self.har_filter = HarFilter()
+        self.resources = resources or ScanResources()
+        self.har_capture = HarCapture(browser_pool=self.resources.browser_pool)
+        # Large HARs are filtered and matched on a pool of processes
+        self.parallel = (
+            ParallelHarProcessor(workers=har_workers)
+            if har_workers and har_workers > 1
+            else None
+        )
+        self.har_filter = HarFilter(serializer=self.serializer, parallel=self.parallel)
         self.endpoint_analyzer = EndpointAnalyzer(
-            api_key=openai_api_key, model=openai_model
+            api_key=openai_api_key,
+            model=openai_model,
+            serializer=self.serializer,
+            llm_dispatcher=self.resources.llm_dispatcher,
+        )
+        self.har_matcher = HarMatcher(
+            serializer=self.serializer, parallel=self.parallel
+        )
+        self.header_optimizer = HeaderOptimizer(
+            serializer=self.serializer,
+            browser_pool=self.resources.browser_pool,
+            probe_scheduler=self.resources.probe_scheduler,
         )
-        self.har_matcher = HarMatcher()
-        self.header_optimizer = HeaderOptimizer()
-
-        # Define file paths for output if directory is specified
-        if output_dir:
-            self.har_file = os.path.join(output_dir, "network_traffic.har")
-            self.filtered_file = os.path.join(output_dir, "filtered_requests.json")
-            self.analyzed_file = os.path.join(output_dir, "analyzed_endpoints.json")
-            self.matched_file = os.path.join(output_dir, "matched_requests.json")
-            self.headers_file = os.path.join(output_dir, "necessary_headers.json")
-        else:
-            self.har_file = self.filtered_file = self.analyzed_file = (
-                self.matched_file
-            ) = self.headers_file = None
 
     def run(
-        self, url, request_type="GET"
-    ) -> Tuple[bool, Optional[ApiDetectionResults], Dict]:
+        self,
+        url,
+        request_type="GET",
+        profile=None,
+        progress=None,
+        har_data=None,
+        har_file=None,
+        run_id=None,
+        resume=None,
+    ) -> Tuple[bool, Optional[ApiDetectionResults], Mapping]:
         """Run the complete pipeline.
 
         Args:
             url: The URL to analyze
-            request_type: HTTP method to filter (GET, POST, etc.)
+            request_type: HTTP method to filter (GET, POST, etc.), several
+                methods as a comma-separated string or a list, or ALL. All
+                are covered by one capture, filter pass and analysis.
+            profile: Whether to profile each stage, defaults to the
+                PIPELINE_PROFILE environment variable
+            progress: Optional callable invoked as progress(event, data) with
+                "stage_started" and "stage_finished" events carrying the
+                stage's counts, and an "endpoint" event with each
+                EndpointDocumentation as a dict as soon as it is ready
+            har_data: Optional HAR already captured from url; the capture
+                stage then only saves it
+            har_file: Optional path of a .har or .har.gz file to import instead
+                of capturing url live; see run_from_har
+            run_id: Optional identifier for the run, generated if omitted
+            resume: Optional run ID of an interrupted earlier run of the same
+                scan, e.g. by a worker that crashed. The stages whose
+                artifacts it left in its workspace are not run again; the
+                artifacts are linked or copied into this run's workspace.
+                The earlier workspace stays active: its run may still be
+                going on a worker that only lost its lease. It is released
+                when that run ends, or once its marker goes stale if the
+                worker died.
 
         Returns:
-            tuple: (success, api_detection_results, intermediate_data)
+            tuple: (success, api_detection_results, intermediate_data), where
+            intermediate_data is an IntermediateStore filled according to the
+            retention policy and always holds the run's PipelineMetrics under
+            "metrics" and, with an output directory, the run's workspace path
+            under "workspace"
         """
-        start_time = time.time()
-        logger.info(
-            f"Starting API detection pipeline for {url} with {request_type} requests"
+        request_type = normalize_methods(request_type)
+        workspace = self.workspaces.create(run_id) if self.workspaces else None
+        files = self._artifact_paths(workspace)
+        previous = self._resumable_artifacts(resume)
+        emit = self._progress_emitter(progress)
+        recorder = MetricsRecorder(
+            url,
+            request_type,
+            run_id=workspace.run_id if workspace else None,
+            listener=self._stage_listener(emit) if emit else None,
         )
+        # Tag every record logged during the run, from any module, with its ID
+        with log_context(run_id=recorder.metrics.run_id):
+            logger.info(
+                f"Starting API detection pipeline for {url} with {request_type} requests"
+            )
 
-        # Store intermediate results
-        intermediate_data = {}
+            # Store intermediate results
+            intermediate_data = IntermediateStore(
+                self.retention, self._spill_dir(workspace, recorder.metrics.run_id)
+            )
+            intermediate_data.pin("metrics", recorder.metrics)
+            if workspace:
+                intermediate_data.pin("workspace", workspace.path)
+            profiler = self._create_profiler(profile, workspace)
+            success = False
+            if previous:
+                logger.info(
+                    f"Resuming run {resume} after its {list(previous)[-1]} stage"
+                )
+                # The saved HAR is imported like any HAR file
+                if har_data is None:
+                    har_file = previous["har"]
 
-        try:
-            # Step 1: Capture HAR
-            logger.info("Step 1: Capturing HAR traffic")
-            capture_success, har_data = self.har_capture.capture(url, self.har_file)
-            if not capture_success:
-                logger.error("HAR capture failed")
-                return False, None, intermediate_data
+            try:
+                # Step 1: Capture HAR
+                logger.info("Step 1: Capturing HAR traffic")
+                with self._stage(recorder, profiler, "capture") as stage:
+                    if har_data is not None:
+                        capture_success = self._save_har(har_data, files["har"])
+                    elif har_file is not None:
+                        capture_success, har_data = self._import_har(
+                            har_file, files["har"]
+                        )
+                    else:
+                        capture_success, har_data = self.har_capture.capture(
+                            url, files["har"]
+                        )
+                    stage.success = capture_success
+                    stage.resumed = har_file is not None and "har" in previous
+                    if capture_success:
+                        stage.record_har(har_data)
+                if not capture_success:
+                    logger.error("HAR capture failed")
+                    return False, None, intermediate_data
 
-            intermediate_data["har_data"] = har_data
+                intermediate_data.put("har_data", har_data)
 
-            # Step 2: Filter HAR requests
-            logger.info("Step 2: Filtering HAR requests")
-            filter_success, filtered_endpoints = self.har_filter.filter(
-                har_data, request_type, self.filtered_file
-            )
-            if not filter_success:
-                logger.error("HAR filtering failed")
-                return False, None, intermediate_data
+                # Step 2: Filter HAR requests
+                logger.info("Step 2: Filtering HAR requests")
+                with self._stage(recorder, profiler, "filter") as stage:
+                    filtered_endpoints = self._reuse(
+                        previous, "filtered", workspace, stage
+                    )
+                    if filtered_endpoints is not None:
+                        filter_success = True
+                        stage.endpoints_out = len(filtered_endpoints)
+                    else:
+                        filter_success, filtered_endpoints = self.har_filter.filter(
+                            har_data, request_type, files["filtered"], metrics=stage
+                        )
+                    stage.success = filter_success
+                if not filter_success:
+                    logger.error("HAR filtering failed")
+                    return False, None, intermediate_data
 
-            intermediate_data["filtered_endpoints"] = filtered_endpoints
+                intermediate_data.put("filtered_endpoints", filtered_endpoints)
 
-            # Step 3: Analyze endpoints with LLM
-            logger.info("Step 3: Analyzing endpoints with LLM")
-            analysis_success, analyzed_endpoints = self.endpoint_analyzer.analyze(
-                filtered_endpoints, self.analyzed_file
-            )
-            if not analysis_success:
-                logger.error("Endpoint analysis failed")
-                return False, None, intermediate_data
+                # An imported HAR belongs to the site of its first request
+                site = site_key(url) or har_site(har_data)
+                fingerprints, known = self._known_endpoints(
+                    site, request_type, filtered_endpoints
+                )
 
-            intermediate_data["analyzed_endpoints"] = analyzed_endpoints
+                # Step 3: Analyze endpoints with LLM
+                logger.info("Step 3: Analyzing endpoints with LLM")
+                with self._stage(recorder, profiler, "analyze") as stage:
+                    analyzed_endpoints = self._reuse(
+                        previous, "analyzed", workspace, stage
+                    )
+                    if analyzed_endpoints is not None:
+                        analysis_success = True
+                        stage.endpoints_out = len(analyzed_endpoints.endpoints)
+                    else:
+                        analysis_success, analyzed_endpoints = (
+                            self.endpoint_analyzer.analyze(
+                                [e for e in filtered_endpoints if e.url not in known],
+                                None if known else files["analyzed"],
+                                metrics=stage,
+                            )
+                        )
+                    if analysis_success and known and not stage.resumed:
+                        analyzed_endpoints = self._merge_known_analyses(
+                            analyzed_endpoints, known, files["analyzed"]
+                        )
+                        stage.endpoints_reused = len(known)
+                        stage.endpoints_out = len(analyzed_endpoints.endpoints)
+                    stage.success = analysis_success
+                if not analysis_success:
+                    logger.error("Endpoint analysis failed")
+                    return False, None, intermediate_data
 
-            # Step 4: Match HAR requests with valuable endpoints
-            logger.info("Step 4: Matching HAR requests with valuable endpoints")
-            match_success, matched_requests = self.har_matcher.match(
-                har_data, analyzed_endpoints, self.matched_file
-            )
-            if not match_success:
-                logger.error("Request matching failed")
+                intermediate_data.put("analyzed_endpoints", analyzed_endpoints)
+
+                # The filtered endpoints are only needed by the analyzer, apart
+                # from the methods of the endpoints with stored headers
+                filtered_methods = {
+                    e.url: e.methods for e in filtered_endpoints if e.url in known
+                }
+                filtered_endpoints = None
+
+                # Step 4: Match HAR requests with valuable endpoints
+                logger.info("Step 4: Matching HAR requests with valuable endpoints")
+                with self._stage(recorder, profiler, "match") as stage:
+                    matched_requests = self._reuse(
+                        previous, "matched", workspace, stage
+                    )
+                    if matched_requests is not None:
+                        match_success = True
+                        stage.endpoints_out = len(matched_requests)
+                    else:
+                        match_success, matched_requests = self.har_matcher.match(
+                            har_data,
+                            analyzed_endpoints,
+                            files["matched"],
+                            metrics=stage,
+                        )
+                    stage.success = match_success
+                if not match_success:
+                    logger.error("Request matching failed")
+                    return False, None, intermediate_data
+
+                intermediate_data.put("matched_requests", matched_requests)
+
+                # Matching is the last stage that needs the raw HAR
+                har_data = None
+
+                # Step 5: Find necessary headers
+                logger.info("Step 5: Finding necessary headers")
+                with self._stage(recorder, profiler, "headers") as stage:
+                    optimize_success, api_results = self.header_optimizer.optimize(
+                        matched_requests,
+                        analyzed_endpoints,
+                        files["headers"],
+                        metrics=stage,
+                        on_endpoint=(
+                            (lambda doc: emit("endpoint", doc.model_dump(mode="json")))
+                            if emit
+                            else None
+                        ),
+                        known_headers=self._known_headers(known, filtered_methods),
+                    )
+                    stage.success = optimize_success
+                if not optimize_success:
+                    logger.error("Header optimization failed")
+                    return False, None, intermediate_data
+
+                success = True
+                self._record_knowledge(
+                    site,
+                    request_type,
+                    recorder.metrics.run_id,
+                    fingerprints,
+                    analyzed_endpoints,
+                    api_results,
+                )
+                logger.info(
+                    f"Pipeline completed successfully in {recorder.elapsed():.2f} seconds"
+                )
+                return True, api_results, intermediate_data
+
+            except Exception as e:
+                logger.exception(f"Pipeline execution failed: {str(e)}")
                 return False, None, intermediate_data
 
-            intermediate_data["matched_requests"] = matched_requests
+            finally:
+                profiler.close()
+                self._finish_metrics(recorder, success, files["trace"])
+                if workspace:
+                    self.workspaces.release(workspace)
+
+    @contextmanager
+    def _stage(self, recorder: MetricsRecorder, profiler, name: str):
+        """Time, profile and tag the log records of one stage."""
+        with recorder.stage(name) as stage, profiler.stage(name), log_context(
+            stage=name
+        ):
+            yield stage
+
+    def run_from_har(
+        self, har_file, request_type="GET", url=None, profile=None, progress=None
+    ) -> Tuple[bool, Optional[ApiDetectionResults], Mapping]:
+        """Run the pipeline on a HAR file instead of a live capture.
 
-            # Step 5: Find necessary headers
-            logger.info("Step 5: Finding necessary headers")
-            optimize_success, api_results = self.header_optimizer.optimize(
-                matched_requests, analyzed_endpoints, self.headers_file
+        The file is parsed straight into the filter stage, so no browser is
+        started. It is linked or copied into the run's workspace as
+        network_traffic.har, or network_traffic.har.gz if it is compressed.
+
+        Args:
+            har_file: Path of a .har or .har.gz file exported from a browser
+                or proxy
+            request_type: Method selection to filter, see run
+            url: Optional URL the HAR was recorded from, used to label the
+                run. Defaults to the file path, with the knowledge store keyed
+                by the host of the HAR's first request.
+            profile: Whether to profile each stage, see run
+            progress: Optional progress callback, see run
+
+        Returns:
+            tuple: (success, api_detection_results, intermediate_data), see run
+        """
+        return self.run(
+            url or har_file,
+            request_type,
+            profile=profile,
+            progress=progress,
+            har_file=har_file,
+        )
+
+    def _resumable_artifacts(self, resume: Optional[str]) -> Dict[str, str]:
+        """Find the artifacts an interrupted run left in its workspace.
+
+        Stages write their artifact only once they have finished, so a run
+        can carry on after the last stage of an unbroken chain of artifacts.
+
+        Args:
+            resume: Run ID of the interrupted run, or None
+
+        Returns:
+            dict: Artifact path by stage name, in stage order, empty without
+            an output directory or if the run left no HAR
+        """
+        if not resume or self.workspaces is None or os.path.basename(resume) != resume:
+            return {}
+
+        directory = os.path.join(self.workspaces.root, resume)
+        found = {}
+        for name, stem, extensions in RESUMABLE_STAGES:
+            path = next(
+                (
+                    os.path.join(directory, stem + extension)
+                    for extension in extensions
+                    if os.path.exists(os.path.join(directory, stem + extension))
+                ),
+                None,
             )
-            if not optimize_success:
-                logger.error("Header optimization failed")
-                return False, None, intermediate_data
+            if path is None:
+                break
+            found[name] = path
+        return found
 
-            elapsed_time = time.time() - start_time
+    def _reuse(self, previous: Dict[str, str], name: str, workspace: Workspace, stage):
+        """Load a stage's result from an interrupted run's artifact.
+
+        The artifact is linked into this run's workspace unchanged. If it
+        cannot be loaded, it and the artifacts of later stages are dropped, so
+        those stages run again.
+
+        Returns:
+            The stage's result, or None if the stage has to run
+        """
+        path = previous.get(name)
+        if path is None:
+            return None
+        try:
+            data = self.serializer.load(path)
+            if name == "filtered":
+                result = [FilteredEndpoint(**endpoint) for endpoint in data]
+            elif name == "analyzed":
+                result = EndpointAnalysisBatch(**data)
+            else:
+                result = [MatchedRecord(**request) for request in data]
+            atomic_copy(path, workspace.path_for(os.path.basename(path)))
+        except Exception as e:
+            logger.error(f"Failed to reuse {name} artifact {path}: {str(e)}")
+            stages = list(previous)
+            for later in stages[stages.index(name) :]:
+                del previous[later]
+            return None
+        stage.resumed = True
+        return result
+
+    def _import_har(self, har_file: str, har_path: Optional[str]) -> Tuple[bool, Dict]:
+        """Load a HAR file and keep a copy of it as the run's capture artifact."""
+        try:
+            har_data = load_har(har_file)
+            if har_path:
+                if is_gzip_file(har_file):
+                    har_path += ".gz"
+                atomic_copy(har_file, har_path)
             logger.info(
-                f"Pipeline completed successfully in {elapsed_time:.2f} seconds"
+                f"Imported {len(har_data['log']['entries'])} HAR entries from {har_file}"
             )
-            return True, api_results, intermediate_data
+            return True, har_data
+        except Exception as e:
+            logger.error(f"Failed to import HAR file {har_file}: {str(e)}")
+            return False, None
+
+    def _known_endpoints(
+        self, site: str, request_type: str, filtered_endpoints: List[FilteredEndpoint]
+    ) -> Tuple[Dict[str, str], Dict[str, KnownEndpoint]]:
+        """Fingerprint the filtered endpoints and look up the unchanged ones.
+
+        Returns:
+            tuple: (URL to fingerprint, URL to KnownEndpoint of each endpoint
+            unchanged since an earlier run), both empty without a knowledge
+            store or if it cannot be read
+        """
+        if self.knowledge_store is None:
+            return {}, {}
+
+        fingerprints = {e.url: endpoint_fingerprint(e) for e in filtered_endpoints}
+        try:
+            known = self.knowledge_store.unchanged(site, request_type, fingerprints)
+        except Exception as e:
+            logger.error(f"Failed to read the knowledge store, scanning all: {str(e)}")
+            known = {}
+        logger.info(
+            f"{len(fingerprints) - len(known)} of {len(fingerprints)} endpoints "
+            f"are new or changed since the last scan of {site}"
+        )
+        return fingerprints, known
 
+    def _known_headers(
+        self, known: Dict[str, KnownEndpoint], methods: Dict[str, List[str]]
+    ) -> Dict[Tuple[str, str], Dict[str, str]]:
+        """Key the stored minimal headers by (URL, method) for the optimizer.
+
+        The store keeps one set of headers per endpoint and method selection,
+        so with several methods they are tried for each method the endpoint
+        was called with; a method they do not work for is probed as usual.
+        """
+        return {
+            (url, method): endpoint.necessary_headers
+            for url, endpoint in known.items()
+            if endpoint.necessary_headers
+            for method in methods.get(url, ())
+        }
+
+    def _merge_known_analyses(
+        self,
+        analyzed_endpoints: EndpointAnalysisBatch,
+        known: Dict[str, KnownEndpoint],
+        analyzed_file: Optional[str],
+    ) -> EndpointAnalysisBatch:
+        """Add the stored analyses of unchanged valuable endpoints to new ones."""
+        merged = EndpointAnalysisBatch(
+            endpoints=analyzed_endpoints.endpoints
+            + [
+                EndpointAnalysis(
+                    url=endpoint.url,
+                    explanation=endpoint.explanation or "",
+                    usefulness_score=endpoint.usefulness_score,
+                )
+                for endpoint in known.values()
+                if endpoint.usefulness_score is not None
+            ]
+        )
+        if analyzed_file:
+            self.serializer.dump(merged, analyzed_file)
+        return merged
+
+    def _record_knowledge(
+        self,
+        site: str,
+        request_type: str,
+        run_id: str,
+        fingerprints: Dict[str, str],
+        analyzed_endpoints: EndpointAnalysisBatch,
+        api_results: ApiDetectionResults,
+    ) -> None:
+        """Save a successful run's findings to the knowledge store, if any."""
+        if self.knowledge_store is None:
+            return
+        try:
+            self.knowledge_store.record(
+                site,
+                request_type,
+                run_id,
+                fingerprints,
+                analyzed_endpoints,
+                api_results,
+            )
         except Exception as e:
-            logger.exception(f"Pipeline execution failed: {str(e)}")
-            return False, None, intermediate_data
+            logger.error(f"Failed to update the knowledge store: {str(e)}")
+
+    def _save_har(self, har_data: Dict, har_file: Optional[str]) -> bool:
+        """Save a HAR passed in by the caller as this run's capture artifact."""
+        if har_file:
+            try:
+                atomic_write(har_file, json.dumps(har_data).encode("utf-8"))
+            except OSError as e:
+                logger.error(f"Failed to save HAR file: {str(e)}")
+                return False
+        return True
+
+    def _progress_emitter(self, progress):
+        """Wrap a progress callback so that its failures never break a run."""
+        if progress is None:
+            return None
+
+        def emit(event: str, data: Dict) -> None:
+            try:
+                progress(event, data)
+            except Exception as e:
+                logger.error(f"Progress callback failed on {event}: {str(e)}")
+
+        return emit
+
+    def _stage_listener(self, emit):
+        """Turn MetricsRecorder stage notifications into progress events."""
+
+        def listener(event: str, stage) -> None:
+            if event == "stage_started":
+                emit(event, {"name": stage.name})
+            else:
+                emit(event, stage.model_dump(include=STAGE_PROGRESS_FIELDS))
+
+        return listener
+
+    def _artifact_paths(self, workspace: Optional[Workspace]) -> Dict[str, str]:
+        """Return the output file of each stage, or None without a workspace."""
+        if workspace is None:
+            return dict.fromkeys(
+                ("har", "filtered", "analyzed", "matched", "headers", "trace")
+            )
+
+        ext = self.serializer.extension
+        return {
+            "har": workspace.path_for("network_traffic.har"),
+            "filtered": workspace.path_for("filtered_requests" + ext),
+            "analyzed": workspace.path_for("analyzed_endpoints" + ext),
+            "matched": workspace.path_for("matched_requests" + ext),
+            "headers": workspace.path_for("necessary_headers" + ext),
+            "trace": workspace.path_for("pipeline_trace.json"),
+        }
+
+    def _create_profiler(self, profile, workspace: Optional[Workspace]):
+        """Return a stage profiler for the run, or a no-op one if disabled."""
+        if not profiling_requested(profile):
+            return NullProfiler()
+        if workspace:
+            profile_dir = workspace.path_for("profiles")
+        else:
+            profile_dir = tempfile.mkdtemp(prefix="api_engine_profile_")
+        return StageProfiler(profile_dir)
+
+    def _spill_dir(self, workspace: Optional[Workspace], run_id: str) -> Optional[str]:
+        """Return the directory for spilled intermediate results, if spilling."""
+        if self.retention != "spill":
+            return None
+        if self.spill_dir:
+            return os.path.join(self.spill_dir, run_id)
+        if workspace:
+            return workspace.path_for("intermediate")
+        return tempfile.mkdtemp(prefix="api_engine_spill_")
+
+    def _finish_metrics(
+        self, recorder: MetricsRecorder, success: bool, trace_file: Optional[str]
+    ) -> None:
+        """Close out run metrics and save the span trace if there is a workspace."""
+        metrics = recorder.finish(success)
+        if trace_file:
+            try:
+                data = json.dumps(to_spans(metrics), indent=4).encode("utf-8")
+                atomic_write(trace_file, data)
+            except OSError as e:
+                logger.error(f"Failed to save pipeline trace: {str(e)}")
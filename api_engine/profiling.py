@@ -0,0 +1,163 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# tracemalloc is process-wide, so overlapping profiled runs share one session
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+# Only one cProfile profiler can be active per process on Python 3.12+, and
+# the tracemalloc peak is process-wide too. The stage holding this lock owns
+# both; a stage of an overlapping profiled run only records allocations.
+_stage_profile_lock = threading.Lock()
+
+
+def profiling_requested(profile=None) -> bool:
+    """Decide whether a run should be profiled.
+
+    Args:
+        profile: Explicit per-run choice, or None to use the PIPELINE_PROFILE
+            environment variable
+
+    Returns:
+        bool: Whether profiling is enabled
+    """
+    if profile is not None:
+        return bool(profile)
+    return os.environ.get("PIPELINE_PROFILE", "false").lower() in ("1", "true", "yes")
+
+
+def _start_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class NullProfiler:
+    """Profiler used when profiling is disabled; its stages do nothing."""
+
+    output_dir = None
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def close(self) -> None:
+        pass
+
+
+class StageProfiler:
+    """Profiles pipeline stages with cProfile and tracemalloc.
+
+    For each stage it writes:
+        <stage>.prof: raw cProfile data, loadable with pstats or snakeviz
+        <stage>_cpu.txt: top functions by cumulative time
+        <stage>_alloc.txt: top allocation sites added during the stage
+
+    Only one stage in the process is profiled with cProfile at a time; a
+    stage that overlaps it, e.g. in another job, gets only its allocation
+    report.
+    """
+
+    def __init__(self, output_dir: str, top_n: int = 30):
+        """Initialize the profiler and start tracing allocations.
+
+        Args:
+            output_dir: Directory for the profile reports
+            top_n: Number of entries in the text reports
+        """
+        self.output_dir = output_dir
+        self.top_n = top_n
+        os.makedirs(output_dir, exist_ok=True)
+        _start_tracemalloc()
+        self._closed = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Profile the enclosed stage and write its reports on exit.
+
+        Args:
+            name: Stage name, used for the report file names
+        """
+        before = tracemalloc.take_snapshot()
+        profiler = None
+        owner = _stage_profile_lock.acquire(blocking=False)
+        if owner:
+            tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Another profiling tool, e.g. a debugger, is already active
+                logger.warning(f"Stage {name} runs without cProfile: {str(e)}")
+                profiler = None
+        else:
+            logger.warning(
+                f"Another run's stage is being profiled, stage {name} "
+                "only records allocations"
+            )
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            peak = None
+            if owner:
+                _, peak = tracemalloc.get_traced_memory()
+                _stage_profile_lock.release()
+            after = tracemalloc.take_snapshot()
+            try:
+                self._write_reports(name, profiler, before, after, peak)
+            except OSError as e:
+                logger.error(f"Failed to write profile for stage {name}: {str(e)}")
+
+    def close(self) -> None:
+        """Stop tracing allocations for this profiler."""
+        if not self._closed:
+            self._closed = True
+            _stop_tracemalloc()
+            logger.info(f"Profile reports saved to {self.output_dir}")
+
+    def _write_reports(self, name, profiler, before, after, peak) -> None:
+        if profiler is not None:
+            profiler.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+            with open(os.path.join(self.output_dir, f"{name}_cpu.txt"), "w") as f:
+                f.write(stream.getvalue())
+
+        ignore = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        diff = after.filter_traces(ignore).compare_to(
+            before.filter_traces(ignore), "lineno"
+        )
+        with open(os.path.join(self.output_dir, f"{name}_alloc.txt"), "w") as f:
+            if peak is None:
+                f.write("Peak traced memory not measured: overlapping profiled run\n")
+            else:
+                # Process-wide, so it includes other threads' allocations
+                f.write(f"Peak traced memory during stage: {peak / 1024:.1f} KiB\n")
+            f.write(f"Top {self.top_n} allocation sites by growth:\n\n")
+            for stat in diff[: self.top_n]:
+                f.write(f"{stat}\n")
@@ -0,0 +1,40 @@
+from typing import Dict, NamedTuple, Optional
+
+from api_engine.models import ApiRequest, MatchedRequest, ResponseSummary
+
+# Named tuples carry HAR entries through the per-entry loops of the filter and
+# match stages, where building a validated pydantic model per entry dominates
+# time and memory. They are built from the HAR's own values, so there is
+# nothing to validate; models are still used where data enters or leaves the
+# pipeline.
+
+
+class RequestRecord(NamedTuple):
+    """A HAR request grouped by HarFilter, the hot-path form of ApiRequest."""
+
+    url: str
+    method: str
+    query_params: Dict[str, str]
+    headers: Dict[str, str]
+    post_data: Optional[str] = None
+    # Only set on the requests whose response was summarized
+    response_summary: Optional[ResponseSummary] = None
+
+    def to_model(self) -> ApiRequest:
+        """Return the request as a validated ApiRequest."""
+        fields = self._asdict()
+        del fields["response_summary"]
+        return ApiRequest(**fields)
+
+
+class MatchedRecord(NamedTuple):
+    """A HAR request matched to a valuable endpoint, the hot-path form of MatchedRequest."""
+
+    url: str
+    method: str
+    headers: Dict[str, str]
+    status_code: int
+
+    def to_model(self) -> MatchedRequest:
+        """Return the request as a validated MatchedRequest."""
+        return MatchedRequest(**self._asdict())
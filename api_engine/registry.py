@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ComponentRegistry:
+    """Builds long-lived components once per process and hands out the same instance.
+
+    Pipelines, shared scan resources and worker pools are expensive to set
+    up, so each one is built on first use and reused afterwards. A forked
+    child process starts with an empty registry, since threads, browsers and
+    connections do not survive a fork.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        # Reentrant so that a factory can fetch the components it depends on
+        self._lock = threading.RLock()
+        self._components: Dict[Hashable, object] = {}
+        self._build_seconds: Dict[Hashable, float] = {}
+        self._pid = os.getpid()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def get(self, key: Hashable, factory: Callable[[], object]):
+        """Return the component for key, building it with factory on first use.
+
+        Args:
+            key: Identifies the component, including any settings it depends on
+            factory: Callable building the component
+
+        Returns:
+            The cached component
+        """
+        with self._lock:
+            if key not in self._components:
+                started = time.perf_counter()
+                self._components[key] = factory()
+                self._build_seconds[key] = time.perf_counter() - started
+                logger.info(
+                    f"Built component {key!r} in {self._build_seconds[key]:.3f}s"
+                )
+            return self._components[key]
+
+    def clear(self) -> None:
+        """Forget every component, e.g. after reconfiguration."""
+        with self._lock:
+            self._components.clear()
+            self._build_seconds.clear()
+
+    def stats(self) -> Dict:
+        """Return the process ID and the build time of each component."""
+        with self._lock:
+            return {
+                "pid": self._pid,
+                "components": {
+                    repr(key): {
+                        "type": type(component).__name__,
+                        "build_seconds": self._build_seconds[key],
+                    }
+                    for key, component in self._components.items()
+                },
+            }
+
+    def _after_fork(self) -> None:
+        # The parent's lock may have been held by a thread that does not exist here
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._components = {}
+        self._build_seconds = {}
+
+
+# Process-wide component registry
+components = ComponentRegistry()
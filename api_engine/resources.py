@@ -0,0 +1,282 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BrowserPool:
+    """Reuses Playwright browsers across pipeline runs on the same thread.
+
+    Playwright's sync API must be driven from the thread that started it, so
+    each thread gets its own Playwright instance and browser, started on first
+    use. At most size threads hold a browser at a time; others block until a
+    thread calls release(). A thread keeps its slot between runs until it
+    releases it, so every thread that uses the pool must call release() once
+    it is done: bulk scan workers do so when idle, job workers after each job.
+    """
+
+    def __init__(self, size: int = 2, headless: bool = True):
+        """Initialize the pool.
+
+        Args:
+            size: Maximum number of threads holding a browser at once
+            headless: Whether to launch browsers headless
+        """
+        self.size = size
+        self.headless = headless
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._launches = 0
+        self._active = 0
+
+    def _playwright(self):
+        """Return this thread's Playwright instance, starting it if needed."""
+        if getattr(self._local, "playwright", None) is None:
+            # Import here so that processes without a pool never load Playwright
+            from playwright.sync_api import sync_playwright
+
+            self._slots.acquire()
+            try:
+                self._local.playwright = sync_playwright().start()
+            except Exception:
+                self._slots.release()
+                raise
+            self._local.browser = None
+            with self._lock:
+                self._active += 1
+        return self._local.playwright
+
+    @contextmanager
+    def browser(self):
+        """Yield this thread's browser, launching it on first use."""
+        playwright = self._playwright()
+        if self._local.browser is None:
+            self._local.browser = playwright.chromium.launch(headless=self.headless)
+            with self._lock:
+                self._launches += 1
+        yield self._local.browser
+
+    @contextmanager
+    def request_context(self):
+        """Yield a fresh APIRequestContext for probing one endpoint.
+
+        A new context is used each time so that cookies set by one endpoint's
+        responses never leak into another endpoint's probes. It needs no
+        browser.
+        """
+        context = self._playwright().request.new_context()
+        try:
+            yield context
+        finally:
+            context.dispose()
+
+    def release(self) -> None:
+        """Close this thread's browser and Playwright instance, if any."""
+        playwright = getattr(self._local, "playwright", None)
+        if playwright is None:
+            return
+        try:
+            if self._local.browser is not None:
+                self._local.browser.close()
+            playwright.stop()
+        except Exception as e:
+            logger.error(f"Failed to close pooled browser: {str(e)}")
+        finally:
+            self._local.playwright = None
+            self._local.browser = None
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the pool size, threads holding a browser and browser launches."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "active": self._active,
+                "launches": self._launches,
+            }
+
+
+class LlmDispatcher:
+    """Shares one LLM client between runs and bounds concurrent requests."""
+
+    def __init__(self, client=None, api_key=None, max_concurrent: int = 4):
+        """Initialize the dispatcher.
+
+        Args:
+            client: Client to share, an OpenAI client by default
+            api_key: OpenAI API key used when no client is given
+            max_concurrent: Maximum number of requests in flight at once
+        """
+        if client is None:
+            from openai import OpenAI
+
+            # Retries are counted and backed off by the analyzer
+            client = OpenAI(api_key=api_key or None, max_retries=0)
+        self.client = client
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._in_flight = 0
+        self._wait_seconds = 0.0
+
+    def parse(self, **kwargs):
+        """Send a structured-output chat completion request.
+
+        Args:
+            **kwargs: Arguments for client.beta.chat.completions.parse
+
+        Returns:
+            The parsed completion response
+        """
+        waited = time.perf_counter()
+        with self._slots:
+            with self._lock:
+                self._wait_seconds += time.perf_counter() - waited
+                self._requests += 1
+                self._in_flight += 1
+            try:
+                return self.client.beta.chat.completions.parse(**kwargs)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def warm_up(self, timeout: float = 10.0) -> bool:
+        """Open a connection to the API so the first analysis skips the handshake.
+
+        Args:
+            timeout: Seconds to wait for the API
+
+        Returns:
+            bool: Whether the API answered
+        """
+        try:
+            self.client.with_options(timeout=timeout).models.list()
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to warm up LLM connection: {str(e)}")
+            return False
+
+    def stats(self) -> Dict:
+        """Return request counts, requests in flight and time spent queueing."""
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "requests": self._requests,
+                "in_flight": self._in_flight,
+                "wait_seconds": self._wait_seconds,
+            }
+
+
+class ProbeScheduler:
+    """Rate-limits header probes globally and per host.
+
+    Replaces the fixed sleep between probes: at most max_concurrent probes run
+    at once, at most per_host of them against the same host, and probes to a
+    host start at least min_interval seconds apart.
+    """
+
+    def __init__(
+        self, max_concurrent: int = 8, per_host: int = 2, min_interval: float = 0.1
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            max_concurrent: Maximum number of probes in flight across all hosts
+            per_host: Maximum number of probes in flight against one host
+            min_interval: Minimum seconds between probe starts on one host
+        """
+        self.max_concurrent = max_concurrent
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self._global = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._probes = 0
+        self._wait_seconds = 0.0
+
+    @contextmanager
+    def slot(self, url: str):
+        """Wait until a probe of url may start, and hold its slot while it runs.
+
+        Args:
+            url: URL about to be probed
+        """
+        host = urlparse(url).netloc
+        waited = time.perf_counter()
+        # Take the host slot first so a busy host never ties up global slots
+        with self._host_slots(host), self._global:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, 0.0))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            with self._lock:
+                self._probes += 1
+                self._wait_seconds += time.perf_counter() - waited
+            yield
+
+    def _host_slots(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def stats(self) -> Dict:
+        """Return probe counts, time spent waiting and hosts seen."""
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "per_host": self.per_host,
+                "probes": self._probes,
+                "wait_seconds": self._wait_seconds,
+                "hosts": len(self._hosts),
+            }
+
+
+class ScanResources:
+    """Resources shared by every pipeline built with them.
+
+    Any of them may be None, in which case each pipeline falls back to its own
+    browser, LLM client and fixed probe delay.
+    """
+
+    def __init__(
+        self,
+        browser_pool: Optional[BrowserPool] = None,
+        llm_dispatcher: Optional[LlmDispatcher] = None,
+        probe_scheduler: Optional[ProbeScheduler] = None,
+    ):
+        """Initialize the bundle.
+
+        Args:
+            browser_pool: Pool of per-thread browsers for capture and probes
+            llm_dispatcher: Shared LLM client with a concurrency limit
+            probe_scheduler: Global and per-host header probe limits
+        """
+        self.browser_pool = browser_pool
+        self.llm_dispatcher = llm_dispatcher
+        self.probe_scheduler = probe_scheduler
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return the stats of each shared resource that is set."""
+        resources = {
+            "browser_pool": self.browser_pool,
+            "llm_dispatcher": self.llm_dispatcher,
+            "probe_scheduler": self.probe_scheduler,
+        }
+        return {
+            name: resource.stats()
+            for name, resource in resources.items()
+            if resource is not None
+        }
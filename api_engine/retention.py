@@ -0,0 +1,143 @@
+import os
+import pickle
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+
+from api_engine.workspace import atomic_write
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RETENTION_POLICIES = ("full", "summary", "spill", "none")
+
+
+class SpilledArtifact:
+    """Reference to an intermediate result that was written to disk."""
+
+    def __init__(self, path: str, summary: Dict):
+        """Initialize the reference.
+
+        Args:
+            path: File holding the pickled value
+            summary: Summary of the value, available without loading it
+        """
+        self.path = path
+        self.summary = summary
+
+    def load(self) -> Any:
+        """Load the value back from disk."""
+        with open(self.path, "rb") as f:
+            return pickle.load(f)
+
+    def __repr__(self):
+        return f"SpilledArtifact(path={self.path!r})"
+
+
+def summarize(value: Any) -> Dict:
+    """Build a small summary describing an intermediate value.
+
+    Args:
+        value: Intermediate pipeline result
+
+    Returns:
+        Dict: Type name and item count where one can be determined
+    """
+    summary = {"type": type(value).__name__}
+
+    if isinstance(value, dict) and "log" in value:
+        summary["count"] = len(value["log"].get("entries", []))
+    elif hasattr(value, "endpoints"):
+        summary["count"] = len(value.endpoints)
+    elif hasattr(value, "__len__"):
+        summary["count"] = len(value)
+
+    return summary
+
+
+class IntermediateStore(Mapping):
+    """Holds intermediate pipeline results according to a retention policy.
+
+    Policies:
+        full: keep every value in memory
+        summary: keep only a summary (type and item count) of each value
+        spill: write each value to disk and reload it lazily on access
+        none: keep nothing
+
+    Pinned values such as run metrics are always kept in memory.
+    """
+
+    def __init__(self, policy: str = "full", spill_dir: Optional[str] = None):
+        """Initialize the store.
+
+        Args:
+            policy: One of RETENTION_POLICIES
+            spill_dir: Directory for spilled values, required for "spill"
+        """
+        if policy not in RETENTION_POLICIES:
+            raise ValueError(
+                f"Unknown retention policy {policy!r}, "
+                f"expected one of {', '.join(RETENTION_POLICIES)}"
+            )
+        if policy == "spill" and not spill_dir:
+            raise ValueError("The spill retention policy requires a spill directory")
+
+        self.policy = policy
+        self.spill_dir = spill_dir
+        self._values = {}
+        self._pinned = set()
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def pin(self, key: str, value: Any) -> None:
+        """Keep a value in memory regardless of the policy."""
+        self._values[key] = value
+        self._pinned.add(key)
+
+    def put(self, key: str, value: Any) -> None:
+        """Retain a value according to the policy.
+
+        Args:
+            key: Name of the intermediate result
+            value: The intermediate result
+        """
+        if self.policy == "full":
+            self._values[key] = value
+        elif self.policy == "summary":
+            self._values[key] = summarize(value)
+        elif self.policy == "spill":
+            path = os.path.join(self.spill_dir, f"{key}.pkl")
+            try:
+                atomic_write(
+                    path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                )
+                self._values[key] = SpilledArtifact(path, summarize(value))
+            except (OSError, pickle.PicklingError) as e:
+                logger.error(f"Failed to spill {key} to disk: {str(e)}")
+                self._values[key] = summarize(value)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return summaries of retained values without loading spilled ones."""
+        result = {}
+        for key, value in self._values.items():
+            if key in self._pinned:
+                continue
+            if isinstance(value, SpilledArtifact):
+                result[key] = value.summary
+            elif self.policy == "summary":
+                result[key] = value
+            else:
+                result[key] = summarize(value)
+        return result
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._values[key]
+        if isinstance(value, SpilledArtifact):
+            return value.load()
+        return value
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
@@ -0,0 +1,138 @@
+import gzip
+import json
+from typing import Any, List, Type
+
+from pydantic import BaseModel
+
+from api_engine.workspace import atomic_write
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+ARTIFACT_FORMATS = ("json", "json-pretty", "msgpack")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _default(obj: Any) -> Any:
+    """Serialize objects the encoders do not handle natively."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class ArtifactSerializer:
+    """Writes and reads stage artifacts in a configurable format.
+
+    Formats:
+        json: compact JSON, using orjson when it is installed
+        json-pretty: indented JSON for reading by hand
+        msgpack: MessagePack, requires the msgpack package
+
+    Pydantic models are encoded directly by the encoder's default hook, so
+    artifacts are never dumped to dicts and re-validated just to be written.
+    """
+
+    def __init__(self, format: str = "json", compress: bool = False):
+        """Initialize the serializer.
+
+        Args:
+            format: One of ARTIFACT_FORMATS
+            compress: Whether to gzip artifacts on write
+        """
+        if format not in ARTIFACT_FORMATS:
+            raise ValueError(
+                f"Unknown artifact format {format!r}, "
+                f"expected one of {', '.join(ARTIFACT_FORMATS)}"
+            )
+        if format == "msgpack" and msgpack is None:
+            raise ValueError("The msgpack artifact format requires the msgpack package")
+
+        self.format = format
+        self.compress = compress
+
+    @property
+    def extension(self) -> str:
+        """File extension matching the format and compression."""
+        extension = ".msgpack" if self.format == "msgpack" else ".json"
+        return extension + ".gz" if self.compress else extension
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object, without compression.
+
+        Args:
+            obj: Pydantic model, or lists and dicts containing them
+
+        Returns:
+            bytes: The encoded object
+        """
+        if self.format == "msgpack":
+            return msgpack.packb(obj, default=_default, use_bin_type=True)
+        if self.format == "json-pretty":
+            return json.dumps(obj, default=_default, indent=4).encode("utf-8")
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default)
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        """Decode bytes written by any supported format.
+
+        The format is detected from the data, so artifacts written with a
+        different configuration can still be loaded.
+
+        Args:
+            data: Encoded, optionally gzipped, artifact
+
+        Returns:
+            The decoded object as plain dicts and lists
+        """
+        if data[:2] == _GZIP_MAGIC:
+            data = gzip.decompress(data)
+
+        if data.lstrip()[:1] in (b"{", b"[", b'"') or not data.strip():
+            return orjson.loads(data) if orjson is not None else json.loads(data)
+
+        if msgpack is None:
+            raise ValueError("Artifact is not JSON and msgpack is not installed")
+        return msgpack.unpackb(data, raw=False)
+
+    def dump(self, obj: Any, path: str) -> None:
+        """Encode an object and write it to a file.
+
+        Args:
+            obj: Pydantic model, or lists and dicts containing them
+            path: Output file path
+        """
+        data = self.dumps(obj)
+        if self.compress:
+            data = gzip.compress(data, compresslevel=5)
+        atomic_write(path, data)
+
+    def load(self, path: str) -> Any:
+        """Read and decode an artifact file.
+
+        Args:
+            path: Artifact file path
+
+        Returns:
+            The decoded object as plain dicts and lists
+        """
+        with open(path, "rb") as f:
+            return self.loads(f.read())
+
+    def load_model(self, path: str, model: Type[BaseModel]) -> BaseModel:
+        """Read an artifact file and validate it as a model."""
+        return model.model_validate(self.load(path))
+
+    def load_models(self, path: str, model: Type[BaseModel]) -> List[BaseModel]:
+        """Read an artifact file holding a list and validate each item."""
+        return [model.model_validate(item) for item in self.load(path)]
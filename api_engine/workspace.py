@@ -0,0 +1,234 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Marker file present while a run is using its workspace
+ACTIVE_MARKER = ".active"
+
+# File in which a finished workspace records its size in bytes
+SIZE_MARKER = ".size"
+
+
+def new_run_id() -> str:
+    """Return a unique, time-sortable run identifier."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}"
+
+
+def atomic_write(path: str, data: bytes, mtime: Optional[float] = None) -> None:
+    """Write a file so readers never see a partial or interleaved version.
+
+    The data goes to a temporary file in the same directory, which then
+    replaces the target in one rename.
+
+    Args:
+        path: Destination file path
+        data: File contents
+        mtime: Modification time the file already has when it appears
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_copy(source: str, path: str) -> None:
+    """Copy a file into place without exposing a partial copy.
+
+    Hard-links the source when it is on the same filesystem, which costs no
+    I/O, and copies it through a temporary file otherwise.
+
+    Args:
+        source: File to copy
+        path: Destination file path
+    """
+    directory = os.path.dirname(path) or "."
+    tmp_path = os.path.join(
+        directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp"
+    )
+    try:
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class Workspace:
+    """Directory holding the output files of a single pipeline run."""
+
+    def __init__(self, run_id: str, path: str):
+        """Initialize the workspace.
+
+        Args:
+            run_id: Identifier of the run
+            path: Directory of the workspace
+        """
+        self.run_id = run_id
+        self.path = path
+
+    def path_for(self, name: str) -> str:
+        """Return the path of a file inside the workspace."""
+        return os.path.join(self.path, name)
+
+
+class WorkspaceManager:
+    """Creates per-run workspaces and enforces retention and a disk quota.
+
+    Workspaces live in <root>/<run_id>. Cleanup runs whenever a workspace is
+    created and never removes one that is still marked active, unless its
+    marker is older than stale_after (a crashed run). A workspace's size is
+    measured once, when it is released, so cleanup only walks the files of
+    workspaces that are still active or were never released.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        retention_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        stale_after: float = 24 * 3600,
+    ):
+        """Initialize the manager.
+
+        Args:
+            root: Directory holding the workspaces
+            retention_seconds: Remove finished workspaces older than this
+            max_bytes: Remove the oldest finished workspaces while the total
+                size is above this
+            stale_after: Seconds after which an active marker is ignored
+        """
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def create(self, run_id: Optional[str] = None) -> Workspace:
+        """Create an active workspace for a new run.
+
+        Args:
+            run_id: Optional run identifier, generated if omitted
+
+        Returns:
+            Workspace: The new workspace
+        """
+        run_id = run_id or new_run_id()
+        path = os.path.join(self.root, run_id)
+        os.makedirs(path)
+        with open(os.path.join(path, ACTIVE_MARKER), "w") as f:
+            f.write(str(os.getpid()))
+
+        self.cleanup()
+        return Workspace(run_id, path)
+
+    def release(self, workspace: Workspace) -> None:
+        """Mark a workspace finished so that cleanup may remove it."""
+        if self.max_bytes is not None:
+            try:
+                atomic_write(
+                    workspace.path_for(SIZE_MARKER),
+                    str(_directory_size(workspace.path)).encode("utf-8"),
+                )
+            except OSError as e:
+                logger.warning(f"Failed to record the size of {workspace.path}: {e}")
+        try:
+            os.unlink(workspace.path_for(ACTIVE_MARKER))
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self) -> List[str]:
+        """Apply the retention policy and disk quota.
+
+        Returns:
+            list: Run IDs of the removed workspaces
+        """
+        if self.retention_seconds is None and self.max_bytes is None:
+            return []
+
+        with self._lock:
+            now = time.time()
+            candidates = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if not entry.is_dir():
+                    continue
+                active = self._is_active(entry.path, now)
+                size = self._size(entry.path, active)
+                total += size
+                if active:
+                    continue
+                candidates.append((entry.stat().st_mtime, entry.name, size))
+
+            removed = []
+            for mtime, run_id, size in sorted(candidates):
+                expired = (
+                    self.retention_seconds is not None
+                    and now - mtime > self.retention_seconds
+                )
+                over_quota = self.max_bytes is not None and total > self.max_bytes
+                if not (expired or over_quota):
+                    continue
+                shutil.rmtree(os.path.join(self.root, run_id), ignore_errors=True)
+                total -= size
+                removed.append(run_id)
+
+        if removed:
+            logger.info(f"Removed {len(removed)} old run workspaces")
+        return removed
+
+    def _size(self, path: str, active: bool) -> int:
+        """Return a workspace's recorded size, or measure it if there is none."""
+        if self.max_bytes is None:
+            return 0
+        if not active:
+            try:
+                with open(os.path.join(path, SIZE_MARKER), "rb") as f:
+                    return int(f.read())
+            except (OSError, ValueError):
+                pass
+        return _directory_size(path)
+
+    def _is_active(self, path: str, now: float) -> bool:
+        try:
+            marker_mtime = os.path.getmtime(os.path.join(path, ACTIVE_MARKER))
+        except OSError:
+            return False
+        return now - marker_mtime < self.stale_after
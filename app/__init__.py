@@ -1,6 +1,47 @@
+import importlib
+import json
 import os
+import time
 
-from flask import Flask, flash, render_template, request
+from flask import (
+    Flask,
+    Response,
+    abort,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
+
+from api_engine.registry import components
+
+# Heavy modules imported by the warm-up hook instead of the first request
+WARM_UP_MODULES = (
+    "api_engine.pipeline",
+    "api_engine.bulk",
+    "openai",
+    "playwright.sync_api",
+)
+# Seconds between polls of the job store while streaming progress events
+EVENTS_POLL_INTERVAL = 0.5
+# Seconds of silence after which a keep-alive comment is sent to the client
+EVENTS_KEEPALIVE = 15
+# Seconds after which a stream is closed and the client reconnects with
+# Last-Event-ID, so a long job does not hold one request thread throughout
+EVENTS_MAX_STREAM = 300
+# Milliseconds a client waits before reconnecting to a closed stream
+EVENTS_RECONNECT_MS = 1000
+
+
+def _sse(event: str, data, event_id=None) -> str:
+    """Format one Server-Sent Events message."""
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n" + message
+    return message
 
 
 def create_app():
@@ -16,58 +57,597 @@ def create_app():
     app.config["OUTPUT_DIR"] = os.environ.get("OUTPUT_DIR", "output")
     app.config["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY", "")
     app.config["OPENAI_MODEL"] = os.environ.get("OPENAI_MODEL", "gpt-4o")
+    app.config["INTERMEDIATE_RETENTION"] = os.environ.get(
+        "INTERMEDIATE_RETENTION", "none"
+    )
+    app.config["ARTIFACT_FORMAT"] = os.environ.get("ARTIFACT_FORMAT", "json")
+    app.config["COMPRESS_ARTIFACTS"] = (
+        os.environ.get("COMPRESS_ARTIFACTS", "false").lower() == "true"
+    )
+
+    workspace_retention = os.environ.get("WORKSPACE_RETENTION")
+    app.config["WORKSPACE_RETENTION"] = (
+        float(workspace_retention) if workspace_retention else None
+    )
+    workspace_quota_mb = os.environ.get("WORKSPACE_QUOTA_MB")
+    app.config["WORKSPACE_QUOTA"] = (
+        int(float(workspace_quota_mb) * 1024 * 1024) if workspace_quota_mb else None
+    )
+
+    app.config["BROWSER_POOL_SIZE"] = int(os.environ.get("BROWSER_POOL_SIZE", 4))
+    app.config["LLM_CONCURRENCY"] = int(os.environ.get("LLM_CONCURRENCY", 4))
+    app.config["PROBE_CONCURRENCY"] = int(os.environ.get("PROBE_CONCURRENCY", 8))
+    app.config["PROBE_PER_HOST"] = int(os.environ.get("PROBE_PER_HOST", 2))
+    app.config["PROBE_INTERVAL"] = float(os.environ.get("PROBE_INTERVAL", 0.1))
+    app.config["BROWSER_IDLE_TIMEOUT"] = float(
+        os.environ.get("BROWSER_IDLE_TIMEOUT", 300)
+    )
+    app.config["HAR_WORKERS"] = int(os.environ.get("HAR_WORKERS", 0))
+    app.config["BULK_WORKERS"] = int(os.environ.get("BULK_WORKERS", 4))
+    app.config["BULK_MAX_TARGETS"] = int(os.environ.get("BULK_MAX_TARGETS", 100))
+
+    # Largest accepted request body, which bounds HAR uploads
+    app.config["MAX_CONTENT_LENGTH"] = int(
+        float(os.environ.get("HAR_UPLOAD_MAX_MB", 512)) * 1024 * 1024
+    )
+
+    app.config["WARM_UP"] = os.environ.get("WARM_UP", "false").lower() == "true"
+
+    app.config["JOBS_DB"] = os.environ.get(
+        "JOBS_DB", os.path.join(app.config["OUTPUT_DIR"], "jobs.db")
+    )
+    # Uploaded HARs wait here for whichever worker runs their job, so by
+    # default they sit next to the jobs database on the shared storage
+    app.config["UPLOAD_DIR"] = os.environ.get(
+        "UPLOAD_DIR",
+        os.path.join(os.path.dirname(app.config["JOBS_DB"]) or ".", "uploads"),
+    )
+    app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 2))
+    # Queue backend URL shared by the web and worker processes, see open_queue
+    app.config["JOB_QUEUE"] = os.environ.get("JOB_QUEUE", "")
+    app.config["JOB_LEASE_SECONDS"] = float(os.environ.get("JOB_LEASE_SECONDS", 60))
+    app.config["JOB_MAX_ATTEMPTS"] = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+    app.config["CACHE_TTL"] = float(os.environ.get("CACHE_TTL", 3600))
+    app.config["CACHE_STALE_TTL"] = float(os.environ.get("CACHE_STALE_TTL", 0))
+    app.config["KNOWLEDGE_DB"] = os.environ.get(
+        "KNOWLEDGE_DB", os.path.join(app.config["OUTPUT_DIR"], "knowledge.db")
+    )
+    app.config["INCREMENTAL_SCANS"] = (
+        os.environ.get("INCREMENTAL_SCANS", "true").lower() == "true"
+    )
+
+    def component_key(name):
+        """Key of one of this app's components in the process-level registry."""
+        return f"app-{id(app):x}.{name}"
+
+    def get_scan_resources():
+        """Return the browser pool, LLM dispatcher and probe scheduler of this process."""
+
+        def build():
+            from api_engine.resources import (
+                BrowserPool,
+                LlmDispatcher,
+                ProbeScheduler,
+                ScanResources,
+            )
+
+            return ScanResources(
+                browser_pool=BrowserPool(size=app.config["BROWSER_POOL_SIZE"]),
+                llm_dispatcher=LlmDispatcher(
+                    api_key=app.config["OPENAI_API_KEY"],
+                    max_concurrent=app.config["LLM_CONCURRENCY"],
+                ),
+                probe_scheduler=ProbeScheduler(
+                    max_concurrent=app.config["PROBE_CONCURRENCY"],
+                    per_host=app.config["PROBE_PER_HOST"],
+                    min_interval=app.config["PROBE_INTERVAL"],
+                ),
+            )
+
+        return components.get(component_key("scan_resources"), build)
+
+    def get_knowledge_store():
+        """Return the store of endpoints discovered by earlier scans."""
+
+        def build():
+            from api_engine.knowledge import EndpointKnowledgeStore
+
+            return EndpointKnowledgeStore(app.config["KNOWLEDGE_DB"])
+
+        return components.get(component_key("knowledge_store"), build)
+
+    def create_pipeline(resources=None):
+        """Build a pipeline from the app configuration.
+
+        Args:
+            resources: ScanResources to share, by default the process's LLM
+                dispatcher and probe scheduler without the browser pool, since
+                long-lived job workers would otherwise hold browsers forever
+        """
+        # Import here to avoid circular imports
+        from api_engine.pipeline import ApiDetectionPipeline
+        from api_engine.resources import ScanResources
+
+        if resources is None:
+            shared = get_scan_resources()
+            resources = ScanResources(
+                llm_dispatcher=shared.llm_dispatcher,
+                probe_scheduler=shared.probe_scheduler,
+            )
+
+        return ApiDetectionPipeline(
+            output_dir=app.config["OUTPUT_DIR"],
+            openai_api_key=app.config["OPENAI_API_KEY"],
+            openai_model=app.config["OPENAI_MODEL"],
+            retention=app.config["INTERMEDIATE_RETENTION"],
+            artifact_format=app.config["ARTIFACT_FORMAT"],
+            compress_artifacts=app.config["COMPRESS_ARTIFACTS"],
+            workspace_retention=app.config["WORKSPACE_RETENTION"],
+            workspace_quota=app.config["WORKSPACE_QUOTA"],
+            resources=resources,
+            knowledge_store=(
+                get_knowledge_store() if app.config["INCREMENTAL_SCANS"] else None
+            ),
+            har_workers=app.config["HAR_WORKERS"],
+        )
+
+    def get_pipeline(shared_browsers=False):
+        """Return this process's pipeline, built once and shared by all runs.
+
+        Args:
+            shared_browsers: Whether to use the pipeline that also draws on
+                the browser pool, as bulk scan workers do
+        """
+
+        def build():
+            if shared_browsers:
+                return create_pipeline(get_scan_resources())
+            return create_pipeline()
+
+        name = "bulk_pipeline" if shared_browsers else "pipeline"
+        return components.get(component_key(name), build)
+
+    def get_job_runner():
+        """Return this process's job runner, starting its workers on first use.
+
+        Workers start lazily so that they are created in the serving process
+        rather than in a parent that forks gunicorn workers.
+        """
+
+        def build():
+            from api_engine.job_queue import open_queue
+            from api_engine.jobs import JobRunner, JobStore
+
+            queue = open_queue(
+                app.config["JOB_QUEUE"],
+                app.config["JOBS_DB"],
+                max_attempts=app.config["JOB_MAX_ATTEMPTS"],
+            )
+            runner = JobRunner(
+                JobStore(app.config["JOBS_DB"], queue),
+                get_pipeline,
+                workers=app.config["JOB_WORKERS"],
+                lease_seconds=app.config["JOB_LEASE_SECONDS"],
+            )
+            runner.start()
+            return runner
+
+        return components.get(component_key("job_runner"), build)
+
+    def get_scan_cache():
+        """Return this process's scan result cache."""
+
+        def build():
+            from app.cache import ScanCache
+
+            return ScanCache(
+                get_job_runner(),
+                ttl=app.config["CACHE_TTL"],
+                stale_ttl=app.config["CACHE_STALE_TTL"],
+            )
+
+        return components.get(component_key("scan_cache"), build)
+
+    def get_bulk_scanner():
+        """Return this process's bulk scan worker pool."""
+
+        def build():
+            from api_engine.bulk import BulkScanner
+
+            # Every bulk worker holds a pooled browser, so never run more
+            # workers than there are browsers
+            return BulkScanner(
+                lambda: get_pipeline(shared_browsers=True),
+                workers=min(
+                    app.config["BULK_WORKERS"], app.config["BROWSER_POOL_SIZE"]
+                ),
+                idle_timeout=app.config["BROWSER_IDLE_TIMEOUT"],
+            )
+
+        return components.get(component_key("bulk_scanner"), build)
+
+    def submit_har_upload(upload, label, request_type, options):
+        """Save an uploaded HAR file and queue a job that imports it.
+
+        Args:
+            upload: The uploaded file
+            label: URL the HAR was recorded from, or empty
+            request_type: Method selection to filter
+            options: Extra pipeline run options
+
+        Returns:
+            Job: The queued job
+        """
+        import uuid
+
+        from werkzeug.utils import secure_filename
+
+        upload_dir = app.config["UPLOAD_DIR"]
+        os.makedirs(upload_dir, exist_ok=True)
+        name = secure_filename(upload.filename) or "upload.har"
+        path = os.path.join(upload_dir, f"{uuid.uuid4().hex}-{name}")
+        upload.save(path)
+
+        # The run keeps its own link to the file, so the job removes the upload
+        options = dict(options, har_file=path, owned_files=[path])
+        return get_job_runner().submit(label or name, request_type, options)
+
+    def warm_up():
+        """Build this process's components ahead of the first request.
+
+        Imports the pipeline modules, builds the shared resources and
+        pipelines, starts the job and bulk scan workers, launches one pooled
+        browser per bulk worker and opens the LLM connection. Failures are
+        logged and do not stop the process from serving.
+
+        Returns:
+            dict: Seconds spent on each step
+        """
+
+        def import_modules():
+            for module in WARM_UP_MODULES:
+                importlib.import_module(module)
+
+        steps = [
+            ("imports", import_modules),
+            ("resources", get_scan_resources),
+            ("pipelines", lambda: (get_pipeline(), get_pipeline(True))),
+            ("job_runner", get_scan_cache),
+            ("browsers", lambda: get_bulk_scanner().warm_up()),
+            ("llm_connection", lambda: get_scan_resources().llm_dispatcher.warm_up()),
+        ]
+        timings = {}
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                app.logger.error(f"Warm-up step {name} failed: {str(e)}")
+            timings[name] = time.perf_counter() - started
+        app.logger.info(
+            "Warm-up finished in "
+            f"{sum(timings.values()):.2f}s: "
+            + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+        )
+        return timings
+
+    app.extensions["scan_resources"] = get_scan_resources
+    app.extensions["pipeline"] = get_pipeline
+    app.extensions["bulk_scanner"] = get_bulk_scanner
+    app.extensions["warm_up"] = warm_up
+    app.extensions["job_runner"] = get_job_runner
+    app.extensions["scan_cache"] = get_scan_cache
+    app.extensions["knowledge_store"] = get_knowledge_store
 
     # Route definitions
     @app.route("/", methods=["GET", "POST"])
     def index():
         """Main page route handler."""
-        endpoints = None
+        from api_engine.filter import normalize_methods
+
         url_input = request.form.get("url", "")
-        request_type = request.form.get("request_type", "GET")
+        # Several methods, or ALL, are scanned from one capture and analysis
+        request_type = normalize_methods(
+            [m for m in request.form.getlist("request_type") if m.strip()] or "GET"
+        )
+        profile = request.form.get("profile") == "on"
+        har_upload = request.files.get("har_file")
 
         # Prepend 'http://' if the URL doesn't start with a protocol
         if url_input and not url_input.startswith(("http://", "https://")):
             url_input = "http://" + url_input
 
         if request.method == "POST":
+            if har_upload and har_upload.filename:
+                try:
+                    options = {"profile": True} if profile else {}
+                    job = submit_har_upload(
+                        har_upload, url_input, request_type, options
+                    )
+                    return redirect(url_for("job_page", job_id=job.id))
+                except Exception as e:
+                    flash(f"An error occurred: {str(e)}")
+                    return render_template(
+                        "index.html",
+                        endpoints=None,
+                        url_input=url_input,
+                        request_type=request_type,
+                    )
+
             if not url_input:
-                flash("Please provide a URL to analyze.")
+                flash("Please provide a URL or a HAR file to analyze.")
                 return render_template(
                     "index.html",
-                    endpoints=endpoints,
+                    endpoints=None,
                     url_input=url_input,
                     request_type=request_type,
                 )
 
             try:
-                # Import here to avoid circular imports
-                from api_engine.pipeline import ApiDetectionPipeline
-
-                # Create and run the API detection pipeline
-                pipeline = ApiDetectionPipeline(
-                    output_dir=app.config["OUTPUT_DIR"],
-                    openai_api_key=app.config["OPENAI_API_KEY"],
-                    openai_model=app.config["OPENAI_MODEL"],
-                )
-
-                success, api_results, _ = pipeline.run(
-                    url=url_input, request_type=request_type
+                options = {"profile": True} if profile else {}
+                job, outcome = get_scan_cache().submit(
+                    url_input,
+                    request_type,
+                    options,
+                    config={"model": app.config["OPENAI_MODEL"]},
                 )
+                if outcome in ("hit", "stale_hit"):
+                    from app.cache import cache_age
 
-                if success and api_results:
-                    # Use the API results directly instead of loading from file
-                    endpoints = api_results.endpoints
-                else:
-                    flash("Pipeline execution failed. Check logs for details.")
-
+                    minutes = int(cache_age(job) // 60)
+                    message = f"Showing cached results from {minutes} minute(s) ago."
+                    if outcome == "stale_hit":
+                        message += " A fresh scan is running in the background."
+                    flash(message)
+                elif outcome == "coalesced":
+                    flash("An identical scan is already running; showing its progress.")
+                return redirect(url_for("job_page", job_id=job.id))
             except Exception as e:
                 flash(f"An error occurred: {str(e)}")
 
         return render_template(
             "index.html",  # Fixed template name
-            endpoints=endpoints,
+            endpoints=None,
             url_input=url_input,
             request_type=request_type,
         )
 
+    @app.route("/jobs/<job_id>")
+    def job_page(job_id):
+        """Show a job's progress, then its results once it has finished."""
+        job = get_job_runner().store.get(job_id)
+        if job is None:
+            abort(404)
+
+        if job.status == "failed":
+            flash(f"Pipeline execution failed: {job.error}")
+
+        return render_template(
+            "index.html",
+            job=job,
+            endpoints=job.result.endpoints if job.result else None,
+            url_input=job.url,
+            request_type=job.request_type,
+        )
+
+    @app.route("/jobs/<job_id>/events")
+    def job_events(job_id):
+        """Stream a job's progress as Server-Sent Events.
+
+        Replays the events recorded so far, then follows new ones: "status"
+        on status changes, "stage_started" and "stage_finished" with stage
+        counts, "endpoint" with each documented endpoint, and a final "done"
+        once the job has finished. Reconnecting clients resume after the
+        Last-Event-ID they received; streams of unfinished jobs are closed
+        after EVENTS_MAX_STREAM seconds for the client to reconnect.
+        """
+        store = get_job_runner().store
+        if store.status(job_id) is None:
+            abort(404)
+
+        last_id = request.headers.get("Last-Event-ID", "0")
+        last_id = int(last_id) if last_id.isdigit() else 0
+
+        def stream():
+            nonlocal last_id
+            reported_status = None
+            last_sent = opened = time.monotonic()
+            while True:
+                # Read the status before the events, so every event written
+                # before the job finished is sent ahead of "done"
+                status = store.status(job_id)
+                for event in store.events(job_id, last_id):
+                    last_id = event.id
+                    yield _sse(event.type, event.data, event.id)
+                    last_sent = time.monotonic()
+
+                if status != reported_status:
+                    reported_status = status
+                    yield _sse("status", {"status": status})
+                    last_sent = time.monotonic()
+
+                if status in ("succeeded", "failed"):
+                    yield _sse("done", {"status": status})
+                    return
+
+                if time.monotonic() - opened > EVENTS_MAX_STREAM:
+                    yield f"retry: {EVENTS_RECONNECT_MS}\n\n"
+                    return
+
+                if time.monotonic() - last_sent > EVENTS_KEEPALIVE:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+                time.sleep(EVENTS_POLL_INTERVAL)
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/api/jobs/<job_id>")
+    def job_status(job_id):
+        """Return a job's status and, once finished, its results."""
+        job = get_job_runner().store.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.model_dump(mode="json"))
+
+    @app.route("/api/scans", methods=["POST"])
+    def bulk_scan():
+        """Scan a batch of URLs and stream one NDJSON result line per URL.
+
+        The body is {"targets": [{"url": ..., "methods": ["GET", ...]}, ...]}.
+        Lines are written as each URL finishes, in completion order, and carry
+        the target's index in the request.
+        """
+        from pydantic import ValidationError
+
+        from api_engine.models import BulkScanRequest
+
+        try:
+            scan_request = BulkScanRequest.model_validate(
+                request.get_json(silent=True) or {}
+            )
+        except ValidationError as e:
+            return (
+                jsonify(
+                    {
+                        "error": "Invalid scan request",
+                        "details": e.errors(include_url=False, include_context=False),
+                    }
+                ),
+                400,
+            )
+
+        if len(scan_request.targets) > app.config["BULK_MAX_TARGETS"]:
+            return (
+                jsonify(
+                    {
+                        "error": f"At most {app.config['BULK_MAX_TARGETS']} "
+                        "targets per request"
+                    }
+                ),
+                400,
+            )
+
+        scanner = get_bulk_scanner()
+
+        def stream():
+            for result in scanner.scan(scan_request.targets):
+                yield result.model_dump_json() + "\n"
+
+        return Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+
+    @app.route("/api/knowledge")
+    def knowledge():
+        """Return endpoints discovered by earlier scans, most useful first.
+
+        Optional query parameters: site (host and port), method, min_score,
+        since (Unix time of the last capture containing the endpoint) and
+        limit (default 100, at most 1000).
+        """
+        from api_engine.filter import normalize_methods
+
+        method = request.args.get("method", "").strip()
+        endpoints = get_knowledge_store().query(
+            site=request.args.get("site"),
+            method=normalize_methods(method) if method else None,
+            min_score=request.args.get("min_score", type=int),
+            seen_since=request.args.get("since", type=float),
+            limit=min(request.args.get("limit", 100, type=int), 1000),
+        )
+        return jsonify([endpoint.model_dump(mode="json") for endpoint in endpoints])
+
+    @app.route("/api/knowledge/sites")
+    def knowledge_sites():
+        """Return each scanned site with its endpoint count and last capture time."""
+        return jsonify(get_knowledge_store().sites())
+
+    @app.route("/api/resources/stats")
+    def resource_stats():
+        """Return usage of the shared resources and the components of this process."""
+        stats = get_scan_resources().stats()
+        stats["components"] = components.stats()
+        return jsonify(stats)
+
+    @app.route("/api/cache/stats")
+    def cache_stats():
+        """Return result cache hit, miss and coalesced counts."""
+        return jsonify(get_scan_cache().stats())
+
+    @app.route("/api/jobs/stats")
+    def job_stats():
+        """Return queue depth and worker utilization."""
+        return jsonify(get_job_runner().stats())
+
+    @app.route("/api/workers")
+    def job_workers():
+        """Return the throughput of every job runner that reported recently."""
+        runner = get_job_runner()
+        return jsonify(
+            {
+                "queue": runner.queue.depth(),
+                "workers": [w.model_dump() for w in runner.store.workers()],
+            }
+        )
+
+    @app.route("/metrics")
+    def metrics():
+        """Expose pipeline metrics in the Prometheus text format."""
+        from api_engine.metrics import registry
+
+        stats = get_job_runner().stats()
+        lines = [
+            "# HELP api_jobs_queue_depth Jobs waiting to run.",
+            "# TYPE api_jobs_queue_depth gauge",
+            f"api_jobs_queue_depth {stats['queue_depth']}",
+            "# HELP api_jobs_busy_workers Job workers currently running a job.",
+            "# TYPE api_jobs_busy_workers gauge",
+            f"api_jobs_busy_workers {stats['busy_workers']}",
+            "# HELP api_jobs_worker_utilization Average share of time workers are busy.",
+            "# TYPE api_jobs_worker_utilization gauge",
+            f"api_jobs_worker_utilization {stats['average_utilization']:.6f}",
+            "# HELP api_jobs_retried_total Jobs requeued after their worker stopped responding.",
+            "# TYPE api_jobs_retried_total counter",
+            f"api_jobs_retried_total {stats['retried']}",
+        ]
+        workers = get_job_runner().store.workers()
+        lines += [
+            "# HELP api_worker_jobs_total Jobs finished by each job runner.",
+            "# TYPE api_worker_jobs_total counter",
+        ]
+        for worker in workers:
+            for outcome in ("completed", "failed"):
+                lines.append(
+                    f'api_worker_jobs_total{{worker="{worker.worker}",'
+                    f'outcome="{outcome}"}} {getattr(worker, outcome)}'
+                )
+        lines += [
+            "# HELP api_worker_jobs_per_minute Jobs finished per minute by each job runner.",
+            "# TYPE api_worker_jobs_per_minute gauge",
+        ]
+        for worker in workers:
+            lines.append(
+                f'api_worker_jobs_per_minute{{worker="{worker.worker}"}}'
+                f" {worker.jobs_per_minute:.6f}"
+            )
+        lines += [
+            "# HELP api_scan_cache_requests_total Scan submissions by cache outcome.",
+            "# TYPE api_scan_cache_requests_total counter",
+        ]
+        for outcome, count in sorted(get_scan_cache().stats().items()):
+            lines.append(
+                f'api_scan_cache_requests_total{{outcome="{outcome}"}} {count}'
+            )
+        body = registry.to_prometheus() + "\n".join(lines) + "\n"
+        return Response(body, mimetype="text/plain; version=0.0.4")
+
+    @app.route("/metrics/traces")
+    def metrics_traces():
+        """Return span-style traces of the most recent pipeline runs."""
+        from api_engine.metrics import registry
+
+        return jsonify(registry.traces())
+
     return app
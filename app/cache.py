@@ -0,0 +1,134 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from api_engine.filter import normalize_methods
+from api_engine.jobs import JobRunner
+from api_engine.models import Job
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so equivalent spellings share a cache entry.
+
+    Lowercases the scheme and host, drops default ports, fragments and a
+    trailing slash, and sorts query parameters.
+
+    Args:
+        url: URL as submitted
+
+    Returns:
+        str: Normalized URL
+    """
+    url = url.strip()
+    if not url.lower().startswith(("http://", "https://")):
+        url = "http://" + url
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def cache_key(url: str, request_type: str, config: Dict) -> str:
+    """Build the cache key for a scan.
+
+    Args:
+        url: URL to scan
+        request_type: Method selection to filter; selections naming the same
+            methods in any order or case share a key
+        config: Settings that change the results, such as the model
+
+    Returns:
+        str: Hex digest identifying equivalent scans
+    """
+    payload = json.dumps(
+        [normalize_url(url), normalize_methods(request_type), config], sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ScanCache:
+    """TTL result cache with single-flight coalescing in front of the job queue.
+
+    Finished results are served while younger than ttl. With a stale_ttl,
+    results up to ttl + stale_ttl old are still served, and a refresh job is
+    queued in the background. Submissions of a scan that is already queued or
+    running attach to that job instead of starting another one.
+    """
+
+    def __init__(self, runner: JobRunner, ttl: float = 3600, stale_ttl: float = 0):
+        """Initialize the cache.
+
+        Args:
+            runner: Job runner whose store holds results and in-flight jobs
+            ttl: Seconds a result is fresh, 0 disables caching
+            stale_ttl: Extra seconds a result may be served while refreshing
+        """
+        self.runner = runner
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0}
+
+    def submit(
+        self, url: str, request_type: str, options: Dict, config: Dict
+    ) -> Tuple[Job, str]:
+        """Return a cached result, an in-flight job, or a newly queued job.
+
+        Args:
+            url: URL to scan
+            request_type: HTTP method to filter
+            options: Pipeline run options that do not affect results
+            config: Settings that change the results, part of the cache key
+
+        Returns:
+            tuple: (job, outcome) where outcome is "hit", "stale_hit",
+            "coalesced" or "miss"
+        """
+        key = cache_key(url, request_type, config)
+        store = self.runner.store
+
+        cached = store.latest_succeeded(key) if self.ttl > 0 else None
+        age = time.time() - cached.finished_at if cached else None
+
+        if cached and age < self.ttl:
+            self._count("hits")
+            return cached, "hit"
+
+        job, created = store.find_or_create(url, request_type, options, key)
+        if created:
+            self.runner.wake()
+
+        if cached and age < self.ttl + self.stale_ttl:
+            self._count("stale_hits")
+            return cached, "stale_hit"
+
+        if created:
+            self._count("misses")
+            return job, "miss"
+
+        self._count("coalesced")
+        return job, "coalesced"
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, stale hit, miss and coalesced counts for this process."""
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+
+
+def cache_age(job: Job) -> Optional[float]:
+    """Return how many seconds ago a finished job completed."""
+    return time.time() - job.finished_at if job.finished_at else None
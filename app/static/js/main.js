@@ -5,3 +5,163 @@ function copyToClipboard(text) {
         console.error('Failed to copy: ', err);
     });
 }
+
+
+const STAGE_LABELS = {
+    capture: 'Capturing network traffic',
+    filter: 'Filtering requests',
+    analyze: 'Analyzing endpoints',
+    match: 'Matching requests',
+    headers: 'Finding necessary headers',
+};
+
+function element(tag, className, text) {
+    const el = document.createElement(tag);
+    if (className) {
+        el.className = className;
+    }
+    if (text !== undefined) {
+        el.textContent = text;
+    }
+    return el;
+}
+
+function stageSummary(stage) {
+    const parts = [];
+    if (stage.har_entries) {
+        parts.push(`${stage.har_entries} HAR entries`);
+    }
+    if (stage.endpoints_in || stage.endpoints_out) {
+        parts.push(`${stage.endpoints_in} in, ${stage.endpoints_out} out`);
+    }
+    if (stage.endpoints_reused) {
+        parts.push(`${stage.endpoints_reused} reused`);
+    }
+    if (stage.llm_requests) {
+        parts.push(`${stage.llm_requests} LLM requests`);
+    }
+    if (stage.resumed) {
+        parts.push('resumed');
+    }
+    parts.push(`${stage.wall_time.toFixed(1)}s`);
+    return parts.join(' · ');
+}
+
+function updateStage(list, name, state, summary) {
+    let item = list.querySelector(`[data-stage="${name}"]`);
+    if (!item) {
+        item = element('li', 'list-group-item d-flex justify-content-between align-items-center');
+        item.dataset.stage = name;
+        item.appendChild(element('span', 'stage-name', STAGE_LABELS[name] || name));
+        item.appendChild(element('span', 'stage-summary'));
+        list.appendChild(item);
+    }
+    item.classList.remove('list-group-item-success', 'list-group-item-danger');
+    if (state === 'done') {
+        item.classList.add('list-group-item-success');
+    } else if (state === 'failed') {
+        item.classList.add('list-group-item-danger');
+    }
+    item.querySelector('.stage-summary').textContent = summary;
+}
+
+function endpointCard(endpoint) {
+    const card = element('div', 'endpoint-card');
+
+    const header = element('div', 'endpoint-header');
+    const top = element('div', 'd-flex justify-content-between align-items-start');
+    const urlContainer = element('div', 'url-container flex-grow-1');
+    urlContainer.appendChild(element('div', 'url-text', endpoint.url));
+    const copyButton = element('button', 'btn btn-sm btn-outline-secondary copy-btn', 'Copy');
+    copyButton.addEventListener('click', () => copyToClipboard(endpoint.url));
+    urlContainer.appendChild(copyButton);
+    top.appendChild(urlContainer);
+    top.appendChild(element('span', 'badge badge-primary score-badge ml-2', `Score: ${endpoint.usefulness_score}`));
+    header.appendChild(top);
+    const method = element('div', 'mt-2');
+    method.appendChild(element('span', 'badge badge-secondary', endpoint.method));
+    header.appendChild(method);
+    card.appendChild(header);
+
+    const body = element('div', 'endpoint-body');
+    const row = element('div', 'row');
+
+    const description = element('div', 'col-12 mb-4');
+    description.appendChild(element('div', 'section-title', 'Description'));
+    description.appendChild(element('p', 'mb-0', endpoint.description));
+    row.appendChild(description);
+
+    const headers = element('div', 'col-md-6 mb-4');
+    headers.appendChild(element('div', 'section-title', 'Required Headers'));
+    const headersList = element('ul', 'headers-list');
+    for (const [key, value] of Object.entries(endpoint.required_headers)) {
+        const item = element('li');
+        item.appendChild(element('strong', null, `${key}:`));
+        item.appendChild(document.createTextNode(' '));
+        item.appendChild(element('span', 'text-muted', value));
+        headersList.appendChild(item);
+    }
+    headers.appendChild(headersList);
+    row.appendChild(headers);
+
+    const params = element('div', 'col-md-6 mb-4');
+    params.appendChild(element('div', 'section-title', 'Example Parameters'));
+    if (endpoint.example_params && Object.keys(endpoint.example_params).length) {
+        params.appendChild(element('pre', 'mb-0', JSON.stringify(endpoint.example_params, null, 2)));
+    } else {
+        params.appendChild(element('p', 'text-muted mb-0', 'No parameters'));
+    }
+    row.appendChild(params);
+
+    const curl = element('div', 'col-12');
+    curl.appendChild(element('div', 'section-title', 'cURL Example'));
+    curl.appendChild(element('pre', 'mb-0', endpoint.curl_example));
+    row.appendChild(curl);
+
+    body.appendChild(row);
+    card.appendChild(body);
+    return card;
+}
+
+function followJob(container) {
+    const stages = container.querySelector('#stage-progress');
+    const title = container.querySelector('#live-endpoints-title');
+    const endpoints = container.querySelector('#live-endpoints');
+    const source = new EventSource(container.dataset.eventsUrl);
+
+    source.addEventListener('stage_started', (e) => {
+        const stage = JSON.parse(e.data);
+        updateStage(stages, stage.name, 'running', 'running…');
+    });
+
+    source.addEventListener('stage_finished', (e) => {
+        const stage = JSON.parse(e.data);
+        updateStage(stages, stage.name, stage.success ? 'done' : 'failed', stageSummary(stage));
+    });
+
+    source.addEventListener('retry', () => {
+        // Another worker runs the job again and resends its endpoints
+        endpoints.replaceChildren();
+        title.classList.add('d-none');
+    });
+
+    source.addEventListener('endpoint', (e) => {
+        title.classList.remove('d-none');
+        endpoints.appendChild(endpointCard(JSON.parse(e.data)));
+    });
+
+    source.addEventListener('done', () => {
+        // The finished job page renders the complete, final results
+        source.close();
+        window.location.reload();
+    });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const container = document.getElementById('live-results');
+    if (container && window.EventSource) {
+        followJob(container);
+    } else if (container) {
+        setTimeout(() => window.location.reload(), 3000);
+    }
+});
@@ -15,4 +15,7 @@ if __name__ == "__main__":
     port = int(os.environ.get("FLASK_RUN_PORT", 5000))
     debug = os.environ.get("FLASK_DEBUG", "false").lower() == "true"
 
+    if application.config["WARM_UP"]:
+        application.extensions["warm_up"]()
+
     application.run(host=host, port=port, debug=debug)
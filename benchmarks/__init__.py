@@ -0,0 +1,4 @@
+import os
+
+# Keep per-call info logging out of benchmark timings unless asked for
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,48 @@
+"""End-to-end benchmark of ApiDetectionPipeline with local stand-ins."""
+
+import tempfile
+from typing import Dict
+
+from benchmarks.harness import measure
+from benchmarks.standins import TargetServer, build_pipeline
+from benchmarks.synthetic_har import generate_har
+
+
+def run(har_config: Dict, repeat: int = 3) -> Dict[str, Dict]:
+    """Run the whole pipeline against a synthetic HAR and a local server.
+
+    The HAR's API endpoints point at the local target server so the header
+    optimizer probes real HTTP responses.
+
+    Args:
+        har_config: Keyword arguments for generate_har
+        repeat: Timed pipeline runs
+
+    Returns:
+        Dict: Benchmark name to timing result, including per-stage medians
+    """
+    results = {}
+    stage_times = {}
+
+    with TargetServer() as server, tempfile.TemporaryDirectory() as output_dir:
+        har = generate_har(**dict(har_config, base_url=server.base_url))
+        pipeline = build_pipeline(har, output_dir=output_dir, retention="none")
+
+        def run_pipeline():
+            success, _, intermediate = pipeline.run(server.base_url, "GET")
+            if not success:
+                raise RuntimeError("Benchmark pipeline run failed")
+            for stage in intermediate["metrics"].stages:
+                stage_times.setdefault(stage.name, []).append(stage.wall_time)
+
+        results["e2e.pipeline"] = measure(run_pipeline, repeat, warmup=0)
+
+    for name, times in stage_times.items():
+        times.sort()
+        results[f"e2e.stage.{name}"] = {
+            "seconds": times[len(times) // 2],
+            "min_seconds": times[0],
+            "repeat": len(times),
+        }
+
+    return results
@@ -0,0 +1,144 @@
+"""Measure the per-probe cost of logging in the header optimization loop.
+
+Each probe logs what the optimizer logs for one header at DEBUG level: the
+header being tested and the outcome, including whether the response body
+changed. The eager scenario formats messages with f-strings as the
+optimizer used to; the others defer formatting to the handler. "caller" is
+the time spent in the probing thread, "total" also includes writing out
+every queued record.
+
+Records go to a file. --write-latency adds a delay to every write, like a
+stdout pipe to a slow log collector, which is where the queue pays off: a
+synchronous handler makes the probing thread wait for each write.
+
+Usage:
+    python -m benchmarks.bench_logging [--probes 20000] [--body-size 20000]
+        [--write-latency 0]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from utils.logger import build_handler
+
+# (name, logger level, eager f-strings, handler options)
+SCENARIOS = (
+    ("sync, eager", logging.DEBUG, True, {"use_queue": False}),
+    ("sync, deferred", logging.DEBUG, False, {"use_queue": False}),
+    ("queue, deferred", logging.DEBUG, False, {}),
+    ("queue, deferred, json", logging.DEBUG, False, {"fmt": "json"}),
+    ("queue, deferred, rate limit", logging.DEBUG, False, {"rate_limit": 10.0}),
+    ("filtered out, eager", logging.INFO, True, {}),
+    ("filtered out, deferred", logging.INFO, False, {}),
+)
+
+
+class _SlowStream:
+    """File wrapper that waits latency seconds on every write."""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, data: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def _probe_loop(logger, probes: int, body: str, eager: bool) -> None:
+    changed_body = body[:-1] + "!"
+    for i in range(probes):
+        header = f"x-header-{i % 40}"
+        current_body = body if i % 2 else changed_body
+        if eager:
+            logger.debug(f"Testing without header: {header}")
+            logger.debug(
+                f"Request changed without {header} (status: 200, body changed: {current_body != body}), keeping it"
+            )
+        else:
+            logger.debug("Testing without header: %s", header)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Request changed without %s (status: %s, body changed: %s), keeping it",
+                    header,
+                    200,
+                    current_body != body,
+                )
+
+
+def run(probes: int = 20000, body_size: int = 20000, write_latency: float = 0.0):
+    """Time the probe loop under each logging setup.
+
+    Args:
+        probes: Header probes per scenario
+        body_size: Length of the compared response bodies
+        write_latency: Seconds added to every write to the log file
+
+    Returns:
+        list: One row per scenario with caller and total microseconds per
+        probe and the bytes written
+    """
+    body = "x" * body_size
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, level, eager, options in SCENARIOS:
+            path = os.path.join(directory, "log.txt")
+            with open(path, "w") as stream:
+                handler, listener = build_handler(
+                    stream=_SlowStream(stream, write_latency), **options
+                )
+                logger = logging.getLogger(f"benchmarks.bench_logging.{len(rows)}")
+                logger.propagate = False
+                logger.setLevel(level)
+                logger.addHandler(handler)
+
+                started = time.perf_counter()
+                _probe_loop(logger, probes, body, eager)
+                caller = time.perf_counter() - started
+                if listener:
+                    listener.stop()
+                total = time.perf_counter() - started
+                logger.removeHandler(handler)
+
+            rows.append(
+                {
+                    "scenario": name,
+                    "caller_us": caller / probes * 1e6,
+                    "total_us": total / probes * 1e6,
+                    "bytes": os.path.getsize(path),
+                }
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--probes", type=int, default=20000, help="Probes per run")
+    parser.add_argument(
+        "--body-size", type=int, default=20000, help="Response body length"
+    )
+    parser.add_argument(
+        "--write-latency",
+        type=float,
+        default=0.0,
+        help="Microseconds added to every log write",
+    )
+    args = parser.parse_args()
+
+    print(f"{'scenario':<30} {'caller (us)':>12} {'total (us)':>11} {'bytes':>11}")
+    for row in run(args.probes, args.body_size, args.write_latency / 1e6):
+        print(
+            f"{row['scenario']:<30} {row['caller_us']:>12.2f} "
+            f"{row['total_us']:>11.2f} {row['bytes']:>11,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
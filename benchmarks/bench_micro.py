@@ -0,0 +1,115 @@
+"""Microbenchmarks for the CPU-bound pipeline stages and model construction."""
+
+from typing import Dict
+
+from api_engine.filter import HarFilter
+from api_engine.headers import HeaderOptimizer
+from api_engine.matcher import HarMatcher
+from api_engine.models import (
+    ApiRequest,
+    EndpointAnalysis,
+    EndpointAnalysisBatch,
+    HeadersRequest,
+    MatchedRequest,
+)
+from api_engine.records import MatchedRecord, RequestRecord
+from benchmarks.harness import measure
+from benchmarks.synthetic_har import generate_har
+
+
+def run(har_config: Dict, repeat: int = 5) -> Dict[str, Dict]:
+    """Run the microbenchmarks against a synthetic HAR.
+
+    Args:
+        har_config: Keyword arguments for generate_har
+        repeat: Timed repetitions per benchmark
+
+    Returns:
+        Dict: Benchmark name to timing result
+    """
+    har = generate_har(**har_config)
+    entries = har["log"]["entries"]
+    har_filter = HarFilter()
+    matcher = HarMatcher()
+    optimizer = HeaderOptimizer()
+
+    _, filtered = har_filter.filter(har, "GET")
+    analyzed = EndpointAnalysisBatch(
+        endpoints=[
+            EndpointAnalysis(url=e.url, explanation="benchmark", usefulness_score=50)
+            for e in filtered
+        ]
+    )
+    # The optimizer documents one request per endpoint and method
+    unique_requests = {}
+    for entry in entries:
+        request = entry["request"]
+        key = (request["url"].split("?")[0], request["method"])
+        unique_requests.setdefault(key, request)
+    headers_requests = [
+        HeadersRequest(
+            api_endpoint=request["url"],
+            method=request["method"],
+            necessary_headers={h["name"]: h["value"] for h in request["headers"]},
+        )
+        for request in unique_requests.values()
+    ]
+    descriptions = {
+        e.url: {"explanation": e.explanation, "usefulness_score": e.usefulness_score}
+        for e in analyzed.endpoints
+    }
+    raw_requests = [
+        (
+            entry["request"],
+            {h["name"]: h["value"] for h in entry["request"]["headers"]},
+            entry["response"]["status"],
+        )
+        for entry in entries
+    ]
+
+    def format_endpoints():
+        for request in headers_requests:
+            optimizer._format_endpoint_data(request, descriptions, headers_requests)
+
+    def construct_api_requests():
+        for request, headers, _ in raw_requests:
+            ApiRequest(
+                url=request["url"].split("?")[0],
+                method=request["method"],
+                query_params={q["name"]: q["value"] for q in request["queryString"]},
+                headers=headers,
+            )
+
+    def construct_matched_requests():
+        for request, headers, status in raw_requests:
+            MatchedRequest(
+                url=request["url"].split("?")[0],
+                method=request["method"],
+                headers=headers,
+                status_code=status,
+            )
+
+    def construct_request_records():
+        for request, headers, _ in raw_requests:
+            RequestRecord(
+                request["url"].split("?")[0],
+                request["method"],
+                {q["name"]: q["value"] for q in request["queryString"]},
+                headers,
+            )
+
+    def construct_matched_records():
+        for request, headers, status in raw_requests:
+            MatchedRecord(
+                request["url"].split("?")[0], request["method"], headers, status
+            )
+
+    return {
+        "micro.filter": measure(lambda: har_filter.filter(har, "GET"), repeat),
+        "micro.match": measure(lambda: matcher.match(har, analyzed), repeat),
+        "micro.format_endpoint_data": measure(format_endpoints, repeat),
+        "micro.model.api_request": measure(construct_api_requests, repeat),
+        "micro.model.matched_request": measure(construct_matched_requests, repeat),
+        "micro.record.request": measure(construct_request_records, repeat),
+        "micro.record.matched": measure(construct_matched_records, repeat),
+    }
@@ -0,0 +1,221 @@
+"""Measure how the process-pool filter and match stages scale with workers.
+
+Two workloads are timed: one large HAR split into entry ranges, and a corpus
+of HAR files split by file, where workers also load and parse the files.
+Each worker count is compared with the single-process HarFilter and
+HarMatcher, and the results are checked to be identical. Each processor
+keeps its worker pool between calls, as a pipeline does, so a first untimed
+call starts the pool; its extra time is reported as the pool start. Workers
+forked for a single HAR are started within every call instead.
+Efficiency is the speedup divided by the worker count; near 1.0 is linear
+scaling, which needs at least as many CPUs as workers.
+
+Usage:
+    python -m benchmarks.bench_parallel [--entries 200000] [--files 32]
+        [--file-entries 5000] [--workers 1,2,4,8]
+        [--start-method fork|forkserver|spawn]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from api_engine.filter import HarFilter
+from api_engine.har_import import load_har
+from api_engine.matcher import HarMatcher
+from api_engine.models import EndpointAnalysis, EndpointAnalysisBatch
+from api_engine.parallel import ParallelHarProcessor
+from benchmarks.synthetic_har import generate_har
+
+
+def _valuable(filtered):
+    """Treat every other filtered endpoint as valuable, as an analysis might."""
+    return EndpointAnalysisBatch(
+        endpoints=[
+            EndpointAnalysis(url=e.url, explanation="benchmark", usefulness_score=50)
+            for e in filtered[::2]
+        ]
+    )
+
+
+def _signature(filtered, matched):
+    """Reduce results to comparable values."""
+    return (
+        [(e.url, sorted(e.methods), e.params, e.sample_headers) for e in filtered],
+        [(m.url, m.method, m.status_code) for m in matched],
+    )
+
+
+def _time(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def _row(setup, seconds, baseline, workers, pool_start=0.0):
+    speedup = baseline / seconds
+    return {
+        "setup": setup,
+        "seconds": seconds,
+        "speedup": speedup,
+        "efficiency": speedup / workers,
+        "pool_start": pool_start,
+    }
+
+
+def _time_warm(processor, function):
+    """Time function on a started pool, returning (seconds, start, result)."""
+    try:
+        cold, _ = _time(function)
+        seconds, result = _time(function)
+    finally:
+        processor.close()
+    return seconds, max(0.0, cold - seconds), result
+
+
+def bench_har(entries: int, worker_counts, start_method=None):
+    """Time filtering and matching one large HAR.
+
+    Args:
+        entries: Entries in the HAR
+        worker_counts: Worker counts to try
+        start_method: Start method of the pools, None for the default
+
+    Returns:
+        list: One row per setup with seconds and speedup over one process
+    """
+    har = generate_har(entries=entries, endpoints=500)
+
+    def serial():
+        _, filtered = HarFilter().filter(har, "GET")
+        _, matched = HarMatcher().match(har, _valuable(filtered))
+        return filtered, matched
+
+    baseline, (filtered, matched) = _time(serial)
+    expected = _signature(filtered, matched)
+    rows = [_row("single process", baseline, baseline, 1)]
+
+    for workers in worker_counts:
+        processor = ParallelHarProcessor(workers=workers, start_method=start_method)
+
+        def parallel():
+            filtered = processor.filter_har(har, "GET")
+            matched = processor.match_har(
+                har, [e.url for e in _valuable(filtered).endpoints]
+            )
+            return filtered, matched
+
+        seconds, start, (filtered, matched) = _time_warm(processor, parallel)
+        assert _signature(filtered, matched) == expected, "results differ"
+        rows.append(_row(f"{workers} workers", seconds, baseline, workers, start))
+    return rows
+
+
+def bench_corpus(files: int, file_entries: int, worker_counts, start_method=None):
+    """Time filtering and matching a corpus of HAR files, including parsing.
+
+    Args:
+        files: Number of HAR files
+        file_entries: Entries per file
+        worker_counts: Worker counts to try
+        start_method: Start method of the pools, None for the default
+
+    Returns:
+        list: One row per setup with seconds and speedup over one process
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(files):
+            path = os.path.join(directory, f"{i}.har")
+            with open(path, "w") as f:
+                json.dump(generate_har(entries=file_entries, seed=i), f)
+            paths.append(path)
+
+        def serial():
+            har_filter, matcher = HarFilter(), HarMatcher()
+            grouped = {}
+            for path in paths:
+                har = load_har(path)
+                for url, requests in har_filter._process_har_data(har, "GET").items():
+                    grouped.setdefault(url, []).extend(requests)
+            filtered = har_filter._convert_to_filtered_endpoints(grouped)
+            valuable = [e.url for e in _valuable(filtered).endpoints]
+            matched = []
+            for path in paths:
+                requests = matcher._extract_har_requests(load_har(path))
+                matched.extend(matcher._match_endpoints(requests, valuable))
+            return filtered, matched
+
+        baseline, (filtered, matched) = _time(serial)
+        expected = _signature(filtered, matched)
+        rows = [_row("single process", baseline, baseline, 1)]
+
+        for workers in worker_counts:
+            processor = ParallelHarProcessor(workers=workers, start_method=start_method)
+
+            def parallel():
+                filtered = processor.filter_files(paths, "GET")
+                matched = processor.match_files(
+                    paths, [e.url for e in _valuable(filtered).endpoints]
+                )
+                return filtered, matched
+
+            seconds, start, (filtered, matched) = _time_warm(processor, parallel)
+            assert _signature(filtered, matched) == expected, "results differ"
+            rows.append(_row(f"{workers} workers", seconds, baseline, workers, start))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--entries", type=int, default=200000, help="Entries in the large HAR"
+    )
+    parser.add_argument("--files", type=int, default=32, help="HAR files in the corpus")
+    parser.add_argument(
+        "--file-entries", type=int, default=5000, help="Entries per corpus file"
+    )
+    parser.add_argument(
+        "--workers",
+        default=",".join(
+            str(n) for n in (1, 2, 4, 8, 16, 32) if n <= (os.cpu_count() or 1)
+        ),
+        help="Comma-separated worker counts",
+    )
+    parser.add_argument(
+        "--start-method",
+        choices=("fork", "forkserver", "spawn"),
+        help="Worker start method, as chosen by ParallelHarProcessor by default",
+    )
+    args = parser.parse_args()
+    worker_counts = [int(n) for n in args.workers.split(",")]
+
+    print(f"CPUs: {os.cpu_count()}, start method: {args.start_method or 'default'}")
+    for title, rows in (
+        (
+            f"one HAR, {args.entries} entries",
+            bench_har(args.entries, worker_counts, args.start_method),
+        ),
+        (
+            f"corpus, {args.files} files x {args.file_entries} entries",
+            bench_corpus(
+                args.files, args.file_entries, worker_counts, args.start_method
+            ),
+        ),
+    ):
+        print(f"\n{title}")
+        print(
+            f"{'setup':<16} {'seconds':>9} {'speedup':>8} {'efficiency':>11}"
+            f" {'pool start':>11}"
+        )
+        for row in rows:
+            print(
+                f"{row['setup']:<16} {row['seconds']:>9.2f} {row['speedup']:>7.2f}x"
+                f" {row['efficiency']:>11.2f} {row['pool_start']:>10.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
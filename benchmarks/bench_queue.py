@@ -0,0 +1,122 @@
+"""Measure job queue throughput and crash recovery for each queue backend.
+
+Jobs are put into an empty queue, then leased and acked by concurrent
+worker threads, as job runners in separate processes would. A second pass
+leases jobs without acking them, as crashed workers would, and times how
+long reaping takes to hand them all back. The Redis backend runs against the
+in-process LocalRedis stand-in, so it measures the queue logic rather than
+the network.
+
+Usage:
+    python -m benchmarks.bench_queue [--jobs 2000] [--workers 4]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from api_engine.job_queue import FileJobQueue, RedisJobQueue, SqliteJobQueue
+from benchmarks.standins import LocalRedis
+
+
+def _backends(directory):
+    return [
+        ("sqlite", SqliteJobQueue(os.path.join(directory, "queue.db"))),
+        ("file", FileJobQueue(os.path.join(directory, "queue"))),
+        ("redis (local)", RedisJobQueue(LocalRedis())),
+    ]
+
+
+def _drain(queue, workers):
+    """Lease and ack every queued job on worker threads, returning the count."""
+    done = []
+
+    def work(worker):
+        count = 0
+        while True:
+            lease = queue.lease(worker, 60)
+            if lease is None:
+                break
+            queue.ack(lease)
+            count += 1
+        done.append(count)
+
+    threads = [
+        threading.Thread(target=work, args=(f"bench:{i}",)) for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(done)
+
+
+def run(jobs: int = 2000, workers: int = 4) -> list:
+    """Time each backend.
+
+    Args:
+        jobs: Jobs put through each queue
+        workers: Concurrent worker threads
+
+    Returns:
+        list: One row per backend
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, queue in _backends(directory):
+            started = time.perf_counter()
+            for i in range(jobs):
+                queue.put(f"job-{i}")
+            put_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            handled = _drain(queue, workers)
+            drain_seconds = time.perf_counter() - started
+            assert handled == jobs, f"{name}: {handled} of {jobs} jobs handled"
+
+            # Crashed workers: leases that are never acked nor heartbeated
+            crashed = max(1, jobs // 10)
+            for i in range(crashed):
+                queue.put(f"crashed-{i}")
+            while queue.lease("crashed", 0) is not None:
+                pass
+            started = time.perf_counter()
+            requeued, abandoned = queue.reap()
+            reap_seconds = time.perf_counter() - started
+            assert len(requeued) == crashed and not abandoned
+            assert _drain(queue, workers) == crashed
+
+            rows.append(
+                {
+                    "backend": name,
+                    "puts_per_second": jobs / put_seconds,
+                    "jobs_per_second": jobs / drain_seconds,
+                    "reap_ms": reap_seconds * 1000,
+                    "crashed": crashed,
+                }
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=2000, help="Jobs per backend")
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Concurrent worker threads"
+    )
+    args = parser.parse_args()
+
+    print(f"{args.jobs} jobs, {args.workers} workers")
+    print(f"{'backend':<14} {'puts/s':>9} {'lease+ack/s':>12} {'reap':>18}")
+    for row in run(args.jobs, args.workers):
+        print(
+            f"{row['backend']:<14} {row['puts_per_second']:>9.0f}"
+            f" {row['jobs_per_second']:>12.0f}"
+            f" {row['reap_ms']:>8.1f} ms / {row['crashed']:<5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
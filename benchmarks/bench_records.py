@@ -0,0 +1,149 @@
+"""Compare the filter and match hot paths on validated models and on records.
+
+The model variants build an ApiRequest or MatchedRequest per HAR entry, as the
+stages did before they moved to the RequestRecord and MatchedRecord tuples.
+Each variant reports its time, the peak memory traced while it ran and the
+memory still held by its result, scaled to 100k HAR entries.
+
+Usage:
+    python -m benchmarks.bench_records [--entries 100000] [--repeat 3]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import defaultdict
+
+from api_engine.filter import HarFilter
+from api_engine.matcher import HarMatcher
+from api_engine.models import ApiRequest, MatchedRequest
+from benchmarks.synthetic_har import generate_har
+
+
+def filter_models(har_data, request_type):
+    """Group requests as ApiRequest models, the former HarFilter loop."""
+    grouped_requests = defaultdict(list)
+    for entry in har_data["log"]["entries"]:
+        request = entry["request"]
+        if request["method"] == request_type:
+            headers = {h["name"]: h["value"] for h in request.get("headers", [])}
+            grouped_requests[request["url"].split("?")[0]].append(
+                ApiRequest(
+                    url=request["url"].split("?")[0],
+                    method=request["method"],
+                    query_params={
+                        q["name"]: q["value"] for q in request.get("queryString", [])
+                    },
+                    headers={
+                        k: v
+                        for k, v in headers.items()
+                        if k.lower() in ["authorization", "content-type"]
+                    },
+                    post_data=request.get("postData", {}).get("text", None),
+                )
+            )
+    return grouped_requests
+
+
+def match_models(har_data, valuable_endpoints):
+    """Match requests into MatchedRequest models, the former HarMatcher loop."""
+    requests = [
+        {
+            "url": entry["request"]["url"].split("?")[0],
+            "method": entry["request"]["method"],
+            "headers": {h["name"]: h["value"] for h in entry["request"]["headers"]},
+            "status_code": entry["response"]["status"],
+        }
+        for entry in har_data["log"]["entries"]
+    ]
+    matched = []
+    for request in requests:
+        for endpoint in valuable_endpoints:
+            if request["url"].startswith(endpoint):
+                matched.append(MatchedRequest(**request))
+                break
+    return matched
+
+
+def _measure(function, repeat):
+    """Return the best time, traced peak and retained bytes of function()."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak, retained
+
+
+def run(entries: int = 100000, repeat: int = 3) -> list:
+    """Time and trace each variant on a synthetic HAR.
+
+    Args:
+        entries: Entries in the HAR
+        repeat: Timed repetitions per variant, the best is kept
+
+    Returns:
+        list: One row per variant, scaled to 100k entries
+    """
+    har = generate_har(entries=entries, endpoints=500)
+    har_filter, matcher = HarFilter(), HarMatcher()
+    grouped = har_filter._process_har_data(har, "GET")
+    valuable = list(grouped)[::2]
+
+    variants = [
+        ("filter, models", lambda: filter_models(har, "GET")),
+        ("filter, records", lambda: har_filter._process_har_data(har, "GET")),
+        ("match, models", lambda: match_models(har, valuable)),
+        (
+            "match, records",
+            lambda: matcher._match_endpoints(
+                matcher._extract_har_requests(har), valuable
+            ),
+        ),
+    ]
+
+    scale = 100000 / entries
+    rows = []
+    for name, function in variants:
+        seconds, peak, retained = _measure(function, repeat)
+        rows.append(
+            {
+                "variant": name,
+                "seconds": seconds * scale,
+                "peak_mb": peak * scale / 1e6,
+                "retained_mb": retained * scale / 1e6,
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--entries", type=int, default=100000, help="Entries in the HAR"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions")
+    args = parser.parse_args()
+
+    print(f"per 100k entries, from a {args.entries}-entry HAR")
+    print(f"{'variant':<18} {'seconds':>8} {'peak MB':>9} {'retained MB':>12}")
+    for row in run(args.entries, args.repeat):
+        print(
+            f"{row['variant']:<18} {row['seconds']:>8.3f} {row['peak_mb']:>9.1f}"
+            f" {row['retained_mb']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
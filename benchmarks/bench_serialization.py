@@ -0,0 +1,116 @@
+"""Benchmark artifact write/read speed and file size per serialization format.
+
+Usage:
+    python -m benchmarks.bench_serialization [--endpoints N] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from api_engine.models import ApiDetectionResults, EndpointDocumentation
+from api_engine.serialization import ARTIFACT_FORMATS, ArtifactSerializer, msgpack
+
+
+def build_results(endpoint_count: int) -> ApiDetectionResults:
+    """Build a large, realistic-looking results object."""
+    endpoints = []
+    for i in range(endpoint_count):
+        headers = {f"x-header-{h}": f"value-{i}-{h}" * 3 for h in range(12)}
+        endpoints.append(
+            EndpointDocumentation(
+                url=f"https://api.example.com/v1/resource/{i}",
+                description="Returns paginated resource data with user metadata. " * 4,
+                usefulness_score=i % 100,
+                method="GET",
+                required_headers=headers,
+                example_params={"page": str(i), "filter": {"ids": list(range(20))}},
+                curl_example=f"curl 'https://api.example.com/v1/resource/{i}' "
+                + " ".join(f"-H '{k}: {v}'" for k, v in headers.items()),
+            )
+        )
+    return ApiDetectionResults(endpoints=endpoints)
+
+
+def run(endpoint_count: int = 5000, repeat: int = 5) -> list:
+    """Time each format with and without compression.
+
+    Args:
+        endpoint_count: Number of endpoints in the benchmark results
+        repeat: Number of write/read repetitions, the best time is kept
+
+    Returns:
+        list: One result dict per format/compression combination
+    """
+    results = build_results(endpoint_count)
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Baseline: the previous model_dump + json.dump(indent=4) writer
+        path = os.path.join(tmp, "baseline.json")
+        write_times, read_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with open(path, "w") as f:
+                json.dump(results.model_dump(), f, indent=4)
+            write_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            with open(path) as f:
+                ApiDetectionResults(**json.load(f))
+            read_times.append(time.perf_counter() - start)
+        rows.append(
+            {
+                "format": "baseline-json-indent",
+                "compress": False,
+                "write_s": min(write_times),
+                "read_s": min(read_times),
+                "size_bytes": os.path.getsize(path),
+            }
+        )
+
+        for fmt in ARTIFACT_FORMATS:
+            if fmt == "msgpack" and msgpack is None:
+                continue
+            for compress in (False, True):
+                serializer = ArtifactSerializer(fmt, compress)
+                path = os.path.join(tmp, "results" + serializer.extension)
+                write_times, read_times = [], []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    serializer.dump(results, path)
+                    write_times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    serializer.load_model(path, ApiDetectionResults)
+                    read_times.append(time.perf_counter() - start)
+                rows.append(
+                    {
+                        "format": fmt,
+                        "compress": compress,
+                        "write_s": min(write_times),
+                        "read_s": min(read_times),
+                        "size_bytes": os.path.getsize(path),
+                    }
+                )
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--endpoints", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'format':<22}{'gzip':<6}{'write ms':>10}{'read ms':>10}{'size KB':>10}")
+    for row in run(args.endpoints, args.repeat):
+        print(
+            f"{row['format']:<22}{str(row['compress']):<6}"
+            f"{row['write_s'] * 1000:>10.1f}{row['read_s'] * 1000:>10.1f}"
+            f"{row['size_bytes'] / 1024:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Measure import time and first-request latency of a fresh web worker.
+
+Every measurement runs in a new interpreter so that nothing is imported or
+built beforehand. The first-request scenarios run with and without the
+warm-up hook; the warm-up time is reported separately since gunicorn pays
+it at worker boot, before the worker accepts requests.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+MODULES = (
+    "pydantic",
+    "flask",
+    "openai",
+    "playwright.sync_api",
+    "api_engine.models",
+    "api_engine.pipeline",
+    "app",
+)
+
+_IMPORT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - started}}))
+"""
+
+_REQUEST_SCRIPT = """
+import json, time
+timings = {}
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+timings["create_app"] = time.perf_counter() - started
+
+if app.config["WARM_UP"]:
+    started = time.perf_counter()
+    app.extensions["warm_up"]()
+    timings["warm_up"] = time.perf_counter() - started
+
+client = app.test_client()
+for label in ("first", "second"):
+    started = time.perf_counter()
+    client.post("/", data={"url": "http://127.0.0.1:9", "request_type": "GET"})
+    app.extensions["pipeline"]()
+    timings[f"{label}_request"] = time.perf_counter() - started
+
+print(json.dumps(timings))
+"""
+
+
+def _run(script: str, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _environment(warm_up: bool, output_dir: str) -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return dict(
+        os.environ,
+        PYTHONPATH=root,
+        LOG_LEVEL="ERROR",
+        OUTPUT_DIR=output_dir,
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark"),
+        # No job workers, so the submitted scan stays queued
+        JOB_WORKERS="0",
+        # Keep the LLM warm-up local; point it at the real API to time the handshake
+        OPENAI_BASE_URL=os.environ.get("OPENAI_BASE_URL", "http://127.0.0.1:9/v1"),
+        WARM_UP="true" if warm_up else "false",
+    )
+
+
+def run(repeat: int = 3):
+    """Measure module import times and first-request latency.
+
+    A request here is what a worker does for its first scan submission:
+    queue the job and build the pipeline that runs it.
+
+    Args:
+        repeat: Fresh interpreters per measurement
+
+    Returns:
+        tuple: (import rows, request rows), each with median seconds
+    """
+    import_rows = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        env = _environment(False, output_dir)
+        for module in MODULES:
+            samples = [
+                _run(_IMPORT_SCRIPT.format(module=module), env)["seconds"]
+                for _ in range(repeat)
+            ]
+            import_rows.append(
+                {"module": module, "seconds": statistics.median(samples)}
+            )
+
+        request_rows = []
+        for warm_up in (False, True):
+            samples = [
+                _run(_REQUEST_SCRIPT, _environment(warm_up, output_dir))
+                for _ in range(repeat)
+            ]
+            row = {"warm_up": warm_up}
+            for key in samples[0]:
+                row[key] = statistics.median(sample[key] for sample in samples)
+            request_rows.append(row)
+
+    return import_rows, request_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Fresh interpreters per measurement"
+    )
+    args = parser.parse_args()
+
+    import_rows, request_rows = run(args.repeat)
+
+    print(f"{'module':<24} {'import (ms)':>12}")
+    for row in import_rows:
+        print(f"{row['module']:<24} {row['seconds'] * 1000:>12.1f}")
+
+    print()
+    print(
+        f"{'warm-up':<8} {'create_app':>11} {'warm_up':>9} "
+        f"{'1st request':>12} {'2nd request':>12}  (ms)"
+    )
+    for row in request_rows:
+        print(
+            f"{'on' if row['warm_up'] else 'off':<8} "
+            f"{row['create_app'] * 1000:>11.1f} "
+            f"{row.get('warm_up', 0.0) * 1000:>9.1f} "
+            f"{row['first_request'] * 1000:>12.1f} "
+            f"{row['second_request'] * 1000:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Timing, baseline storage and regression comparison for the benchmarks."""
+
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, warmup: int = 1) -> Dict:
+    """Time a callable several times.
+
+    Args:
+        fn: Zero-argument callable to time
+        repeat: Number of timed calls
+        warmup: Number of untimed calls made first
+
+    Returns:
+        Dict: Median and minimum seconds per call and the repeat count
+    """
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "repeat": repeat,
+    }
+
+
+def build_report(results: Dict[str, Dict], config: Dict) -> Dict:
+    """Wrap benchmark results with the environment they were measured in."""
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "config": config,
+        },
+        "results": results,
+    }
+
+
+def save_report(report: Dict, path: str) -> None:
+    """Write a report as a machine-readable baseline."""
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load_report(path: str) -> Dict:
+    """Read a report written by save_report."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.15) -> List[Dict]:
+    """Compare two reports benchmark by benchmark.
+
+    Args:
+        current: Report from this run
+        baseline: Report to compare against
+        threshold: Relative slowdown above which a benchmark is a regression
+
+    Returns:
+        list: One row per benchmark present in both reports
+    """
+    rows = []
+    for name, result in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if not base or not base.get("seconds"):
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        rows.append(
+            {
+                "name": name,
+                "baseline": base["seconds"],
+                "current": result["seconds"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+                "improvement": ratio < 1 - threshold,
+            }
+        )
+    return rows
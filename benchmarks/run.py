@@ -0,0 +1,95 @@
+"""Run the benchmark suite, save baselines and flag regressions.
+
+Usage:
+    python -m benchmarks.run --save baseline.json
+    python -m benchmarks.run --compare baseline.json [--threshold 0.15]
+"""
+
+import argparse
+import sys
+
+from benchmarks import bench_e2e, bench_micro, bench_serialization
+from benchmarks.harness import build_report, compare, load_report, save_report
+
+SUITES = ("micro", "e2e", "serialization")
+
+
+def run_suites(suites, har_config, repeat):
+    """Run the selected suites and merge their results."""
+    results = {}
+
+    if "micro" in suites:
+        results.update(bench_micro.run(har_config, repeat))
+
+    if "e2e" in suites:
+        e2e_config = dict(har_config, entries=min(har_config["entries"], 400))
+        results.update(bench_e2e.run(e2e_config, max(repeat // 2, 1)))
+
+    if "serialization" in suites:
+        for row in bench_serialization.run(har_config["endpoints"] * 20, repeat):
+            name = f"serialization.{row['format']}" + (".gz" if row["compress"] else "")
+            results[f"{name}.write"] = {
+                "seconds": row["write_s"],
+                "size_bytes": row["size_bytes"],
+            }
+            results[f"{name}.read"] = {"seconds": row["read_s"]}
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suite", default=",".join(SUITES))
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--endpoints", type=int, default=100)
+    parser.add_argument("--headers", type=int, default=20)
+    parser.add_argument("--body-size", type=int, default=512)
+    parser.add_argument("--noise-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="Write results to this baseline file")
+    parser.add_argument("--compare", help="Compare results with this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suite(s): {', '.join(sorted(unknown))}")
+
+    har_config = {
+        "entries": args.entries,
+        "endpoints": args.endpoints,
+        "headers": args.headers,
+        "body_size": args.body_size,
+        "noise_ratio": args.noise_ratio,
+        "seed": args.seed,
+    }
+    results = run_suites(suites, har_config, args.repeat)
+    report = build_report(results, dict(har_config, repeat=args.repeat))
+
+    for name, result in sorted(results.items()):
+        print(f"{name:<45}{result['seconds'] * 1000:>12.2f} ms")
+
+    if args.save:
+        save_report(report, args.save)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        rows = compare(report, load_report(args.compare), args.threshold)
+        regressions = [row for row in rows if row["regression"]]
+        print()
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            flag = flag or ("improved" if row["improvement"] else "")
+            print(f"{row['name']:<45}{row['ratio']:>8.2f}x  {flag}")
+        if regressions:
+            print(
+                f"\n{len(regressions)} benchmark(s) regressed by more than "
+                f"{args.threshold:.0%}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""Local stand-ins for the browser, the LLM, the target server and Redis.
+
+They let the full pipeline run offline and deterministically so that
+end-to-end timings measure this code rather than the network.
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict
+
+from api_engine.capture import HarCapture
+from api_engine.headers import HeaderOptimizer
+from api_engine.models import EndpointAnalysis, EndpointAnalysisBatch
+from api_engine.pipeline import ApiDetectionPipeline
+from benchmarks.synthetic_har import NOISE_EXTENSIONS
+
+
+class SyntheticCapture(HarCapture):
+    """HarCapture that returns a prepared HAR instead of launching a browser."""
+
+    def __init__(self, har_data: Dict):
+        super().__init__(timeout=0)
+        self.har_data = har_data
+
+    def capture(self, url, output_file=None):
+        if output_file:
+            with open(output_file, "w") as f:
+                json.dump(self.har_data, f)
+        return True, self.har_data
+
+
+class _FakeCompletions:
+    """Answers structured-output requests by scoring every API-looking endpoint."""
+
+    def parse(self, model, messages, **kwargs):
+        content = messages[-1]["content"]
+        payload = json.loads(content[content.index("{") :])
+        endpoints = [
+            EndpointAnalysis(
+                url=url,
+                explanation="Synthetic endpoint returning paginated data.",
+                usefulness_score=50 + len(url) % 50,
+            )
+            for url in payload["endpoints"]
+            if not url.endswith(NOISE_EXTENSIONS)
+        ]
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+            completion_tokens=len(endpoints) * 30,
+        )
+        message = SimpleNamespace(parsed=EndpointAnalysisBatch(endpoints=endpoints))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class FakeLlmClient:
+    """Minimal stand-in for the OpenAI client used by EndpointAnalyzer."""
+
+    def __init__(self):
+        self.beta = SimpleNamespace(
+            chat=SimpleNamespace(completions=_FakeCompletions())
+        )
+
+
+class _TargetHandler(BaseHTTPRequestHandler):
+    """Serves JSON to requests carrying an authorization header, 401 otherwise."""
+
+    def _respond(self):
+        length = int(self.headers.get("content-length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        if self.headers.get("authorization"):
+            status = 200
+            body = json.dumps({"path": self.path, "data": list(range(20))})
+        else:
+            status = 401
+            body = json.dumps({"error": "unauthorized"})
+
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TargetServer:
+    """Local HTTP server standing in for the scanned site's API."""
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _TargetHandler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _LocalResponse:
+    def __init__(self, status: int, body: bytes):
+        self.status = status
+        self._body = body
+
+    def text(self) -> str:
+        return self._body.decode("utf-8", errors="replace")
+
+
+class LocalRequestContext:
+    """urllib-based stand-in for Playwright's APIRequestContext.fetch."""
+
+    def fetch(self, url, method="GET", headers=None, data=None):
+        body = data.encode("utf-8") if isinstance(data, str) else data
+        request = urllib.request.Request(
+            url, data=body, headers=headers or {}, method=method
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return _LocalResponse(response.status, response.read())
+        except urllib.error.HTTPError as e:
+            return _LocalResponse(e.code, e.read())
+
+
+class LocalHeaderOptimizer(HeaderOptimizer):
+    """HeaderOptimizer that probes through urllib instead of a browser."""
+
+    @contextmanager
+    def _request_context(self):
+        yield LocalRequestContext()
+
+
+class LocalRedis:
+    """In-process stand-in for the Redis commands RedisJobQueue uses.
+
+    Values come back as bytes, as from a redis.Redis client without
+    decode_responses. A transaction holds the stand-in's lock from its
+    first read to its last write, so watched keys cannot change under it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._lists = {}
+        self._sets = {}
+        self._hashes = {}
+        self._zsets = {}
+
+    @staticmethod
+    def _bytes(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    def lpush(self, key, value):
+        with self._lock:
+            items = self._lists.setdefault(key, [])
+            items.insert(0, self._bytes(value))
+            return len(items)
+
+    def rpush(self, key, value):
+        with self._lock:
+            items = self._lists.setdefault(key, [])
+            items.append(self._bytes(value))
+            return len(items)
+
+    def rpop(self, key):
+        with self._lock:
+            items = self._lists.get(key)
+            return items.pop() if items else None
+
+    def lindex(self, key, index):
+        with self._lock:
+            items = self._lists.get(key, [])
+            try:
+                return items[index]
+            except IndexError:
+                return None
+
+    def llen(self, key):
+        with self._lock:
+            return len(self._lists.get(key, []))
+
+    def sadd(self, key, value):
+        with self._lock:
+            members = self._sets.setdefault(key, set())
+            value = self._bytes(value)
+            if value in members:
+                return 0
+            members.add(value)
+            return 1
+
+    def sismember(self, key, value):
+        with self._lock:
+            return int(self._bytes(value) in self._sets.get(key, set()))
+
+    def srem(self, key, value):
+        with self._lock:
+            members = self._sets.get(key, set())
+            value = self._bytes(value)
+            if value not in members:
+                return 0
+            members.discard(value)
+            return 1
+
+    def hset(self, key, field, value):
+        with self._lock:
+            self._hashes.setdefault(key, {})[self._bytes(field)] = self._bytes(value)
+            return 1
+
+    def hget(self, key, field):
+        with self._lock:
+            return self._hashes.get(key, {}).get(self._bytes(field))
+
+    def hdel(self, key, field):
+        with self._lock:
+            return int(
+                self._hashes.get(key, {}).pop(self._bytes(field), None) is not None
+            )
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            values = self._hashes.setdefault(key, {})
+            field = self._bytes(field)
+            value = int(values.get(field, 0)) + amount
+            values[field] = self._bytes(value)
+            return value
+
+    def zadd(self, key, mapping, xx=False):
+        with self._lock:
+            scores = self._zsets.setdefault(key, {})
+            added = 0
+            for member, score in mapping.items():
+                member = self._bytes(member)
+                if xx and member not in scores:
+                    continue
+                added += member not in scores
+                scores[member] = float(score)
+            return added
+
+    def zscore(self, key, member):
+        with self._lock:
+            return self._zsets.get(key, {}).get(self._bytes(member))
+
+    def zrem(self, key, member):
+        with self._lock:
+            return int(
+                self._zsets.get(key, {}).pop(self._bytes(member), None) is not None
+            )
+
+    def zrangebyscore(self, key, low, high):
+        with self._lock:
+            scores = self._zsets.get(key, {})
+            return [
+                member
+                for member, score in sorted(scores.items(), key=lambda item: item[1])
+                if low <= score <= high
+            ]
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._zsets.get(key, {}))
+
+    def transaction(self, function, *watches, value_from_callable=False):
+        """Run function(pipe) atomically, as redis.Redis.transaction does."""
+        with self._lock:
+            pipe = _LocalTransaction(self)
+            value = function(pipe)
+            results = pipe.execute()
+        return value if value_from_callable else results
+
+
+class _LocalTransaction:
+    """Pipeline of a LocalRedis transaction.
+
+    Commands run at once, under the lock the transaction holds; after
+    multi() they return the pipeline and their results come from execute().
+    """
+
+    def __init__(self, client: LocalRedis):
+        self._client = client
+        self._results = None
+
+    def multi(self):
+        self._results = []
+
+    def execute(self):
+        results, self._results = self._results or [], None
+        return results
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+        if self._results is None:
+            return command
+
+        def queued(*args, **kwargs):
+            self._results.append(command(*args, **kwargs))
+            return self
+
+        return queued
+
+
+def build_pipeline(har_data: Dict, output_dir=None, **kwargs) -> ApiDetectionPipeline:
+    """Build a pipeline whose browser, LLM and probe transport are local stand-ins.
+
+    Args:
+        har_data: HAR returned by the capture stage
+        output_dir: Optional output directory for the pipeline
+        **kwargs: Extra ApiDetectionPipeline arguments. A shared LLM
+            dispatcher passed in resources should wrap a FakeLlmClient.
+
+    Returns:
+        ApiDetectionPipeline: The pipeline ready to run
+    """
+    pipeline = ApiDetectionPipeline(
+        output_dir=output_dir, openai_api_key="benchmark", **kwargs
+    )
+    pipeline.har_capture = SyntheticCapture(har_data)
+    if pipeline.resources.llm_dispatcher is None:
+        pipeline.endpoint_analyzer.client = FakeLlmClient()
+    pipeline.header_optimizer = LocalHeaderOptimizer(
+        serializer=pipeline.serializer,
+        probe_delay=0,
+        probe_scheduler=pipeline.resources.probe_scheduler,
+    )
+    return pipeline
@@ -0,0 +1,142 @@
+"""Run many pipelines in parallel on one output directory and check isolation.
+
+Every run scans its own synthetic HAR whose API URLs carry a run-specific
+path prefix. Afterwards each run's workspace must hold every artifact, each
+artifact must load, and none may mention another run's prefix.
+
+Usage:
+    python -m benchmarks.stress_workspaces [--runs 32] [--concurrency 8]
+        [--processes] [--output-dir DIR]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List
+
+from api_engine.serialization import ArtifactSerializer
+from benchmarks.standins import TargetServer, build_pipeline
+from benchmarks.synthetic_har import generate_har
+
+ARTIFACTS = (
+    "network_traffic.har",
+    "filtered_requests",
+    "analyzed_endpoints",
+    "matched_requests",
+    "necessary_headers",
+    "pipeline_trace.json",
+)
+
+
+def _run_one(index: int, base_url: str, output_dir: str, har_config: Dict) -> Dict:
+    """Run one pipeline and return its workspace and expected URL prefix."""
+    prefix = f"{base_url}/run{index}"
+    har = generate_har(**dict(har_config, base_url=prefix, seed=index))
+    pipeline = build_pipeline(har, output_dir=output_dir, retention="none")
+    success, _, intermediate = pipeline.run(prefix, "GET")
+    return {
+        "index": index,
+        "success": success,
+        "workspace": intermediate.get("workspace"),
+        "prefix": prefix,
+    }
+
+
+def check_workspace(run: Dict, run_count: int) -> List[str]:
+    """Return the problems found in one run's workspace."""
+    if not run["success"]:
+        return [f"run {run['index']} failed"]
+
+    problems = []
+    serializer = ArtifactSerializer()
+    foreign = [
+        f"/run{i}/" for i in range(run_count) if i != run["index"]
+    ]  # other runs' URL prefixes
+    for name in ARTIFACTS:
+        path = os.path.join(run["workspace"], name)
+        if "." not in name:
+            path += serializer.extension
+        if not os.path.exists(path):
+            problems.append(f"run {run['index']}: missing {name}")
+            continue
+
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            if name.endswith(".json") or name.endswith(".har"):
+                json.loads(data)
+            else:
+                serializer.loads(data)
+        except ValueError as e:
+            problems.append(f"run {run['index']}: {name} is unreadable: {e}")
+            continue
+
+        text = data.decode("utf-8", errors="replace")
+        if any(marker in text for marker in foreign):
+            problems.append(f"run {run['index']}: {name} holds another run's data")
+        if name != "pipeline_trace.json" and run["prefix"] not in text:
+            problems.append(f"run {run['index']}: {name} lacks its own data")
+
+    leftovers = [n for n in os.listdir(run["workspace"]) if n.endswith(".tmp")]
+    if leftovers:
+        problems.append(f"run {run['index']}: leftover temp files {leftovers}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=32, help="Total pipeline runs")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Runs executing at once"
+    )
+    parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="Run pipelines in worker processes instead of threads",
+    )
+    parser.add_argument(
+        "--output-dir", help="Shared output directory, a temporary one by default"
+    )
+    parser.add_argument("--entries", type=int, default=200, help="HAR entries per run")
+    parser.add_argument("--endpoints", type=int, default=8, help="Endpoints per run")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix="api_engine_stress_")
+    har_config = {"entries": args.entries, "endpoints": args.endpoints}
+    executor_class = ProcessPoolExecutor if args.processes else ThreadPoolExecutor
+
+    with TargetServer() as server:
+        started = time.perf_counter()
+        with executor_class(max_workers=args.concurrency) as executor:
+            futures = [
+                executor.submit(_run_one, i, server.base_url, output_dir, har_config)
+                for i in range(args.runs)
+            ]
+            runs = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+    problems = []
+    for run in runs:
+        problems.extend(check_workspace(run, args.runs))
+    workspaces = {run["workspace"] for run in runs}
+    if len(workspaces) != len(runs):
+        problems.append("runs shared a workspace")
+
+    print(
+        f"{args.runs} runs, concurrency {args.concurrency}, "
+        f"{'processes' if args.processes else 'threads'}: {elapsed:.2f}s"
+    )
+    print(f"Workspaces: {os.path.join(output_dir, 'runs')}")
+    if problems:
+        for problem in problems:
+            print(f"FAIL {problem}")
+        sys.exit(1)
+    print("OK: every workspace is complete and isolated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Deterministic synthetic HAR generator for benchmarks.
+
+Usage:
+    python -m benchmarks.synthetic_har output.har [--entries N] [--endpoints N] ...
+"""
+
+import argparse
+import json
+import random
+from typing import Dict, List, Sequence
+from urllib.parse import urlsplit
+
+NOISE_EXTENSIONS = (".js", ".css", ".png", ".woff2", ".svg")
+RESOURCES = ("users", "search", "events", "feed", "items", "orders", "metrics")
+
+
+def _headers(
+    rng: random.Random, count: int, token: str, path: str = "/"
+) -> List[Dict[str, str]]:
+    """Build a realistic request header list of the given size."""
+    headers = [
+        {"name": ":path", "value": path},
+        {"name": "accept", "value": "application/json"},
+        {"name": "user-agent", "value": "Mozilla/5.0 (X11; Linux x86_64)"},
+        {"name": "authorization", "value": f"Bearer {token}"},
+        {"name": "content-type", "value": "application/json"},
+    ]
+    for i in range(max(count - len(headers), 0)):
+        headers.append(
+            {"name": f"x-custom-{i}", "value": f"{rng.getrandbits(64):016x}"}
+        )
+    return headers[: max(count, 2)]
+
+
+def _request_path(url: str) -> str:
+    """Return the path and query of a URL, as in an HTTP/2 :path header."""
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def _json_body(rng: random.Random, size: int) -> str:
+    """Build a JSON response body of roughly the given size in bytes."""
+    items = []
+    body = {"data": items, "page": 1, "total": 0}
+    length = 40
+    while length < size:
+        item = {
+            "id": rng.randint(1, 10**9),
+            "name": f"item-{rng.getrandbits(32):08x}",
+            "score": round(rng.random(), 4),
+        }
+        items.append(item)
+        length += 70
+    body["total"] = len(items)
+    return json.dumps(body)
+
+
+def generate_har(
+    entries: int = 1000,
+    endpoints: int = 50,
+    headers: int = 20,
+    body_size: int = 512,
+    noise_ratio: float = 0.5,
+    methods: Sequence[str] = ("GET", "POST"),
+    base_url: str = "https://api.example.test",
+    seed: int = 0,
+) -> Dict:
+    """Generate a synthetic HAR document.
+
+    The same arguments always produce the same HAR.
+
+    Args:
+        entries: Total number of HAR entries
+        endpoints: Number of distinct API endpoints the API entries spread over
+        headers: Number of request headers per API entry
+        body_size: Approximate response body size in bytes for API entries
+        noise_ratio: Fraction of entries that are static assets, not API calls
+        methods: HTTP methods assigned to API endpoints
+        base_url: Scheme and host for the API endpoints
+        seed: Random seed
+
+    Returns:
+        Dict: HAR data
+    """
+    rng = random.Random(seed)
+    endpoint_specs = []
+    for i in range(max(endpoints, 1)):
+        resource = RESOURCES[i % len(RESOURCES)]
+        endpoint_specs.append(
+            {
+                "url": f"{base_url}/v1/{resource}/{i}",
+                "method": methods[i % len(methods)],
+                "params": [f"p{j}" for j in range(rng.randint(0, 4))],
+            }
+        )
+
+    har_entries = []
+    for i in range(entries):
+        if rng.random() < noise_ratio:
+            ext = rng.choice(NOISE_EXTENSIONS)
+            url = f"https://cdn.example.test/static/asset-{rng.randint(0, 500)}{ext}"
+            har_entries.append(
+                {
+                    "request": {
+                        "method": "GET",
+                        "url": url,
+                        "queryString": [],
+                        "headers": _headers(rng, min(headers, 6), "none"),
+                        "bodySize": 0,
+                    },
+                    "response": {
+                        "status": 200,
+                        "content": {"size": body_size * 4, "mimeType": "text/plain"},
+                    },
+                }
+            )
+            continue
+
+        spec = endpoint_specs[rng.randrange(len(endpoint_specs))]
+        query = [
+            {"name": name, "value": str(rng.randint(0, 1000))}
+            for name in spec["params"]
+        ]
+        query_string = "&".join(f"{q['name']}={q['value']}" for q in query)
+        url = f"{spec['url']}?{query_string}" if query_string else spec["url"]
+        request = {
+            "method": spec["method"],
+            "url": url,
+            "queryString": query,
+            "headers": _headers(rng, headers, "secret-token", _request_path(url)),
+            "bodySize": 0,
+        }
+        if spec["method"] != "GET":
+            post_data = json.dumps({"query": f"q{rng.randint(0, 100)}"})
+            request["postData"] = {"mimeType": "application/json", "text": post_data}
+            request["bodySize"] = len(post_data)
+
+        text = _json_body(rng, body_size)
+        har_entries.append(
+            {
+                "request": request,
+                "response": {
+                    "status": 200,
+                    "content": {
+                        "size": len(text),
+                        "mimeType": "application/json",
+                        "text": text,
+                    },
+                },
+            }
+        )
+
+    return {
+        "log": {
+            "version": "1.2",
+            "creator": {"name": "api-engine-benchmarks", "version": "1.0"},
+            "entries": har_entries,
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output")
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--endpoints", type=int, default=50)
+    parser.add_argument("--headers", type=int, default=20)
+    parser.add_argument("--body-size", type=int, default=512)
+    parser.add_argument("--noise-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    har = generate_har(
+        entries=args.entries,
+        endpoints=args.endpoints,
+        headers=args.headers,
+        body_size=args.body_size,
+        noise_ratio=args.noise_ratio,
+        seed=args.seed,
+    )
+    with open(args.output, "w") as f:
+        json.dump(har, f)
+
+
+if __name__ == "__main__":
+    main()
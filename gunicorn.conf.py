@@ -0,0 +1,24 @@
+"""Gunicorn settings for serving application:application.
+
+Run with `gunicorn application:application`; gunicorn loads this file from
+the working directory.
+"""
+
+import os
+
+# Job event streams hold a request thread for up to EVENTS_MAX_STREAM
+# seconds, so each worker serves requests on a pool of threads
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+
+def post_worker_init(worker):
+    """Warm up the app's components in each worker once it has loaded the app.
+
+    Enabled with WARM_UP=true. It runs after the fork, so the threads,
+    browsers and connections it starts belong to the worker that serves
+    requests.
+    """
+    app = worker.wsgi
+    if app.config.get("WARM_UP"):
+        app.extensions["warm_up"]()
@@ -1,16 +1,250 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, TextIO, Tuple
 
+# Run and stage of the code that is logging, attached to every record
+run_id_var = contextvars.ContextVar("run_id", default=None)
+stage_var = contextvars.ContextVar("stage", default=None)
 
-def get_logger(name: str, log_level: Optional[int] = None) -> logging.Logger:
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Name of the background thread that writes queued records
+LOG_WRITER_THREAD = "log-writer"
+
+_handler_lock = threading.Lock()
+_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach run_id and/or stage to every record logged inside the block.
+
+    Args:
+        **fields: run_id and stage values to set
+    """
+    tokens = []
+    if "run_id" in fields:
+        tokens.append((run_id_var, run_id_var.set(fields["run_id"])))
+    if "stage" in fields:
+        tokens.append((stage_var, stage_var.set(fields["stage"])))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current run ID and stage onto each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = run_id_var.get()
+        record.stage = stage_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Limits how often the same INFO or DEBUG message template is logged.
+
+    Records are grouped by logger and unformatted message, so call sites in
+    hot loops must use deferred %-style arguments rather than f-strings for
+    their messages to share a template. Each template gets a token bucket of
+    burst messages refilled at per_second. Warnings and errors always pass.
+    The first message let through after a suppression notes how many were
+    dropped.
+    """
+
+    def __init__(self, per_second: float = 10.0, burst: int = 20):
+        """Initialize the filter.
+
+        Args:
+            per_second: Sustained messages per second allowed per template
+            burst: Messages per template allowed in a burst
+        """
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self._lock = threading.Lock()
+        # (logger, template) -> [tokens, last refill time, suppressed count]
+        self._buckets = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not isinstance(record.msg, str):
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            else:
+                elapsed = now - bucket[1]
+                bucket[0] = min(self.burst, bucket[0] + elapsed * self.per_second)
+                bucket[1] = now
+
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": f"{self.formatTime(record, DATE_FORMAT)}.{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "stage": getattr(record, "stage", None),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records without formatting them in the logging thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats the whole line here. Only merge the
+        # arguments, which may change after the call returns, and leave
+        # timestamps, JSON and tracebacks to the writer thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """Writes queued records on a thread named LOG_WRITER_THREAD."""
+
+    def start(self) -> None:
+        super().start()
+        self._thread.name = LOG_WRITER_THREAD
+
+
+def build_handler(
+    stream: Optional[TextIO] = None,
+    fmt: str = "text",
+    use_queue: bool = True,
+    rate_limit: float = 0.0,
+    burst: int = 20,
+) -> Tuple[logging.Handler, Optional[logging.handlers.QueueListener]]:
+    """Build the handler that loggers write to.
+
+    Args:
+        stream: Output stream, stdout by default
+        fmt: "text" or "json"
+        use_queue: Whether to hand records to a background writer thread
+            instead of writing them in the logging thread
+        rate_limit: Messages per second allowed per INFO/DEBUG template,
+            0 for no limit
+        burst: Messages per template allowed in a burst when rate limiting
+
+    Returns:
+        tuple: (handler, listener) where listener is the started background
+        writer, or None without a queue
+    """
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+
+    listener = None
+    handler = output
+    if use_queue:
+        handler = _QueueHandler(queue.SimpleQueue())
+        listener = _QueueListener(handler.queue, output)
+        listener.start()
+
+    # Filters on the front handler run in the logging thread, where the
+    # context variables are set and before any queueing or I/O
+    handler.addFilter(ContextFilter())
+    if rate_limit > 0:
+        handler.addFilter(RateLimitFilter(rate_limit, burst))
+    return handler, listener
+
+
+def _shared_handler() -> logging.Handler:
+    """Return the handler shared by every logger, building it from the environment."""
+    global _handler, _listener
+    with _handler_lock:
+        if _handler is None:
+            _handler, _listener = build_handler(
+                fmt=os.environ.get("LOG_FORMAT", "text").lower(),
+                use_queue=os.environ.get("LOG_ASYNC", "true").lower() == "true",
+            )
+            if _listener is not None:
+                atexit.register(shutdown_logging)
+        return _handler
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the background writer."""
+    global _listener
+    with _handler_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def _restart_after_fork() -> None:
+    # The writer thread does not survive a fork, so give the child its own
+    global _handler_lock, _listener
+    _handler_lock = threading.Lock()
+    if isinstance(_handler, logging.handlers.QueueHandler) and _listener is not None:
+        _handler.queue = queue.SimpleQueue()
+        _listener = _QueueListener(_handler.queue, *_listener.handlers)
+        _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def get_logger(
+    name: str, log_level: Optional[int] = None, rate_limited: bool = False
+) -> logging.Logger:
     """
     Configure and return a logger with the specified name.
 
+    All loggers share one handler. By default it queues records for a
+    background writer thread, so logging never blocks on stdout. It is
+    configured by environment variables:
+        LOG_LEVEL: Minimum level, INFO by default
+        LOG_FORMAT: "text" (default) or "json" with run_id and stage fields
+        LOG_ASYNC: "false" to write records synchronously
+        LOG_RATE_LIMIT: Messages per second per INFO/DEBUG template on
+            rate-limited loggers, 0 to disable (default 10)
+        LOG_RATE_BURST: Burst size for the rate limit (default 20)
+
     Args:
         name: Logger name, typically __name__ of the calling module
         log_level: Optional override for log level, uses environment variable or INFO by default
+        rate_limited: Whether to rate-limit this logger's INFO and DEBUG
+            messages, for loggers used in hot loops such as header probes
 
     Returns:
         A configured logger instance
@@ -31,20 +265,13 @@ def get_logger(name: str, log_level: Optional[int] = None) -> logging.Logger:
         # Set logger level
         logger.setLevel(log_level)
 
-        # Create console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(log_level)
-
-        # Create formatter
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-
-        # Add formatter to handler
-        console_handler.setFormatter(formatter)
+        # Attach the shared handler
+        logger.addHandler(_shared_handler())
 
-        # Add handler to logger
-        logger.addHandler(console_handler)
+        rate_limit = float(os.environ.get("LOG_RATE_LIMIT", 10))
+        if rate_limited and rate_limit > 0:
+            logger.addFilter(
+                RateLimitFilter(rate_limit, int(os.environ.get("LOG_RATE_BURST", 20)))
+            )
 
     return logger
@@ -0,0 +1,43 @@
+import argparse
+import os
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run scan jobs from the shared job queue, without serving HTTP"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="Concurrent jobs, defaults to JOB_WORKERS",
+    )
+    args = parser.parse_args()
+    if args.threads is not None:
+        os.environ["JOB_WORKERS"] = str(args.threads)
+
+    from app import create_app
+
+    application = create_app()
+    if application.config["WARM_UP"]:
+        application.extensions["warm_up"]()
+    runner = application.extensions["job_runner"]()
+
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    stopping.wait()
+
+    # Jobs still running after the lease time are retried by another worker
+    runner.stop(timeout=application.config["JOB_LEASE_SECONDS"])
+
+
+if __name__ == "__main__":
+    main()